@@ -1,26 +1,230 @@
-from fastapi import FastAPI, HTTPException
-from .schemas import PredictRequest, PredictResponse
-from .model_loader import load_artifact
-from .predictor import build_predictor
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from .batching import MicroBatcher
+from .prediction_log import PredictionLogSink
+from .metrics import CONTENT_TYPE, Metrics, MetricsMiddleware, current_timings, lap, mark_parsed
+from .streaming import RequestStreamingResponse, aiter_scored
+from .schemas import (
+    BatchPredictRequest,
+    BatchPredictResponse,
+    PredictRequest,
+    PredictResponse,
+    RankedCandidate,
+    RankRequest,
+    RankResponse,
+)
+from .model_loader import artifact_fingerprint, load_artifact
+from .predictor import ResultCache, TokenHashCache, build_batch_predictor, build_predictor, build_ranker
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Largest accepted /predict/batch payload (number of feature dicts)
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "256"))
+THRESHOLD = 0.5
+
+# Opt-in: coalesce concurrent /predict calls into one scoring call
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "0").lower() in ("1", "true", "yes")
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+# Rows per scoring call in /predict/stream
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1024"))
+# Longer /predict/stream lines get an error record instead of being buffered
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(64 * 1024)))
+# Hashed (index, sign) of recently seen column values / crosses; 0 disables
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "100000"))
+
+# Optional /predict result cache (exact repeats of a features dict); 0 disables
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "0"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "60"))
+# Add a Server-Timing header (per-stage milliseconds) to every response
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+# Opt-in: append served predictions to data/predictions.csv from a background writer
+PREDICTION_LOG = os.getenv("PREDICTION_LOG", "0").lower() in ("1", "true", "yes")
+PREDICTION_LOG_QUEUE = int(os.getenv("PREDICTION_LOG_QUEUE", "10000"))
+PREDICTION_LOG_BATCH = int(os.getenv("PREDICTION_LOG_BATCH", "512"))
+PREDICTION_LOG_FLUSH_S = float(os.getenv("PREDICTION_LOG_FLUSH_S", "1"))
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_S) if RESULT_CACHE_SIZE > 0 else None
+_reload_lock = threading.Lock()
+metrics = Metrics()
+prediction_log = (
+    PredictionLogSink(
+        max_queue=PREDICTION_LOG_QUEUE,
+        batch_size=PREDICTION_LOG_BATCH,
+        flush_interval_s=PREDICTION_LOG_FLUSH_S,
+    )
+    if PREDICTION_LOG
+    else None
+)
+
+
+def _load_model():
+    """Load the artifact MODEL_PATH points at and build every scoring function for it."""
+    global artifact, model_fingerprint, token_cache, predict_one, predict_batch, rank_candidates
+    fingerprint = artifact_fingerprint()
+    loaded = load_artifact()
+    hasher = loaded.get("hasher")
+    cache = None
+    if TOKEN_CACHE_SIZE > 0 and hasher is not None:
+        cache = TokenHashCache(hasher.n_features, hasher.alternate_sign, TOKEN_CACHE_SIZE)
+    one, batch, ranker = build_predictor(loaded, cache), build_batch_predictor(loaded, cache), build_ranker(loaded, cache)
+
+    artifact, token_cache = loaded, cache
+    predict_one, predict_batch, rank_candidates = one, batch, ranker
+    model_fingerprint = fingerprint
+    if result_cache is not None:
+        # Results of the previous artifact are dropped
+        result_cache.bind(fingerprint)
+
+
+_load_model()
+batcher = MicroBatcher(predict_batch, BATCH_MAX_SIZE, BATCH_WINDOW_MS) if PREDICT_BATCHING else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if prediction_log is not None:
+        prediction_log.start()
+    if batcher is not None:
+        await batcher.start()
+    yield
+    if batcher is not None:
+        await batcher.stop()
+    if prediction_log is not None:
+        # Queued rows are written before shutdown completes
+        await run_in_threadpool(prediction_log.close)
+
+
+def _logged(predict_batch):
+    """`predict_batch` that also queues its predictions on the prediction log."""
+    def predict_and_log(records):
+        probas = predict_batch(records)
+        prediction_log.log_many((1 if p >= THRESHOLD else 0 for p in probas), probas)
+        return probas
 
-app = FastAPI(title="Avazu CTR Serving API")
+    return predict_and_log
 
-artifact = load_artifact()
-predict_one = build_predictor(artifact)
+
+app = FastAPI(title="Avazu CTR Serving API", lifespan=lifespan)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/stats")
+def stats():
+    return {
+        "model_fingerprint": model_fingerprint,
+        "token_cache": token_cache.stats() if token_cache is not None else None,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "prediction_log": prediction_log.stats() if prediction_log is not None else None,
+    }
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Request counts, error counts and request / stage latency histograms (Prometheus text)."""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.post("/reload")
+def reload_model():
+    """Reload MODEL_PATH if the artifact changed (e.g. a new serving version)."""
+    with _reload_lock:
+        if artifact_fingerprint() == model_fingerprint:
+            return {"reloaded": False, "model_fingerprint": model_fingerprint}
+        try:
+            _load_model()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"reload failed, keeping the current model: {e}")
+        if batcher is not None:
+            batcher.predict_batch = predict_batch
+        return {"reloaded": True, "model_fingerprint": model_fingerprint}
+
 @app.post("/predict", response_model=PredictResponse)
-def predict(req: PredictRequest):
+async def predict(req: PredictRequest):
+    timings = current_timings()
+    mark_parsed(timings)
     try:
-        proba = predict_one(req.features)
-        pred = 1 if proba >= 0.5 else 0
+        fingerprint = model_fingerprint
+        t0 = time.perf_counter()
+        key = result_cache.key(req.features) if result_cache is not None else None
+        proba = result_cache.get(key) if key is not None else None
+        t0 = lap(timings, "cache", t0) if result_cache is not None else t0
+        if proba is None:
+            if batcher is not None:
+                proba = await batcher.submit(req.features)
+                lap(timings, "batch", t0)
+            else:
+                proba = await run_in_threadpool(predict_one, req.features, timings)
+            if key is not None:
+                result_cache.put(key, proba, fingerprint)
+        pred = 1 if proba >= THRESHOLD else 0
+        if prediction_log is not None:
+            prediction_log.log(pred, proba)
         return PredictResponse(click_probability=proba, click_prediction=pred)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/predict/batch", response_model=BatchPredictResponse)
+def predict_many(req: BatchPredictRequest):
+    timings = current_timings()
+    mark_parsed(timings)
+    if len(req.features) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"batch of {len(req.features)} exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}",
+        )
+    try:
+        probas = predict_batch(req.features, timings)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    predictions = [
+        PredictResponse(click_probability=float(p), click_prediction=1 if p >= THRESHOLD else 0)
+        for p in probas
+    ]
+    if prediction_log is not None:
+        prediction_log.log_many((p.click_prediction for p in predictions), probas)
+    return BatchPredictResponse(predictions=predictions)
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """NDJSON in (one /predict body per line), NDJSON out, scored in STREAM_BATCH_SIZE batches."""
+    scorer = _logged(predict_batch) if prediction_log is not None else predict_batch
+    return RequestStreamingResponse(
+        aiter_scored(request.stream(), scorer, STREAM_BATCH_SIZE, THRESHOLD, STREAM_MAX_LINE_BYTES),
+        media_type="application/x-ndjson",
+    )
+
+@app.post("/rank", response_model=RankResponse)
+def rank(req: RankRequest):
+    timings = current_timings()
+    mark_parsed(timings)
+    if len(req.candidates) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{len(req.candidates)} candidates exceed MAX_BATCH_SIZE={MAX_BATCH_SIZE}",
+        )
+    try:
+        probas = rank_candidates(req.context, req.candidates, timings)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Stable sort: ties keep request order
+    order = sorted(range(len(probas)), key=lambda i: -probas[i])
+    if req.top_k is not None:
+        order = order[: req.top_k]
+    return RankResponse(
+        ranked=[RankedCandidate(index=i, click_probability=float(probas[i])) for i in order]
+    )
+
+app.add_middleware(
+    MetricsMiddleware,
+    metrics=metrics,
+    endpoints=[route.path for route in app.routes],
+    server_timing=SERVER_TIMING,
+)
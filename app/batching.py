@@ -0,0 +1,97 @@
+"""Server-side micro-batching for single-row /predict calls.
+
+Concurrent requests are queued; a dispatcher task takes the first waiting
+request, keeps collecting until `max_batch_size` requests are queued or
+`max_wait_ms` has passed, then scores them as one hashed matrix (in a worker
+thread, so the event loop keeps accepting requests) and resolves every
+caller's future with its own probability.
+
+If scoring the batch raises (e.g. one malformed request), every request of
+that batch is retried on its own, so only the bad one sees the error.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        predict_batch: Callable[[List[Dict[str, Any]]], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.requests = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="predict-micro-batcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, features: Dict[str, Any]) -> float:
+        if self._task is None:
+            raise RuntimeError("MicroBatcher is not running; call start() first")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Already queued requests join without waiting
+            while not self._queue.empty() and len(batch) < self.max_batch_size:
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, records: List[Dict[str, Any]]) -> list:
+        try:
+            return list(self.predict_batch(records))
+        except Exception:
+            results = []
+            for features in records:
+                try:
+                    results.append(float(self.predict_batch([features])[0]))
+                except Exception as exc:
+                    results.append(exc)
+            return results
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            live = [(f, fut) for f, fut in batch if not fut.done()]  # drop cancelled callers
+            if not live:
+                continue
+            results = await asyncio.to_thread(self._score, [f for f, _ in live])
+            self.batches += 1
+            self.requests += len(live)
+            for (_, future), result in zip(live, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(float(result))
@@ -0,0 +1,213 @@
+"""Request / stage latency metrics for the serving API, in Prometheus text format.
+
+`MetricsMiddleware` (pure ASGI, so streaming bodies pass through untouched)
+times every request, counts it by endpoint and status, and gives the request
+a stage-timings dict (`current_timings()`). Handlers and the scoring
+functions add stage durations to it:
+
+  parse    request received -> handler entered (body read, JSON, validation)
+  cache    /predict result cache lookup
+  features DataFrame / token construction
+  hash     token hashing (with the token cache: cached lookup + hashing)
+  score    model scoring
+  batch    micro-batching wait + batch scoring (PREDICT_BATCHING)
+
+When the response starts, the stages are observed into per-endpoint
+histograms and, if enabled, sent as a `Server-Timing` header (milliseconds).
+`/metrics` renders everything with `Metrics.render()`; p99 per stage is
+`histogram_quantile(0.99, rate(ctr_stage_duration_seconds_bucket[5m]))`.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; the serving fast path is tens of microseconds, /predict/stream seconds
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0,
+)
+
+# Per-request stage timings (stage -> seconds); None outside a request
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("ctr_stage_timings", default=None)
+_START = "_start"
+
+
+def current_timings() -> Optional[Dict[str, float]]:
+    """Stage-timings dict of the current request, or None when not instrumented."""
+    return _timings.get()
+
+
+def lap(timings: Optional[Dict[str, float]], stage: str, t0: float) -> float:
+    """Add `now - t0` to `timings[stage]` (if timings is not None); returns now."""
+    t = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (t - t0)
+    return t
+
+
+def mark_parsed(timings: Optional[Dict[str, float]]):
+    """Record the `parse` stage: from request start until the handler runs."""
+    if timings is not None and _START in timings:
+        lap(timings, "parse", timings[_START])
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics), thread-safe."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last one: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[list, float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+def _labels(**labels) -> str:
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+
+def _fmt(v: float) -> str:
+    return repr(float(v)) if v != float("inf") else "+Inf"
+
+
+class Metrics:
+    """Request counts, error counts and latency histograms per endpoint and stage."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._errors: Dict[str, int] = {}
+        self._latency: Dict[str, Histogram] = {}
+        self._stages: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: dict, key) -> Histogram:
+        h = table.get(key)
+        if h is None:
+            with self._lock:
+                h = table.setdefault(key, Histogram(self.buckets))
+        return h
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float):
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 400:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+        self._histogram(self._latency, endpoint).observe(seconds)
+
+    def observe_stage(self, endpoint: str, stage: str, seconds: float):
+        self._histogram(self._stages, (endpoint, stage)).observe(seconds)
+
+    def _render_histogram(self, name: str, h: Histogram, labels: dict) -> list:
+        counts, total, count = h.snapshot()
+        lines, cumulative = [], 0
+        for le, c in zip(self.buckets + (float("inf"),), counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_labels(**labels, le=_fmt(le))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(**labels)} {_fmt(total)}")
+        lines.append(f"{name}_count{_labels(**labels)} {count}")
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            requests = sorted(self._requests.items())
+            errors = sorted(self._errors.items())
+            latency = sorted(self._latency.items())
+            stages = sorted(self._stages.items())
+
+        lines = [
+            "# HELP ctr_requests_total HTTP requests by endpoint, method and status code.",
+            "# TYPE ctr_requests_total counter",
+        ]
+        for (endpoint, method, status), n in requests:
+            lines.append(f"ctr_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {n}")
+        lines += [
+            "# HELP ctr_request_errors_total HTTP requests answered with a 4xx/5xx status.",
+            "# TYPE ctr_request_errors_total counter",
+        ]
+        for endpoint, n in errors:
+            lines.append(f"ctr_request_errors_total{_labels(endpoint=endpoint)} {n}")
+        lines += [
+            "# HELP ctr_request_duration_seconds Request latency until the response body is sent.",
+            "# TYPE ctr_request_duration_seconds histogram",
+        ]
+        for endpoint, h in latency:
+            lines += self._render_histogram("ctr_request_duration_seconds", h, {"endpoint": endpoint})
+        lines += [
+            "# HELP ctr_stage_duration_seconds Time spent per request in each serving stage.",
+            "# TYPE ctr_stage_duration_seconds histogram",
+        ]
+        for (endpoint, stage), h in stages:
+            lines += self._render_histogram(
+                "ctr_stage_duration_seconds", h, {"endpoint": endpoint, "stage": stage}
+            )
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    """`Server-Timing` header value (durations in milliseconds)."""
+    parts = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items() if stage != _START]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware feeding `metrics`. Only paths in `endpoints` get their
+    own label (everything else is counted as "other"), so unknown URLs do not
+    grow the label set.
+    """
+
+    def __init__(self, app, metrics: Metrics, endpoints: Iterable[str], server_timing: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.endpoints = frozenset(endpoints)
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        endpoint = scope["path"] if scope["path"] in self.endpoints else "other"
+        timings = {_START: start}
+        token = _timings.set(timings)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for stage, seconds in timings.items():
+                    if stage != _START:
+                        self.metrics.observe_stage(endpoint, stage, seconds)
+                if self.server_timing:
+                    value = server_timing(timings, time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", value.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            self.metrics.observe_request(endpoint, scope["method"], status, time.perf_counter() - start)
@@ -1,13 +1,42 @@
+import json
 import os
 import joblib
 
+from src.linear_ensemble import MANIFEST_NAME, load_serving_dir, resolve_serving_dir
+
 DEFAULT_MODEL_PATH = "artifacts/model.joblib"
 
+
+def model_path() -> str:
+    return os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
+
+
+def artifact_fingerprint(path: str = None) -> str:
+    """
+    Identity of the artifact `load_artifact` would load now: the resolved
+    serving version (+ its manifest's version/created_at) for a directory,
+    path + mtime + size for a file. Cheap enough to poll.
+    """
+    path = path or model_path()
+    if os.path.isdir(path):
+        version_dir = resolve_serving_dir(path)
+        with open(os.path.join(version_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+        return f"{os.path.abspath(version_dir)}:{manifest.get('version')}:{manifest.get('created_at')}"
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
 def load_artifact():
     """
     Loads the trained model artifact from disk.
 
     The model path can be overridden with the MODEL_PATH environment variable.
+    A directory is read as a serving export (`src/linear_ensemble.py
+    --serving-root`): either one `v<N>` directory or the root, which resolves
+    to its latest version. Its weights are memory-mapped, not unpickled.
     """
-    model_path = os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
-    return joblib.load(model_path)
+    path = model_path()
+    if os.path.isdir(path):
+        return load_serving_dir(path)
+    return joblib.load(path)
@@ -0,0 +1,137 @@
+"""Non-blocking prediction logging for the serving API.
+
+Request handlers call `PredictionLogSink.log` / `log_many`, which only put
+`(time, prediction, proba)` tuples on a bounded in-memory queue. One writer
+thread drains the queue and appends the rows in batches (up to `batch_size`
+rows, or whatever arrived within `flush_interval_s`) to the monitoring log,
+`data/predictions.csv`, in the `monitoring/log.py` format: timestamp (local
+time, seconds), prediction, proba and an empty y_true.
+
+When the queue is full the record is dropped and counted instead of making
+the request wait; `close()` writes everything still queued. Write errors are
+counted and the batch is discarded, so a full disk never fails requests.
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from monitoring.log import append_rows
+
+_STOP = object()
+
+
+class PredictionLogSink:
+    def __init__(
+        self,
+        write_rows: Callable[[list], None] = append_rows,
+        max_queue: int = 10_000,
+        batch_size: int = 512,
+        flush_interval_s: float = 1.0,
+    ):
+        self.write_rows = write_rows
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval_s = max(float(flush_interval_s), 0.001)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(int(max_queue), 1))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+            self._thread.start()
+
+    def log(self, prediction: int, proba: float) -> bool:
+        """Queue one record; False (and counted as dropped) when the queue is full."""
+        try:
+            self._queue.put_nowait((time.time(), prediction, proba))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def log_many(self, predictions: Iterable[int], probas: Iterable[float]) -> int:
+        """Queue one record per row; returns how many were accepted."""
+        now = time.time()
+        accepted = dropped = 0
+        for prediction, proba in zip(predictions, probas):
+            try:
+                self._queue.put_nowait((now, prediction, proba))
+                accepted += 1
+            except queue.Full:
+                dropped += 1
+        if dropped:
+            with self._lock:
+                self.dropped += dropped
+        return accepted
+
+    def _write(self, records: list):
+        rows = [
+            [datetime.fromtimestamp(ts).isoformat(timespec="seconds"), prediction, float(proba), None]
+            for ts, prediction, proba in records
+        ]
+        try:
+            self.write_rows(rows)
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as exc:
+            self.write_errors += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"
+
+    def _collect(self, item) -> tuple:
+        """(records of one batch starting with `item`, whether the stop sentinel was seen)."""
+        records, stop = [], False
+        deadline = time.monotonic() + self.flush_interval_s
+        while True:
+            if item is _STOP:
+                stop = True
+            else:
+                records.append(item)
+            if len(records) >= self.batch_size:
+                return records, stop
+            remaining = deadline - time.monotonic()
+            try:
+                # Wait for more rows only while the batch is young; after stop just drain
+                item = self._queue.get_nowait() if stop or remaining <= 0 else self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return records, stop
+
+    def _run(self):
+        stop = False
+        while True:
+            if stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+            else:
+                item = self._queue.get()
+            records, seen = self._collect(item)
+            stop = stop or seen
+            if records:
+                self._write(records)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Write every queued record and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "last_error": self.last_error,
+        }
@@ -1,16 +1,275 @@
-from typing import Dict, Any
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 
-from src.feature_utils import to_feature_dict
+from src.feature_utils import (
+    DEFAULT_CROSS_PAIRS,
+    EXCLUDED_COLUMNS,
+    SCALAR_TYPES,
+    escape_token_part,
+    hash_features,
+    hash_record,
+    hash_token,
+    is_missing_scalar,
+    record_tokens,
+    to_feature_dict,
+)
+from src.linear_ensemble import from_artifact as stacked_from_artifact
 
+from .metrics import lap
 
-def build_predictor(artifact):
-    hasher = artifact.get("hasher")
-    if hasher is None:
-        raise ValueError("artifact missing 'hasher'")
 
-    use_feature_cross = bool(artifact.get("use_feature_cross", False))
-    cross_pairs = artifact.get("cross_pairs")
+# Exact-type check first: cheaper than isinstance() for the common JSON types
+_SCALAR_TYPE_SET = frozenset(SCALAR_TYPES)
+
+
+class TokenHashCache:
+    """
+    Bounded cache from `(column, value)` and cross keys to the token's hashed
+    `(index, sign)`. Hot values (site_id, app_id, device_model...) then cost
+    one dict lookup instead of escaping + formatting + murmurhash.
+
+    Eviction is CLOCK (second chance): a hit only sets the entry's reference
+    bit; when full, the oldest entry is evicted unless it was referenced, in
+    which case it is moved to the back with the bit cleared. Lookups take no
+    lock; hit/miss counters and inserts are applied under the lock once per
+    row.
+
+    Keys use `str(value)`: 1, True and 1.0 compare equal but hash to
+    different tokens. Entries are only valid for one hasher (n_features,
+    alternate_sign); build a new cache when the artifact changes.
+    """
+
+    def __init__(self, n_features: int, alternate_sign: bool = True, capacity: int = 100_000):
+        self.n_features = n_features
+        self.alternate_sign = alternate_sign
+        self.capacity = max(int(capacity), 1)
+        # key -> [index, sign, referenced]
+        self._entries: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _insert(self, key: tuple, index: int, sign: float):
+        entries = self._entries
+        if key in entries:
+            return
+        while len(entries) >= self.capacity:
+            oldest = next(iter(entries))
+            entry = entries.pop(oldest)
+            if not entry[2]:
+                break
+            entry[2] = False
+            entries[oldest] = entry
+        entries[key] = [index, sign, False]
+
+    def hash_row(self, features, use_feature_cross, cross_pairs, skip_columns=frozenset()):
+        """`hash_record(record_tokens(features, ...))` through the cache; None where record_tokens is None."""
+        cols = [c for c in features if c not in EXCLUDED_COLUMNS]
+        if not cols:
+            return None
+        entries = self._entries
+        n_features, alternate_sign = self.n_features, self.alternate_sign
+        acc: dict[int, float] = {}
+        present: dict[str, str] = {}
+        missed = []
+        hits = 0
+        for c in cols:
+            v = features[c]
+            if type(v) not in _SCALAR_TYPE_SET:
+                if not isinstance(v, SCALAR_TYPES):
+                    return None
+            # Same rule as record_tokens (float subclasses such as np.float64 included)
+            if v.__class__ is not str and is_missing_scalar(v):
+                continue
+            present[c] = s = v if v.__class__ is str else str(v)
+            if c in skip_columns:
+                continue
+            key = (c, s)
+            entry = entries.get(key)
+            if entry is None:
+                idx, sign = hash_token(f"{c}={escape_token_part(s)}", n_features, alternate_sign)
+                missed.append((key, idx, sign))
+            else:
+                idx, sign, _ = entry
+                entry[2] = True
+                hits += 1
+            acc[idx] = acc.get(idx, 0.0) + sign
+
+        if use_feature_cross:
+            seen = set()
+            for a, b in cross_pairs if cross_pairs is not None else DEFAULT_CROSS_PAIRS:
+                if a not in present or b not in present or (a, b) in seen:
+                    continue
+                if a in skip_columns and b in skip_columns:
+                    continue
+                seen.add((a, b))
+                key = (a, present[a], b, present[b])
+                entry = entries.get(key)
+                if entry is None:
+                    token = f"cross:{a}={escape_token_part(present[a])}|{b}={escape_token_part(present[b])}"
+                    idx, sign = hash_token(token, n_features, alternate_sign)
+                    missed.append((key, idx, sign))
+                else:
+                    idx, sign, _ = entry
+                    entry[2] = True
+                    hits += 1
+                acc[idx] = acc.get(idx, 0.0) + sign
+
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missed)
+            for key, idx, sign in missed:
+                self._insert(key, idx, sign)
+
+        indices = sorted(acc)
+        return np.array(indices, dtype=np.int32), np.array([acc[i] for i in indices], dtype=np.float64)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class ResultCache:
+    """
+    Probability cache for repeated `/predict` feature dicts.
+
+    Keys are a digest of the canonical JSON of `features` (sorted keys, so
+    key order does not matter; 1, 1.0 and true stay distinct). Entries expire
+    after `ttl_s` seconds and the least recently used one is evicted beyond
+    `capacity`. `bind(fingerprint)` ties the cache to one loaded artifact:
+    binding a different fingerprint drops every entry, and results computed
+    under another fingerprint are neither served nor stored.
+    """
+
+    def __init__(self, capacity: int = 10_000, ttl_s: float = 60.0):
+        self.capacity = max(int(capacity), 1)
+        self.ttl_s = float(ttl_s)
+        self.fingerprint: Optional[str] = None
+        self._entries: "OrderedDict[bytes, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(features: Dict[str, Any]) -> Optional[bytes]:
+        try:
+            canonical = json.dumps(features, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None  # not JSON-serializable: never cached
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+    def bind(self, fingerprint: str):
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.fingerprint = fingerprint
+
+    def get(self, key: Optional[bytes]) -> Optional[float]:
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            proba, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return proba
+
+    def put(self, key: Optional[bytes], proba: float, fingerprint: Optional[str]):
+        if key is None:
+            return
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                return  # computed with an artifact that is no longer loaded
+            self._entries[key] = (proba, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "ttl_s": self.ttl_s,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "fingerprint": self.fingerprint,
+        }
+
+
+def _row_hasher(hasher, use_feature_cross, cross_pairs, token_cache: Optional[TokenHashCache]):
+    """
+    `row(features, skip_columns=frozenset(), timings=None)` -> (sorted indices,
+    values) of the hashed row, or None when the pandas path must be used (see
+    record_tokens). Stage durations are added to `timings` when given.
+    """
+    if token_cache is not None:
+        if (token_cache.n_features, token_cache.alternate_sign) != (hasher.n_features, hasher.alternate_sign):
+            raise ValueError("token cache was built for a different hasher")
+
+        def row(features, skip_columns=frozenset(), timings=None):
+            # Cached (index, sign) lookups: no separate token stage
+            t0 = time.perf_counter()
+            hashed = token_cache.hash_row(features, use_feature_cross, cross_pairs, skip_columns)
+            lap(timings, "hash", t0)
+            return hashed
+
+        return row
+
+    def row(features, skip_columns=frozenset(), timings=None):
+        t0 = time.perf_counter()
+        tokens = record_tokens(
+            features,
+            add_feature_cross=use_feature_cross,
+            cross_pairs=cross_pairs,
+            skip_columns=skip_columns,
+        )
+        t0 = lap(timings, "features", t0)
+        if tokens is None:
+            return None
+        hashed = hash_record(tokens, hasher.n_features, hasher.alternate_sign)
+        lap(timings, "hash", t0)
+        return hashed
+
+    return row
+
+
+def _build_scorer(artifact):
+    """(predict_proba over a hashed matrix, single-row scorer or None, stacked ensemble or None)."""
+    stacked = stacked_from_artifact(artifact)
+    row_scorer = None
 
     if "model" in artifact:
         model = artifact["model"]
@@ -28,6 +287,13 @@ def build_predictor(artifact):
                 + nb.predict_proba(X_h)[:, 1]
             )
 
+    elif stacked is not None:
+        # Linear ensemble (or stacked export): one X @ W for all members
+        predict_proba = stacked.predict_proba
+        if artifact["hasher"].dtype == np.float64:
+            row_scorer = stacked.predict_proba_row
+        return predict_proba, row_scorer, stacked
+
     elif "models" in artifact:
         models = artifact["models"]
 
@@ -38,7 +304,84 @@ def build_predictor(artifact):
     else:
         raise ValueError("Unsupported artifact format")
 
-    def predict_one(features: Dict[str, Any]) -> float:
+    return predict_proba, row_scorer, None
+
+
+def _records_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    # Object columns: pd.DataFrame(records) would upcast an int column with a
+    # missing key to float (1 -> "1.0" tokens) and drift from single-request scores
+    columns = list(dict.fromkeys(c for r in records for c in r))
+    data = {}
+    for c in columns:
+        values = np.empty(len(records), dtype=object)
+        values[:] = [r.get(c) for r in records]
+        data[c] = values
+    return pd.DataFrame(data, index=pd.RangeIndex(len(records)))
+
+
+def _rows_csr(rows, hasher) -> sp.csr_matrix:
+    """CSR from (indices, values) rows, as FeatureHasher.transform would build it."""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(idx) for idx, _ in rows], out=indptr[1:])
+    indices = np.concatenate([idx for idx, _ in rows]) if rows else np.empty(0, dtype=np.int32)
+    values = np.concatenate([val for _, val in rows]) if rows else np.empty(0)
+    return sp.csr_matrix(
+        (values.astype(hasher.dtype), indices, indptr),
+        shape=(len(rows), hasher.n_features),
+    )
+
+
+def _hash_records(records, hasher, use_feature_cross, cross_pairs, row, timings=None) -> sp.csr_matrix:
+    """Hashed CSR for `records`, row i equal to hasher.transform(to_feature_dict(row i))."""
+    rows = []
+    for features in records:
+        hashed = row(features, timings=timings)
+        if hashed is None:
+            # Non-scalar values: columnar path on object columns
+            t0 = time.perf_counter()
+            frame = _records_frame(records)
+            t0 = lap(timings, "features", t0)
+            X_h = hash_features(
+                frame,
+                n_features=hasher.n_features,
+                add_feature_cross=use_feature_cross,
+                cross_pairs=cross_pairs,
+                alternate_sign=hasher.alternate_sign,
+                dtype=hasher.dtype,
+            )
+            lap(timings, "hash", t0)
+            return X_h
+        rows.append(hashed)
+    t0 = time.perf_counter()
+    X_h = _rows_csr(rows, hasher)
+    lap(timings, "hash", t0)
+    return X_h
+
+
+def build_predictor(artifact, token_cache: Optional[TokenHashCache] = None):
+    hasher = artifact.get("hasher")
+    if hasher is None:
+        raise ValueError("artifact missing 'hasher'")
+
+    use_feature_cross = bool(artifact.get("use_feature_cross", False))
+    cross_pairs = artifact.get("cross_pairs")
+    predict_proba, row_scorer, _ = _build_scorer(artifact)
+    row = _row_hasher(hasher, use_feature_cross, cross_pairs, token_cache)
+
+    def predict_one(features: Dict[str, Any], timings: Optional[Dict[str, float]] = None) -> float:
+        """Click probability; stage durations are added to `timings` when given."""
+        # Fast path: dict -> hashed indices/signs, no DataFrame
+        hashed = row(features, timings=timings)
+        if hashed is not None:
+            t0 = time.perf_counter()
+            if row_scorer is not None:
+                proba = row_scorer(*hashed)
+            else:
+                proba = float(predict_proba(_rows_csr([hashed], hasher))[0])
+            lap(timings, "score", t0)
+            return proba
+
+        t0 = time.perf_counter()
         df = pd.DataFrame([features])
 
         tokens = to_feature_dict(
@@ -46,9 +389,117 @@ def build_predictor(artifact):
             add_feature_cross=use_feature_cross,
             cross_pairs=cross_pairs,
         )
+        t0 = lap(timings, "features", t0)
 
         X_h = hasher.transform(tokens)
+        t0 = lap(timings, "hash", t0)
 
-        return float(predict_proba(X_h)[0])
+        proba = float(predict_proba(X_h)[0])
+        lap(timings, "score", t0)
+        return proba
 
     return predict_one
+
+
+def build_batch_predictor(artifact, token_cache: Optional[TokenHashCache] = None):
+    """
+    Like `build_predictor`, for a list of feature dicts: the batch is hashed
+    as one matrix and scored with one `predict_proba` call. Row i gets the
+    same probability `predict_one(records[i])` returns.
+    """
+    hasher = artifact.get("hasher")
+    if hasher is None:
+        raise ValueError("artifact missing 'hasher'")
+
+    use_feature_cross = bool(artifact.get("use_feature_cross", False))
+    cross_pairs = artifact.get("cross_pairs")
+    predict_proba, _, _ = _build_scorer(artifact)
+    row = _row_hasher(hasher, use_feature_cross, cross_pairs, token_cache)
+
+    def predict_batch(records: List[Dict[str, Any]], timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+        if not records:
+            return np.empty(0, dtype=np.float64)
+        for i, features in enumerate(records):
+            if not any(c not in EXCLUDED_COLUMNS for c in features):
+                raise ValueError(f"features[{i}] has no feature columns")
+
+        X_h = _hash_records(records, hasher, use_feature_cross, cross_pairs, row, timings)
+        t0 = time.perf_counter()
+        probas = np.asarray(predict_proba(X_h), dtype=np.float64)
+        lap(timings, "score", t0)
+        return probas
+
+    return predict_batch
+
+
+def build_ranker(artifact, token_cache: Optional[TokenHashCache] = None):
+    """
+    Scores candidates that share one context (site/app/device/hour...).
+
+    `rank(context, candidates)` returns one probability per candidate, in
+    order, for the merged features `{**context, **candidate}`. For linear
+    ensembles the context keys no candidate overrides are hashed (with their
+    crosses) and dotted with W once; each candidate only adds its own tokens
+    and the crosses touching them. Results equal `predict_one` on the merged
+    dicts up to float rounding (~1e-15), since the dot product is split in
+    two sums. Other artifacts score the merged dicts as one batch.
+    """
+    hasher = artifact.get("hasher")
+    if hasher is None:
+        raise ValueError("artifact missing 'hasher'")
+
+    use_feature_cross = bool(artifact.get("use_feature_cross", False))
+    cross_pairs = artifact.get("cross_pairs")
+    predict_batch = build_batch_predictor(artifact, token_cache)
+    _, _, stacked = _build_scorer(artifact)
+    if hasher.dtype != np.float64:
+        stacked = None
+    row = _row_hasher(hasher, use_feature_cross, cross_pairs, token_cache)
+
+    def rank(
+        context: Dict[str, Any],
+        candidates: List[Dict[str, Any]],
+        timings: Optional[Dict[str, float]] = None,
+    ) -> np.ndarray:
+        if not candidates:
+            return np.empty(0, dtype=np.float64)
+        merged = [{**context, **c} for c in candidates]
+        if stacked is None:
+            return predict_batch(merged, timings)
+
+        overridden = {k for c in candidates for k in c}
+        shared = {k for k in context if k not in overridden and k not in EXCLUDED_COLUMNS}
+        # Shared keys a candidate key is crossed with; the rest of the context is not re-read
+        partners = set()
+        if use_feature_cross:
+            for a, b in cross_pairs if cross_pairs is not None else DEFAULT_CROSS_PAIRS:
+                if (a in shared) != (b in shared):
+                    partners.add(a if a in shared else b)
+        rows = []
+        for i, features in enumerate(merged):
+            if not any(c not in EXCLUDED_COLUMNS for c in features):
+                raise ValueError(f"candidates[{i}] has no feature columns")
+            own = {k: v for k, v in features.items() if k not in shared or k in partners}
+            hashed = row(own, skip_columns=shared, timings=timings)
+            if hashed is None:
+                if any(c not in EXCLUDED_COLUMNS for c in own):
+                    return predict_batch(merged, timings)  # non-scalar values
+                hashed = (np.empty(0, dtype=np.int32), np.empty(0))
+            rows.append(hashed)
+
+        offset = None
+        if shared:
+            context_row = row({k: context[k] for k in shared}, timings=timings)
+            if context_row is None:
+                return predict_batch(merged, timings)
+        t0 = time.perf_counter()
+        X_h = _rows_csr(rows, hasher)
+        t0 = lap(timings, "hash", t0)
+        if shared:
+            # Shared context's partial margins, computed once for every candidate
+            offset = np.asarray(_rows_csr([context_row], hasher) @ stacked.weights)[0]
+        probas = stacked.predict_proba(X_h, offset)
+        lap(timings, "score", t0)
+        return probas
+
+    return rank
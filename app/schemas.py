@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, Any
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
 
 
 class PredictRequest(BaseModel):
@@ -16,3 +16,43 @@ class PredictResponse(BaseModel):
     """
     click_probability: float
     click_prediction: int
+
+
+class BatchPredictRequest(BaseModel):
+    """
+    Several candidates scored in one call (e.g. every ad slot of a page view).
+    """
+    features: List[Dict[str, Any]]
+
+
+class BatchPredictResponse(BaseModel):
+    """
+    One prediction per input, in request order.
+    """
+    predictions: List[PredictResponse]
+
+
+class RankRequest(BaseModel):
+    """
+    Candidate ads of one page view: shared context (site_*, app_*, device_*,
+    hour, ...) plus the fields that differ per candidate. A candidate key
+    overrides the same context key.
+    """
+    context: Dict[str, Any]
+    candidates: List[Dict[str, Any]]
+    top_k: Optional[int] = Field(default=None, ge=1)
+
+
+class RankedCandidate(BaseModel):
+    """
+    `index` is the candidate's position in the request.
+    """
+    index: int
+    click_probability: float
+
+
+class RankResponse(BaseModel):
+    """
+    Candidates sorted by click probability (highest first), cut to top_k.
+    """
+    ranked: List[RankedCandidate]
@@ -0,0 +1,229 @@
+"""NDJSON bulk scoring: `/predict/stream` and the `python -m app.streaming` CLI.
+
+Input is one `/predict` request body per line (`{"features": {...}}`, e.g. a
+`requests.jsonl` traffic replay). Lines are scored in fixed-size batches with
+`build_batch_predictor` (one hashed matrix per batch) and written back as
+NDJSON as soon as each batch is done:
+
+  {"line": 1, "click_probability": 0.12, "click_prediction": 0}
+  {"line": 2, "error": "..."}
+
+`line` is the 1-based input line; `id` is echoed when the features carry
+one. Only the current batch and one partial input line are held in memory,
+whatever the input size; a line longer than `max_line_bytes` is not buffered
+but answered with an error record. A malformed line yields an error record
+instead of failing the stream. JSON decoding and scoring run in the
+threadpool, so the event loop only splits lines.
+
+Usage: python -m app.streaming --input requests.jsonl --output scores.jsonl [--batch-size 1024]
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+DEFAULT_BATCH_SIZE = 1024
+# /predict bodies are a few hundred bytes; longer lines are rejected unread
+DEFAULT_MAX_LINE_BYTES = 64 * 1024
+
+# (1-based line number, parsed features or None, error message or None)
+_Parsed = Tuple[int, Any, Any]
+
+
+def _parse(line_no: int, line: bytes) -> _Parsed:
+    try:
+        body = json.loads(line)
+    except ValueError as e:
+        return line_no, None, f"invalid JSON: {e}"
+    features = body.get("features") if isinstance(body, dict) else None
+    if not isinstance(features, dict):
+        return line_no, None, 'expected a request body {"features": {...}}'
+    return line_no, features, None
+
+
+def _result(line_no: int, features: Dict[str, Any], proba: float, threshold: float) -> dict:
+    out = {"line": line_no}
+    if "id" in features:
+        out["id"] = features["id"]
+    out["click_probability"] = float(proba)
+    out["click_prediction"] = 1 if proba >= threshold else 0
+    return out
+
+
+def _too_long(line_no: int, max_line_bytes: int) -> _Parsed:
+    return line_no, None, f"line exceeds {max_line_bytes} bytes"
+
+
+def score_lines(
+    lines: List[Tuple[int, Any]],
+    predict_batch: Callable,
+    threshold: float = 0.5,
+    max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+) -> str:
+    """`score_batch` of raw `(line number, bytes)` lines; None (or an overlong line) is an error record."""
+    parsed = [
+        _parse(n, line) if line is not None and len(line) <= max_line_bytes else _too_long(n, max_line_bytes)
+        for n, line in lines
+    ]
+    return score_batch(parsed, predict_batch, threshold)
+
+
+def score_batch(
+    parsed: List[_Parsed],
+    predict_batch: Callable[[List[Dict[str, Any]]], Any],
+    threshold: float = 0.5,
+) -> str:
+    """NDJSON output lines (joined, newline-terminated) for one parsed batch, in input order."""
+    valid = [(n, f) for n, f, err in parsed if err is None]
+    results: Dict[int, dict] = {}
+    if valid:
+        try:
+            probas = predict_batch([f for _, f in valid])
+            for (n, f), p in zip(valid, probas):
+                results[n] = _result(n, f, p, threshold)
+        except Exception:
+            # One bad row fails the batch; score row by row so only it reports the error
+            for n, f in valid:
+                try:
+                    results[n] = _result(n, f, predict_batch([f])[0], threshold)
+                except Exception as e:
+                    results[n] = {"line": n, "error": str(e)}
+    lines = []
+    for n, _, err in parsed:
+        record = results[n] if err is None else {"line": n, "error": err}
+        lines.append(json.dumps(record))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def iter_scored(
+    lines: Iterable[bytes],
+    predict_batch: Callable,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    threshold: float = 0.5,
+    max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+) -> Iterator[str]:
+    """Score an iterable of input lines; yields one NDJSON chunk per batch."""
+    batch: List[Tuple[int, Any]] = []
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        batch.append((line_no, line))
+        if len(batch) >= batch_size:
+            yield score_lines(batch, predict_batch, threshold, max_line_bytes)
+            batch = []
+    if batch:
+        yield score_lines(batch, predict_batch, threshold, max_line_bytes)
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Any]:
+    """
+    Lines of a chunked body (without the newline); None for a line longer than
+    `max_line_bytes`, whose bytes are skipped instead of buffered. Each chunk
+    is scanned once, so a long line costs linear time.
+    """
+    parts: List[bytes] = []
+    size = 0
+    overlong = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            size += end - start
+            if overlong or size > max_line_bytes:
+                yield None
+            else:
+                parts.append(chunk[start:end])
+                yield b"".join(parts)
+            parts, size, overlong = [], 0, False
+            start = end + 1
+        if start < len(chunk) and not overlong:
+            size += len(chunk) - start
+            if size > max_line_bytes:
+                parts, overlong = [], True
+            else:
+                parts.append(chunk[start:])
+    if overlong:
+        yield None
+    elif parts:
+        yield b"".join(parts)
+
+
+async def aiter_scored(
+    chunks: AsyncIterator[bytes],
+    predict_batch: Callable,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    threshold: float = 0.5,
+    max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+) -> AsyncIterator[str]:
+    """`iter_scored` for a request body stream; batches are parsed and scored in the threadpool."""
+    batch: List[Tuple[int, Any]] = []
+    line_no = 0
+    async for line in _iter_lines(chunks, max_line_bytes):
+        line_no += 1
+        if line is not None and not line.strip():
+            continue
+        batch.append((line_no, line))
+        if len(batch) >= batch_size:
+            yield await run_in_threadpool(score_lines, batch, predict_batch, threshold, max_line_bytes)
+            batch = []
+    if batch:
+        yield await run_in_threadpool(score_lines, batch, predict_batch, threshold, max_line_bytes)
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator reads the request body.
+
+    Under ASGI < 2.4 Starlette runs a disconnect listener that calls
+    `receive()` alongside the body generator and would swallow the request
+    body chunks, so the input stream never ends. Here the generator is the
+    only reader; a client disconnect surfaces through `request.stream()`.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+def main():
+    from .model_loader import load_artifact
+    from .predictor import build_batch_predictor
+
+    parser = argparse.ArgumentParser(description="Score an NDJSON file of /predict request bodies")
+    parser.add_argument("--input", default="-", help="NDJSON input ('-' = stdin)")
+    parser.add_argument("--output", default="-", help="NDJSON output ('-' = stdout)")
+    parser.add_argument("--artifact", default=None, help="Model artifact (default: MODEL_PATH)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--max-line-bytes", type=int, default=DEFAULT_MAX_LINE_BYTES)
+    args = parser.parse_args()
+
+    if args.artifact:
+        os.environ["MODEL_PATH"] = args.artifact
+    predict_batch = build_batch_predictor(load_artifact())
+
+    src = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for chunk in iter_scored(src, predict_batch, args.batch_size, args.threshold, args.max_line_bytes):
+            dst.write(chunk)
+    finally:
+        if src is not sys.stdin.buffer:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+
+if __name__ == "__main__":
+    main()
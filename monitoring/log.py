@@ -17,3 +17,32 @@ def log_prediction(prediction, proba=None, y_true=None):
     with open(LOG_PATH, "a", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow([ts, prediction, proba, y_true])
+
+def append_rows(rows):
+    """Append many `[timestamp, prediction, proba, y_true]` rows with one open/write."""
+    ensure_file()
+    with open(LOG_PATH, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerows(rows)
+
+def log_predictions(predictions, probas=None, y_true=None):
+    """
+    Bulk `log_prediction`: one row per element of `predictions` (lists or
+    numpy arrays), written with a single open/write and one timestamp.
+    `probas` / `y_true` may be None (empty column) or match in length.
+    """
+    predictions = _as_list(predictions)
+    n = len(predictions)
+    probas = _as_list(probas, n, "probas")
+    y_true = _as_list(y_true, n, "y_true")
+    ts = datetime.now().isoformat(timespec="seconds")
+    append_rows([ts, p, pr, y] for p, pr, y in zip(predictions, probas, y_true))
+
+def _as_list(values, n=None, name=None):
+    if values is None:
+        return [None] * n
+    # numpy arrays -> Python ints/floats, written exactly like log_prediction's values
+    values = values.tolist() if hasattr(values, "tolist") else list(values)
+    if n is not None and len(values) != n:
+        raise ValueError(f"{name} has {len(values)} values, predictions has {n}")
+    return values
@@ -0,0 +1,74 @@
+"""Featurization throughput benchmark on real `data/train.gz` chunks.
+
+Compares the per-row reference path (`to_feature_dict` + `FeatureHasher`)
+with the columnar `hash_features` engine, with and without factorization,
+and checks that all paths produce the same CSR matrix.
+
+Usage: python scripts/bench_featurize.py --rows 200000 --chunks 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import pandas as pd  # noqa: E402
+from sklearn.feature_extraction import FeatureHasher  # noqa: E402
+
+from feature_utils import hash_features, to_feature_dict  # noqa: E402
+
+
+def _same(a, b) -> bool:
+    return (
+        a.shape == b.shape
+        and (a.indptr == b.indptr).all()
+        and (a.indices == b.indices).all()
+        and (a.data == b.data).all()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="data/train.gz")
+    parser.add_argument("--rows", type=int, default=200_000, help="rows per chunk")
+    parser.add_argument("--chunks", type=int, default=3)
+    parser.add_argument("--hash-n-features", type=int, default=2**20)
+    parser.add_argument("--disable-feature-cross", action="store_true")
+    parser.add_argument("--skip-reference", action="store_true", help="skip the slow per-row dict path")
+    args = parser.parse_args()
+
+    cross = not args.disable_feature_cross
+    hasher = FeatureHasher(n_features=args.hash_n_features, input_type="dict")
+    paths = {
+        "columnar": lambda df: hash_features(df, args.hash_n_features, add_feature_cross=cross),
+        "factorized": lambda df: hash_features(df, args.hash_n_features, add_feature_cross=cross, factorize=True),
+    }
+    if not args.skip_reference:
+        paths = {"dict+FeatureHasher": lambda df: hasher.transform(to_feature_dict(df, add_feature_cross=cross)), **paths}
+
+    totals = {name: 0.0 for name in paths}
+    rows = 0
+    reader = pd.read_csv(args.data_path, compression="gzip", chunksize=args.rows)
+    for i, chunk in enumerate(reader):
+        if i >= args.chunks:
+            break
+        outputs = {}
+        for name, fn in paths.items():
+            t0 = time.perf_counter()
+            outputs[name] = fn(chunk)
+            totals[name] += time.perf_counter() - t0
+        first = next(iter(outputs.values()))
+        if not all(_same(first, X) for X in outputs.values()):
+            raise AssertionError(f"featurization paths disagree on chunk {i}")
+        rows += len(chunk)
+
+    base = next(iter(totals.values()))
+    print(f"rows: {rows}  hash_n_features: {args.hash_n_features}  feature_cross: {cross}")
+    for name, secs in totals.items():
+        print(f"{name:>20}: {rows / secs:>12,.0f} rows/s  ({secs:.2f}s, x{base / secs:.2f})")
+
+
+if __name__ == "__main__":
+    main()
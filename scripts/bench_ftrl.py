@@ -0,0 +1,83 @@
+"""FTRL-Proximal vs bagging SGD on real `data/train.gz` chunks.
+
+Trains both learners on the same hashed chunks (progressive order, like
+`train_streaming.py`), then scores the chunks right after the training
+range. Reports training rows/s, validation AUC / logloss and how many
+hashed weights are non-zero.
+
+Usage: python scripts/bench_ftrl.py --rows 200000 --train-chunks 5 --val-chunks 1
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import numpy as np  # noqa: E402
+from sklearn.linear_model import SGDClassifier  # noqa: E402
+from sklearn.metrics import log_loss, roc_auc_score  # noqa: E402
+
+from feature_utils import hash_features  # noqa: E402
+from ftrl import FTRLProximal  # noqa: E402
+from ingest import iter_chunks  # noqa: E402
+from linear_ensemble import StackedLinearEnsemble  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="data/train.gz")
+    parser.add_argument("--rows", type=int, default=200_000, help="rows per chunk")
+    parser.add_argument("--train-chunks", type=int, default=5)
+    parser.add_argument("--val-chunks", type=int, default=1)
+    parser.add_argument("--hash-n-features", type=int, default=2**20)
+    parser.add_argument("--n-estimators", type=int, default=5)
+    parser.add_argument("--ftrl-alpha", type=float, default=0.05)
+    parser.add_argument("--ftrl-l1", type=float, default=1.0)
+    parser.add_argument("--ftrl-l2", type=float, default=1.0)
+    args = parser.parse_args()
+
+    learners = {
+        "bagging_sgd": [
+            SGDClassifier(loss="log_loss", penalty="l2", alpha=1e-6, random_state=42 + i)
+            for i in range(args.n_estimators)
+        ],
+        "ftrl": [FTRLProximal(args.hash_n_features, alpha=args.ftrl_alpha, l1=args.ftrl_l1, l2=args.ftrl_l2)],
+    }
+    fit_secs = {name: 0.0 for name in learners}
+    classes = np.array([0, 1])
+    train_rows = 0
+    val_y, val_X = [], []
+
+    for i, chunk in enumerate(iter_chunks(args.data_path, args.rows)):
+        if i >= args.train_chunks + args.val_chunks:
+            break
+        X = hash_features(chunk, args.hash_n_features, factorize=True)
+        y = chunk["click"].astype(int).to_numpy()
+        if i >= args.train_chunks:
+            val_X.append(X)
+            val_y.append(y)
+            continue
+        for name, models in learners.items():
+            t0 = time.perf_counter()
+            for m in models:
+                m.partial_fit(X, y, classes=classes)
+            fit_secs[name] += time.perf_counter() - t0
+        train_rows += len(y)
+
+    y_val = np.concatenate(val_y)
+    print(f"train_rows: {train_rows}  val_rows: {len(y_val)}  hash_n_features: {args.hash_n_features}")
+    for name, models in learners.items():
+        scorer = StackedLinearEnsemble.from_models(models)
+        proba = np.concatenate([scorer.predict_proba(X) for X in val_X])
+        nonzero = int(np.count_nonzero(scorer.weights))
+        print(
+            f"{name:>12}: {train_rows / fit_secs[name]:>10,.0f} rows/s  "
+            f"auc={roc_auc_score(y_val, proba):.4f}  logloss={log_loss(y_val, proba):.4f}  "
+            f"nonzero_weights={nonzero}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Single-request latency: pandas path vs the dict fast path in `build_predictor`.
+
+Reads `--requests` rows from the data file as request dicts and scores each
+one with
+- the pandas path: one-row DataFrame -> to_feature_dict -> hasher.transform
+  -> stacked predict_proba (what `predict_one` did before), and
+- `build_predictor(artifact)`, which hashes the dict directly and dots the
+  hashed indices with W.
+Reports p50 / p99 latency per request and the largest probability difference
+(expected 0.0).
+
+Usage: python scripts/bench_predictor.py --artifact models/ctr_model_hashing.joblib --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from app.model_loader import load_artifact  # noqa: E402
+from app.predictor import build_predictor  # noqa: E402
+from feature_utils import to_feature_dict  # noqa: E402
+from ingest import read_rows  # noqa: E402
+from linear_ensemble import from_artifact  # noqa: E402
+
+
+def _timed(fn, requests):
+    out, times = [], []
+    for features in requests:
+        t0 = time.perf_counter()
+        out.append(fn(features))
+        times.append(time.perf_counter() - t0)
+    return np.array(out), np.array(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--artifact", default="models/ctr_model_hashing.joblib")
+    parser.add_argument("--data-path", default="data/train.gz")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ["MODEL_PATH"] = args.artifact
+    artifact = load_artifact()
+    stacked = from_artifact(artifact)
+    if stacked is None:
+        raise SystemExit("artifact is not a linear ensemble; the fast path does not apply")
+    hasher = artifact["hasher"]
+    use_feature_cross = bool(artifact.get("use_feature_cross", False))
+    cross_pairs = artifact.get("cross_pairs")
+
+    df = read_rows(args.data_path, args.requests).drop(columns=["id", "click"], errors="ignore")
+    requests = df.to_dict(orient="records")
+
+    def pandas_path(features):
+        tokens = to_feature_dict(pd.DataFrame([features]), add_feature_cross=use_feature_cross, cross_pairs=cross_pairs)
+        return float(stacked.predict_proba(hasher.transform(tokens))[0])
+
+    fast = build_predictor(artifact)
+    fast(requests[0])
+    pandas_path(requests[0])
+
+    p_slow, t_slow = _timed(pandas_path, requests)
+    p_fast, t_fast = _timed(fast, requests)
+    print(f"requests={len(requests)} weights={stacked.weights.shape}")
+    for name, t in (("pandas", t_slow), ("fast", t_fast)):
+        print(f"{name:>7}: p50={np.percentile(t, 50):8.1f}us p99={np.percentile(t, 99):8.1f}us")
+    print(f"max |p_fast - p_pandas| = {np.abs(p_fast - p_slow).max():.3g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Background checkpoint writer for the streaming trainer.
+
+Checkpoint serialization (`joblib.dump` of every member + hasher) and the
+MLflow upload of that file run on one writer thread, so training only pays
+for snapshotting the models. The queue is bounded: when `max_pending`
+checkpoints are already waiting, `submit` blocks instead of piling up
+copies of the ensemble in memory.
+
+Every file is written to a temporary name, fsynced and then renamed over
+the target (`os.replace` is atomic), so a crash never leaves a truncated
+checkpoint behind; readers see either the previous file or the new one.
+"""
+import os
+import queue
+import threading
+from typing import Callable, Optional
+
+import joblib
+
+_STOP = object()
+
+
+def atomic_dump(obj, path: str):
+    """`joblib.dump(obj, path)` that never exposes a partially written file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        joblib.dump(obj, tmp)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class BackgroundWriter:
+    """Runs submitted jobs in order on one thread; `max_pending` = 0 runs them inline."""
+
+    def __init__(self, max_pending: int = 2):
+        self._inline = max_pending <= 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max(max_pending, 1))
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        if not self._inline:
+            self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                fn, args = job
+                if self._error is None:
+                    fn(*args)
+            except BaseException as exc:  # surfaced to the training thread on the next submit/flush
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("background checkpoint write failed") from error
+
+    def submit(self, fn: Callable, *args):
+        self._raise_error()
+        if self._inline:
+            fn(*args)
+            return
+        self._queue.put((fn, args))
+
+    def flush(self):
+        """Block until every submitted job has finished."""
+        if not self._inline:
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Flush, stop the thread and re-raise a failed write."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._raise_error()
@@ -0,0 +1,172 @@
+"""Compact checkpoints: float32 weights, optional sparse deltas, retention.
+
+The pickle format stores every member object with its float64 weight
+vectors on each checkpoint. The compact format splits each member into
+- a small "skeleton" (the object without its large arrays: params, t_,
+  classes_, intercept_, ...), pickled as before, and
+- its large arrays (`coef_` for SGD, `z` / `n` for FTRL) cast to float32.
+
+Between full checkpoints (every `full_every`-th one) arrays are stored as
+sparse deltas against the last full checkpoint: only the positions whose
+float32 value changed. A delta falls back to the full array when it would
+not be smaller (SGD with L2 rescales every non-zero weight each step, so
+this mostly pays off for FTRL, which only touches the coordinates it saw).
+
+Resuming rebuilds working members with float64 arrays; weights carry
+float32 rounding (~1e-7 relative), so resumed runs are close to, not
+bit-identical with, an uninterrupted run. Use the pickle format when exact
+resume matters.
+
+Every full checkpoint gets a random `base_id`; deltas record it next to
+`base`, and loading a delta fails if the file now at that name (e.g. rewritten
+by a later run reusing `ckpt_chunk_N`) has another id.
+
+Retention (`keep` > 0) deletes the oldest checkpoints written by this run,
+never a full checkpoint that a kept delta still points at.
+"""
+import copy
+import os
+import threading
+import uuid
+from typing import Optional
+
+import joblib
+import numpy as np
+
+from checkpoint_writer import atomic_dump
+
+CHECKPOINT_FORMATS = ("pickle", "compact")
+COMPACT_FORMAT = "compact-v1"
+# Arrays at least this large are split out of the member objects
+_MIN_SPLIT_SIZE = 1024
+
+
+def split_member(member) -> tuple[object, dict[str, np.ndarray]]:
+    """(deep-copied member without its large arrays, {attribute: array})."""
+    arrays = {
+        name: value
+        for name, value in vars(member).items()
+        if isinstance(value, np.ndarray) and value.size >= _MIN_SPLIT_SIZE
+    }
+    skeleton = copy.copy(member)
+    for name in arrays:
+        delattr(skeleton, name)
+    return copy.deepcopy(skeleton), arrays
+
+
+def _encode(current: np.ndarray, base: Optional[np.ndarray]) -> dict:
+    if base is not None and base.shape == current.shape:
+        changed = np.flatnonzero(current.ravel() != base.ravel()).astype(np.int32)
+        # indices + values cost 8 bytes per entry vs 4 for the dense array
+        if 2 * len(changed) < current.size:
+            return {"indices": changed, "values": current.ravel()[changed], "shape": current.shape}
+    return {"full": current}
+
+
+class CheckpointManager:
+    """
+    Builds checkpoint payloads (`snapshot`, training thread) and writes them
+    (`write`, safe to call from the background writer).
+    """
+
+    def __init__(self, fmt: str = "pickle", full_every: int = 5, keep: int = 0):
+        if fmt not in CHECKPOINT_FORMATS:
+            raise ValueError(f"Unknown checkpoint format: {fmt}. Expected one of {CHECKPOINT_FORMATS}")
+        self.fmt = fmt
+        self.full_every = max(int(full_every), 1)
+        self.keep = int(keep)
+        self._count = 0
+        self._base_name: Optional[str] = None
+        self._base_id: Optional[str] = None
+        self._base_arrays: list[dict[str, np.ndarray]] = []
+        self._written: list[tuple[str, Optional[str]]] = []
+        self._lock = threading.Lock()
+
+    def snapshot(self, path: str, models: list, meta: dict) -> dict:
+        """Checkpoint payload for `models` + `meta`; a copy that training may not mutate."""
+        if self.fmt == "pickle":
+            return {**meta, "models": copy.deepcopy(models)}
+
+        full = self._count % self.full_every == 0 or self._base_name is None
+        self._count += 1
+        members, arrays, dtypes = [], [], []
+        for m in models:
+            skeleton, big = split_member(m)
+            members.append(skeleton)
+            arrays.append({name: a.astype(np.float32) for name, a in big.items()})
+            dtypes.append({name: str(a.dtype) for name, a in big.items()})
+
+        if full:
+            encoded = [{name: {"full": a} for name, a in member.items()} for member in arrays]
+            self._base_name = os.path.basename(path)
+            self._base_id = uuid.uuid4().hex
+            self._base_arrays = arrays
+        else:
+            encoded = [
+                {name: _encode(a, base.get(name)) for name, a in member.items()}
+                for member, base in zip(arrays, self._base_arrays)
+            ]
+        return {
+            **meta,
+            "format": COMPACT_FORMAT,
+            "members": members,
+            "arrays": encoded,
+            "dtypes": dtypes,
+            "base": None if full else self._base_name,
+            # A full checkpoint's own id; for a delta, the id of the full checkpoint it needs
+            "base_id": self._base_id,
+        }
+
+    def write(self, path: str, state: dict):
+        atomic_dump(state, path)
+        base = state.get("base")
+        with self._lock:
+            self._written.append((path, os.path.join(os.path.dirname(path), base) if base else None))
+            self._prune()
+
+    def _prune(self):
+        if self.keep <= 0 or len(self._written) <= self.keep:
+            return
+        kept = self._written[-self.keep :]
+        needed = {p for p, _ in kept} | {b for _, b in kept if b}
+        remaining = []
+        for p, b in self._written[: -self.keep]:
+            if p in needed:
+                remaining.append((p, b))
+            elif os.path.exists(p):
+                os.remove(p)
+        self._written = remaining + kept
+
+
+def _decode(entry: dict, base: Optional[dict], name: str) -> np.ndarray:
+    if "full" in entry:
+        return entry["full"]
+    if base is None:
+        raise ValueError(f"delta checkpoint for '{name}' but its base checkpoint is missing")
+    values = base[name]["full"].ravel().copy()
+    values[entry["indices"]] = entry["values"]
+    return values.reshape(entry["shape"])
+
+
+def load_models(state: dict, path: str) -> list:
+    """Working members from a compact checkpoint (reads its base file for deltas)."""
+    base_arrays = None
+    if state.get("base"):
+        base_path = os.path.join(os.path.dirname(path), state["base"])
+        base_state = joblib.load(base_path)
+        if state.get("base_id") is not None and base_state.get("base_id") != state["base_id"]:
+            raise ValueError(
+                f"delta checkpoint {path} needs base {state['base']} with id {state['base_id']}, "
+                f"but {base_path} has id {base_state.get('base_id')} (overwritten by another run?)"
+            )
+        base_arrays = base_state["arrays"]
+
+    models = []
+    for j, skeleton in enumerate(state["members"]):
+        member = copy.deepcopy(skeleton)
+        for name, entry in state["arrays"][j].items():
+            base = base_arrays[j] if base_arrays is not None else None
+            values = _decode(entry, base, name)
+            setattr(member, name, values.astype(state["dtypes"][j][name]))
+        models.append(member)
+    return models
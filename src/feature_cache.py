@@ -0,0 +1,221 @@
+"""Persistent hashed-feature cache for `data/train.gz`.
+
+One-time "materialize" step: the gzip CSV is parsed and hashed once and the
+result is written as flat binary arrays (one CSR matrix for the whole file
+plus labels). Trainers then open the cache memory-mapped and slice chunks
+out of it, so repeated runs skip decompression, CSV parsing and hashing.
+
+The cache directory is keyed by a fingerprint of the data file and the
+featurization config (hash_n_features, use_feature_cross, cross_list), so a
+config change never reads stale features.
+
+Usage: python src/feature_cache.py --data-path data/train.gz --hash-n-features 1048576
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from feature_utils import DEFAULT_CROSS_PAIRS, CrossPair, hash_features, parse_cross_list
+from ingest import INGEST_BACKENDS, iter_chunks
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_ROOT = "data/feature_cache"
+MANIFEST_NAME = "manifest.json"
+
+_FINGERPRINT_SAMPLE_BYTES = 1 << 20
+
+
+def data_fingerprint(path: str) -> dict:
+    """Size + mtime + sha1 of the first/last MB: cheap, but catches replaced files."""
+    st = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_SAMPLE_BYTES))
+        if st.st_size > _FINGERPRINT_SAMPLE_BYTES:
+            f.seek(max(st.st_size - _FINGERPRINT_SAMPLE_BYTES, _FINGERPRINT_SAMPLE_BYTES))
+            digest.update(f.read())
+    return {"size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns), "sha1": digest.hexdigest()}
+
+
+def cache_key(
+    data_path: str,
+    hash_n_features: int,
+    use_feature_cross: bool,
+    cross_list: Optional[list[CrossPair]],
+) -> str:
+    # None, hash_features'taki gibi varsayılan cross'lar demek: aynı anahtar
+    if cross_list is None:
+        cross_list = DEFAULT_CROSS_PAIRS
+    payload = {
+        "version": CACHE_FORMAT_VERSION,
+        "data": data_fingerprint(data_path),
+        "hash_n_features": int(hash_n_features),
+        "use_feature_cross": bool(use_feature_cross),
+        "cross_list": [list(p) for p in cross_list],
+    }
+    raw = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+class FeatureCache:
+    """Read-only, memory-mapped view of a materialized cache directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.n_rows = int(self.manifest["n_rows"])
+        self.n_features = int(self.manifest["hash_n_features"])
+        nnz = int(self.manifest["nnz"])
+        self.indptr = self._open("indptr", np.int64, self.n_rows + 1)
+        self.indices = self._open("indices", np.int32, nnz)
+        self.data = self._open("data", np.dtype(self.manifest["data_dtype"]), nnz)
+        self.labels = self._open("labels", np.int8, self.n_rows)
+
+    def _open(self, name: str, dtype, count: int) -> np.ndarray:
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=dtype, mode="r", shape=(count,))
+
+    def slice(self, start: int, stop: int, dtype=np.float64) -> tuple[sp.csr_matrix, np.ndarray]:
+        """Rows [start, stop) as (CSR matrix, int labels)."""
+        stop = min(stop, self.n_rows)
+        start = min(start, stop)
+        lo = int(self.indptr[start])
+        hi = int(self.indptr[stop])
+        indptr = np.asarray(self.indptr[start : stop + 1]) - lo
+        X = sp.csr_matrix(
+            (np.asarray(self.data[lo:hi], dtype=dtype), np.asarray(self.indices[lo:hi]), indptr),
+            shape=(stop - start, self.n_features),
+        )
+        y = np.asarray(self.labels[start:stop], dtype=int)
+        return X, y
+
+    def iter_chunks(
+        self, chunk_size: int, start_row: int = 0, stop_row: Optional[int] = None
+    ) -> Iterator[tuple[sp.csr_matrix, np.ndarray]]:
+        stop = self.n_rows if stop_row is None else min(stop_row, self.n_rows)
+        for start in range(start_row, stop, chunk_size):
+            yield self.slice(start, min(start + chunk_size, stop))
+
+
+def materialize(
+    data_path: str,
+    hash_n_features: int,
+    use_feature_cross: bool,
+    cross_list: Optional[list[CrossPair]],
+    cache_root: str = DEFAULT_CACHE_ROOT,
+    chunk_size: int = 200_000,
+    ingest: str = "pandas",
+) -> str:
+    """Parse + hash `data_path` once and write the cache; returns the cache dir."""
+    if cross_list is None:
+        cross_list = list(DEFAULT_CROSS_PAIRS)
+    key = cache_key(data_path, hash_n_features, use_feature_cross, cross_list)
+    final_dir = os.path.join(cache_root, key)
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    start = time.time()
+    n_rows = 0
+    nnz = 0
+    data_dtype = None
+    files = {name: open(os.path.join(tmp_dir, f"{name}.bin"), "wb") for name in ("indptr", "indices", "data", "labels")}
+    try:
+        files["indptr"].write(np.zeros(1, dtype=np.int64).tobytes())
+        for chunk in iter_chunks(data_path, chunk_size, ingest):
+            X = hash_features(
+                chunk,
+                n_features=hash_n_features,
+                add_feature_cross=use_feature_cross,
+                cross_pairs=cross_list,
+                factorize=True,
+            )
+            if data_dtype is None:
+                # Values are summed +/-1 per row: int8 is exact while a row has <= 127 tokens
+                data_dtype = np.int8 if chunk.shape[1] + len(cross_list) <= 127 else np.float64
+            files["indptr"].write((X.indptr[1:].astype(np.int64) + nnz).tobytes())
+            files["indices"].write(X.indices.astype(np.int32, copy=False).tobytes())
+            files["data"].write(X.data.astype(data_dtype).tobytes())
+            files["labels"].write(chunk["click"].to_numpy().astype(np.int8).tobytes())
+            n_rows += X.shape[0]
+            nnz += X.nnz
+    finally:
+        for f in files.values():
+            f.close()
+
+    manifest = {
+        "version": CACHE_FORMAT_VERSION,
+        "data_path": os.path.abspath(data_path),
+        "data_fingerprint": data_fingerprint(data_path),
+        "hash_n_features": int(hash_n_features),
+        "use_feature_cross": bool(use_feature_cross),
+        "cross_list": [list(p) for p in cross_list],
+        "n_rows": int(n_rows),
+        "nnz": int(nnz),
+        "data_dtype": np.dtype(data_dtype or np.int8).name,
+        "materialize_seconds": float(time.time() - start),
+    }
+    # manifest en son yazılır; rename atomik -> yarım cache asla görünmez
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    return final_dir
+
+
+def open_cache(
+    data_path: str,
+    hash_n_features: int,
+    use_feature_cross: bool,
+    cross_list: Optional[list[CrossPair]],
+    cache_root: str = DEFAULT_CACHE_ROOT,
+    materialize_if_missing: bool = True,
+    ingest: str = "pandas",
+) -> Optional[FeatureCache]:
+    """Open the cache for this data + featurization config, materializing it once if needed."""
+    key = cache_key(data_path, hash_n_features, use_feature_cross, cross_list)
+    path = os.path.join(cache_root, key)
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        if not materialize_if_missing:
+            return None
+        print(f"Feature cache miss -> materializing {data_path} into {path}")
+        materialize(data_path, hash_n_features, use_feature_cross, cross_list, cache_root, ingest=ingest)
+    return FeatureCache(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default=os.getenv("AVAZU_TRAIN_GZ", "data/train.gz"))
+    parser.add_argument("--hash-n-features", type=int, default=int(os.getenv("HASH_N_FEATURES", 2**20)))
+    parser.add_argument("--disable-feature-cross", action="store_true")
+    parser.add_argument("--cross-list", default=os.getenv("CROSS_LIST", ""))
+    parser.add_argument("--cache-dir", default=os.getenv("FEATURE_CACHE_DIR", DEFAULT_CACHE_ROOT))
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.add_argument("--ingest", choices=INGEST_BACKENDS, default=os.getenv("INGEST_BACKEND", "pandas"))
+    args = parser.parse_args()
+
+    path = materialize(
+        args.data_path,
+        args.hash_n_features,
+        not args.disable_feature_cross,
+        parse_cross_list(args.cross_list),
+        cache_root=args.cache_dir,
+        chunk_size=args.chunk_size,
+        ingest=args.ingest,
+    )
+    cache = FeatureCache(path)
+    print(f"Feature cache written: {path}")
+    print(f"rows: {cache.n_rows}  nnz: {cache.indices.shape[0]}  seconds: {cache.manifest['materialize_seconds']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,43 @@
+import numpy as np
 import pandas as pd
-from typing import Iterable, Optional
+import scipy.sparse as sp
+from sklearn.utils import murmurhash3_32
+from typing import Iterable, Optional, Sequence
 
 TokenDict = dict[str, int]
 CrossPair = tuple[str, str]
 
+EXCLUDED_COLUMNS = frozenset({"id", "click"})
+DEFAULT_CROSS_PAIRS: list[CrossPair] = [
+    ("site_id", "app_id"),
+    ("site_domain", "app_domain"),
+    ("device_type", "device_conn_type"),
+]
 
-def _escape_token_part(value: object) -> str:
+
+def parse_cross_list(raw: Optional[str]) -> list[CrossPair]:
+    """Parse a "colA:colB,colC:colD" CLI value; empty means DEFAULT_CROSS_PAIRS."""
+    if not raw:
+        return list(DEFAULT_CROSS_PAIRS)
+    pairs: list[CrossPair] = []
+    for item in raw.split(","):
+        parts = item.strip().split(":")
+        if len(parts) != 2:
+            raise ValueError(f"Invalid cross pair: {item}. Expected format colA:colB")
+        pairs.append((parts[0], parts[1]))
+    return pairs
+
+
+def escape_token_part(value: object) -> str:
     # Token separator güvenliği: '=' ve '|' gibi ayraçları kaçır
     s = str(value)
     return s.replace("|", "%7C").replace("=", "%3D")
 
 
+# Eski isim (private), mevcut import'lar kırılmasın diye
+_escape_token_part = escape_token_part
+
+
 def to_feature_dict(
     df: pd.DataFrame,
     add_feature_cross: bool = True,
@@ -29,15 +56,10 @@ def to_feature_dict(
     - Missing değerler (NaN/None) varsayılan olarak token üretilmeden atlanır.
     - cross_pairs verilmezse varsayılan 3 cross uygulanır.
     """
-    excluded = {"id", "click"}
-    feature_cols = [c for c in df.columns if c not in excluded]
+    feature_cols = [c for c in df.columns if c not in EXCLUDED_COLUMNS]
 
     if cross_pairs is None:
-        cross_pairs = [
-            ("site_id", "app_id"),
-            ("site_domain", "app_domain"),
-            ("device_type", "device_conn_type"),
-        ]
+        cross_pairs = DEFAULT_CROSS_PAIRS
 
     # Kolon index map’ini bir kez çıkar (performans)
     col_index = {c: i for i, c in enumerate(feature_cols)}
@@ -61,7 +83,7 @@ def to_feature_dict(
             val = row[idx]
             if skip_missing and pd.isna(val):
                 continue
-            feats[f"{col}={_escape_token_part(val)}"] = 1
+            feats[f"{col}={escape_token_part(val)}"] = 1
 
         # Cross tokens
         if add_feature_cross and active_cross_pairs:
@@ -71,7 +93,7 @@ def to_feature_dict(
                 if skip_missing and (pd.isna(va) or pd.isna(vb)):
                     continue
                 feats[
-                    f"cross:{a}={_escape_token_part(va)}|{b}={_escape_token_part(vb)}"
+                    f"cross:{a}={escape_token_part(va)}|{b}={escape_token_part(vb)}"
                 ] = 1
 
         dicts.append(feats)
@@ -79,4 +101,424 @@ def to_feature_dict(
     return dicts
 
 
+# Tek satırlık (API request) dict'lerde DataFrame kurmadan token üretimi için
+# desteklenen değer tipleri; bunlarda str(value) pandas'ın itertuples çıktısıyla aynı
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def is_missing_scalar(value: object) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def record_tokens(
+    record: dict,
+    add_feature_cross: bool = True,
+    cross_pairs: Optional[Iterable[CrossPair]] = None,
+    skip_missing: bool = True,
+    skip_columns: Optional[set] = None,
+) -> Optional[list[str]]:
+    """
+    Tek kayıt için token listesi, `to_feature_dict(pd.DataFrame([record]))`
+    ile aynı tokenlar (aynı sırada, tekrarsız), DataFrame kurmadan.
+
+    Değerlerden biri str/int/float/bool/None değilse None döner; çağıran
+    taraf pandas yoluna düşmeli (pandas o tiplerde farklı dtype çıkarabilir).
+    Feature kolonu hiç yoksa da None döner: to_feature_dict orada satır
+    üretmez.
+
+    skip_columns: bu kolonların base tokenları ve iki tarafı da bu kümede
+    olan cross'lar atlanır (ortak context'in tokenları ayrıca hashlenmişse).
+    """
+    feature_cols = [c for c in record if c not in EXCLUDED_COLUMNS]
+    values = [record[c] for c in feature_cols]
+    if not feature_cols or not all(isinstance(v, SCALAR_TYPES) for v in values):
+        return None
+
+    skip_columns = skip_columns or set()
+    tokens: dict[str, None] = {}
+    escaped: dict[str, Optional[str]] = {}
+    for col, val in zip(feature_cols, values):
+        if skip_missing and is_missing_scalar(val):
+            escaped[col] = None
+            continue
+        escaped[col] = escape_token_part(val)
+        if col not in skip_columns:
+            tokens[f"{col}={escaped[col]}"] = None
+
+    if add_feature_cross:
+        if cross_pairs is None:
+            cross_pairs = DEFAULT_CROSS_PAIRS
+        for a, b in cross_pairs:
+            if a not in escaped or b not in escaped:
+                continue
+            if a in skip_columns and b in skip_columns:
+                continue
+            va, vb = escaped[a], escaped[b]
+            if va is None or vb is None:
+                continue
+            tokens[f"cross:{a}={va}|{b}={vb}"] = None
+
+    return list(tokens)
+
+
+def hash_token(token: str, n_features: int, alternate_sign: bool = True) -> tuple[int, float]:
+    """Tek token -> (index, sign), FeatureHasher / hash_tokens ile aynı kural."""
+    h = murmurhash3_32(token, seed=0)
+    if h == -(2**31):
+        idx = (2147483647 - (n_features - 1)) % n_features
+    else:
+        idx = abs(h) % n_features
+    return idx, (-1.0 if alternate_sign and h < 0 else 1.0)
+
+
+def hash_record(
+    tokens: Sequence[str],
+    n_features: int,
+    alternate_sign: bool = True,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Token listesi -> (sıralı unique index'ler, toplanmış değerler); yani
+    FeatureHasher.transform([{t: 1 for t in tokens}]) satırının indices/data'sı.
+
+    Birkaç düzine token için vektörize murmurhash'in numpy overhead'i
+    baskın; burada token başına sklearn'ün skaler murmurhash3_32'si kullanılır.
+    """
+    acc: dict[int, float] = {}
+    for token in tokens:
+        idx, sign = hash_token(token, n_features, alternate_sign)
+        acc[idx] = acc.get(idx, 0.0) + sign
+    indices = sorted(acc)
+    values = [acc[i] for i in indices]
+    return np.array(indices, dtype=np.int32), np.array(values, dtype=np.float64)
+
+
+# ---------------------------------------------------------------------------
+# Columnar featurize-and-hash engine
+# ---------------------------------------------------------------------------
+# to_feature_dict + FeatureHasher.transform ile bit-identical CSR üretir, ama
+# satır satır dict kurmak yerine kolon kolon çalışır: her kolon için token
+# dizisi bir kez oluşturulur, tüm tokenlar vektörize murmurhash3 ile hashlenir.
+
+_MURMUR_C1 = np.uint32(0xCC9E2D51)
+_MURMUR_C2 = np.uint32(0x1B873593)
+
+
+def _rotl32(x: np.ndarray, r: int) -> np.ndarray:
+    return (x << np.uint32(r)) | (x >> np.uint32(32 - r))
+
+
+def _murmur_mix_k1(k1: np.ndarray) -> np.ndarray:
+    k1 = k1 * _MURMUR_C1
+    k1 = _rotl32(k1, 15)
+    return k1 * _MURMUR_C2
+
+
+def murmurhash3_32_tokens(tokens: Sequence[str], seed: int = 0) -> np.ndarray:
+    """
+    Vectorized MurmurHash3 (x86, 32-bit) of UTF-8 encoded tokens.
+
+    Returns signed int32 hashes identical to
+    ``sklearn.utils.murmurhash3_32(token, seed=seed)`` for every token.
+    """
+    tokens = list(tokens)
+    n = len(tokens)
+    if n == 0:
+        return np.empty(0, dtype=np.int32)
+
+    joined = "".join(tokens)
+    data = joined.encode("utf-8")
+    if len(data) == len(joined):
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=n)
+    else:
+        lengths = np.fromiter((len(t.encode("utf-8")) for t in tokens), dtype=np.int64, count=n)
+
+    # 4 byte padding + stride 1 uint32 görünümü: words[p] = data[p:p+4] (little-endian)
+    padded = data + b"\x00\x00\x00\x00"
+    words = np.ndarray(shape=(len(padded) - 3,), dtype="<u4", buffer=padded, strides=(1,))
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+
+    h = np.full(n, seed, dtype=np.uint32)
+    nblocks = lengths // 4
+
+    with np.errstate(over="ignore"):
+        for k in range(int(nblocks.max())):
+            rows = np.flatnonzero(nblocks > k)
+            k1 = words[offsets[rows] + 4 * k]
+            hr = h[rows] ^ _murmur_mix_k1(k1)
+            hr = _rotl32(hr, 13)
+            h[rows] = hr * np.uint32(5) + np.uint32(0xE6546B64)
+
+        tail_len = lengths & 3
+        rows = np.flatnonzero(tail_len)
+        if rows.size:
+            k1 = words[offsets[rows] + 4 * nblocks[rows]]
+            k1 &= (np.uint32(1) << (8 * tail_len[rows]).astype(np.uint32)) - np.uint32(1)
+            h[rows] ^= _murmur_mix_k1(k1)
+
+        h ^= lengths.astype(np.uint32)
+        h ^= h >> np.uint32(16)
+        h *= np.uint32(0x85EBCA6B)
+        h ^= h >> np.uint32(13)
+        h *= np.uint32(0xC2B2AE35)
+        h ^= h >> np.uint32(16)
+
+    return h.view(np.int32)
+
+
+def hash_tokens(
+    tokens: Sequence[str],
+    n_features: int,
+    alternate_sign: bool = True,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Token -> (column index, sign), FeatureHasher ile aynı kural:
+    index = abs(h) % n_features, sign = +1 if h >= 0 else -1.
+    """
+    h = murmurhash3_32_tokens(tokens).astype(np.int64)
+    indices = np.abs(h) % n_features
+    # abs(-2**31) FeatureHasher'da özel tanımlı
+    indices[h == -(2**31)] = (2147483647 - (n_features - 1)) % n_features
+    if alternate_sign:
+        signs = np.where(h >= 0, 1.0, -1.0)
+    else:
+        signs = np.ones(len(h), dtype=np.float64)
+    return indices.astype(np.int32), signs
+
+
+def _column_values(data, col: str) -> pd.Series:
+    # pyarrow.Table / RecordBatch desteği: kolon kolon pandas'a çevir
+    if isinstance(data, pd.DataFrame):
+        return data[col]
+    return data.column(col).to_pandas()
+
+
+def _column_names(data) -> list[str]:
+    if isinstance(data, pd.DataFrame):
+        return list(data.columns)
+    return list(data.column_names)
+
+
+def _escape_token_array(values: np.ndarray) -> np.ndarray:
+    # Çoğu chunk'ta ayraç yoktur; sadece gerekiyorsa replace yap
+    joined = "".join(values)
+    if "|" not in joined and "=" not in joined:
+        return values
+    return np.array(
+        [s.replace("|", "%7C").replace("=", "%3D") for s in values],
+        dtype=object,
+    )
+
+
+def _column_tokens(series: pd.Series, col: str, skip_missing: bool) -> tuple[np.ndarray, np.ndarray]:
+    """Bir kolon için "col=value" token dizisi ve geçerlilik maskesi."""
+    # tolist() itertuples ile aynı Python skalerlerini verir -> str() çıktısı aynı
+    values = np.array(list(map(str, series.tolist())), dtype=object)
+    tokens = (col + "=") + _escape_token_array(values)
+    if skip_missing:
+        valid = ~series.isna().to_numpy(dtype=bool)
+    else:
+        valid = np.ones(len(series), dtype=bool)
+    return tokens, valid
+
+
+def _factorized_column_tokens(series: pd.Series, col: str, skip_missing: bool) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Kolonu factorize eder: (unique token dizisi, satır başına code).
+    Missing satırların code'u -1'dir (skip_missing=True iken).
+
+    Sadece str() çıktısı farklı olan değerlerin ayrı unique kaldığı durumlarda
+    doğrudan factorize edilir (int/bool, düz str, float bit pattern'i);
+    diğer durumlarda önce str()'e çevrilip string'ler factorize edilir.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.Series(series.cat.categories)
+        uniq_tokens, cat_codes = _factorized_column_tokens(categories, col, skip_missing)
+        codes = series.cat.codes.to_numpy().astype(np.int64)
+        if (codes < 0).any() and not skip_missing:
+            return _factorized_column_tokens(series.astype(object), col, skip_missing)
+        return uniq_tokens, np.where(codes >= 0, cat_codes[codes], -1)
+
+    kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else None
+    if kind in ("i", "u", "b"):
+        codes, uniques = pd.factorize(series.to_numpy())
+        values = uniques.tolist()
+    elif kind == "f" and skip_missing:
+        # -0.0 / 0.0 eşit sayılır ama str()'leri farklı: bit pattern üzerinden factorize et
+        arr = series.to_numpy()
+        bits = arr.view(np.int64 if arr.itemsize == 8 else np.int32)
+        codes, uniq_bits = pd.factorize(bits)
+        values = uniq_bits.view(arr.dtype).tolist()
+        codes = np.where(np.isnan(arr), -1, codes)
+    elif skip_missing and pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        values = list(uniques)
+    else:
+        strings = np.array(list(map(str, series.tolist())), dtype=object)
+        codes, uniques = pd.factorize(strings)
+        values = list(uniques)
+        if skip_missing:
+            codes = np.where(series.isna().to_numpy(dtype=bool), -1, codes)
+
+    uniq_strings = np.array([str(v) for v in values], dtype=object)
+    uniq_tokens = (col + "=") + _escape_token_array(uniq_strings)
+    return uniq_tokens, np.asarray(codes, dtype=np.int64)
+
+
+def _active_cross_pairs(
+    feature_cols: list[str],
+    add_feature_cross: bool,
+    cross_pairs: Optional[Iterable[CrossPair]],
+) -> list[CrossPair]:
+    if not add_feature_cross:
+        return []
+    if cross_pairs is None:
+        cross_pairs = DEFAULT_CROSS_PAIRS
+    present = set(feature_cols)
+    active: list[CrossPair] = []
+    for a, b in cross_pairs:
+        pair = (a, b)
+        # Aynı pair iki kez verilirse dict'te tek token olur
+        if a in present and b in present and pair not in active:
+            active.append(pair)
+    return active
+
+
+def _assemble_csr(
+    row_indices: list[np.ndarray],
+    row_signs: list[np.ndarray],
+    row_valid: list[np.ndarray],
+    n_rows: int,
+    n_features: int,
+    dtype,
+) -> sp.csr_matrix:
+    """
+    Kolon bazlı (index, sign, valid) dizilerini FeatureHasher'ın ürettiği
+    sırayla (satır içinde: base kolonlar, sonra cross'lar) CSR'a dönüştürür.
+    """
+    if n_rows == 0:
+        raise ValueError("Cannot vectorize empty sequence.")
+    if not row_indices:
+        return sp.csr_matrix((n_rows, n_features), dtype=dtype)
+
+    idx = np.stack(row_indices, axis=1)
+    sgn = np.stack(row_signs, axis=1)
+    valid = np.stack(row_valid, axis=1)
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+    if indptr[-1] <= np.iinfo(np.int32).max:
+        indptr = indptr.astype(np.int32)
+
+    indices = idx[valid].astype(indptr.dtype, copy=False)
+    values = sgn[valid].astype(dtype, copy=False)
+
+    X = sp.csr_matrix((values, indices, indptr), dtype=dtype, shape=(n_rows, n_features))
+    X.sum_duplicates()  # FeatureHasher ile aynı: index'leri sıralar
+    return X
+
+
+def hash_features(
+    data,
+    n_features: int = 2**20,
+    add_feature_cross: bool = True,
+    cross_pairs: Optional[Iterable[CrossPair]] = None,
+    skip_missing: bool = True,
+    alternate_sign: bool = True,
+    dtype=np.float64,
+    factorize: bool = False,
+) -> sp.csr_matrix:
+    """
+    DataFrame (veya pyarrow Table) -> hashed CSR matrix, kolon kolon.
+
+    Çıktı şununla bit-identical:
+      FeatureHasher(n_features, input_type="dict", alternate_sign=..., dtype=...)
+          .transform(to_feature_dict(data, add_feature_cross, cross_pairs, skip_missing))
+
+    Satır başına dict kurulmaz; her kolonun token dizisi bir kez üretilir ve
+    tüm tokenlar vektörize murmurhash3 ile hashlenir.
+
+    factorize=True: her kolon ve cross pair factorize edilir, sadece unique
+    değerler escape/format/hash edilir (Avazu'da C1, banner_pos, device_type
+    gibi kolonlarda chunk başına birkaç unique). Çıktı yine bit-identical.
+    """
+    feature_cols = [c for c in _column_names(data) if c not in EXCLUDED_COLUMNS]
+    crosses = _active_cross_pairs(feature_cols, add_feature_cross, cross_pairs)
+    n_rows = data.num_rows if not isinstance(data, pd.DataFrame) else len(data)
+
+    if factorize:
+        row_indices, row_signs, valid_blocks = _hash_factorized(
+            data, feature_cols, crosses, n_features, skip_missing, alternate_sign
+        )
+        return _assemble_csr(row_indices, row_signs, valid_blocks, n_rows, n_features, dtype)
+
+    col_tokens: dict[str, np.ndarray] = {}
+    col_valid: dict[str, np.ndarray] = {}
+    for col in feature_cols:
+        col_tokens[col], col_valid[col] = _column_tokens(_column_values(data, col), col, skip_missing)
+
+    token_blocks = [col_tokens[c] for c in feature_cols]
+    valid_blocks = [col_valid[c] for c in feature_cols]
+    for a, b in crosses:
+        token_blocks.append("cross:" + col_tokens[a] + "|" + col_tokens[b])
+        valid_blocks.append(col_valid[a] & col_valid[b])
+
+    # Kolon başına hashle: ara diziler chunk boyutunda kalır (peak memory düşük)
+    row_indices: list[np.ndarray] = []
+    row_signs: list[np.ndarray] = []
+    for tokens in token_blocks:
+        idx, sgn = hash_tokens(tokens, n_features, alternate_sign)
+        row_indices.append(idx)
+        row_signs.append(sgn)
+    return _assemble_csr(row_indices, row_signs, valid_blocks, n_rows, n_features, dtype)
+
+
+def _hash_factorized(
+    data,
+    feature_cols: list[str],
+    crosses: list[CrossPair],
+    n_features: int,
+    skip_missing: bool,
+    alternate_sign: bool,
+) -> tuple[list[np.ndarray], list[np.ndarray], list[np.ndarray]]:
+    """
+    Her kolon (ve cross pair) için sadece unique değerleri hashler, sonra
+    önceden hesaplanan index/sign'ları code'lar üzerinden satırlara dağıtır.
+    """
+    row_indices: list[np.ndarray] = []
+    row_signs: list[np.ndarray] = []
+    valid_blocks: list[np.ndarray] = []
+    factors: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+
+    def scatter(uniq_tokens: np.ndarray, codes: np.ndarray):
+        idx, sgn = hash_tokens(uniq_tokens, n_features, alternate_sign)
+        valid = codes >= 0
+        safe = np.where(valid, codes, 0)
+        if len(uniq_tokens) == 0:
+            row_indices.append(np.zeros(len(codes), dtype=np.int32))
+            row_signs.append(np.ones(len(codes), dtype=np.float64))
+        else:
+            row_indices.append(idx[safe])
+            row_signs.append(sgn[safe])
+        valid_blocks.append(valid)
+
+    for col in feature_cols:
+        factors[col] = _factorized_column_tokens(_column_values(data, col), col, skip_missing)
+        scatter(*factors[col])
+
+    for a, b in crosses:
+        tok_a, codes_a = factors[a]
+        tok_b, codes_b = factors[b]
+        missing = (codes_a < 0) | (codes_b < 0)
+        pair_codes = np.where(missing, -1, codes_a * max(len(tok_b), 1) + codes_b)
+        codes, uniq_pairs = pd.factorize(pair_codes, use_na_sentinel=False)
+        keep = uniq_pairs >= 0
+        # -1 (missing) unique'ini at, code'ları yeniden numarala
+        remap = np.full(len(uniq_pairs), -1, dtype=np.int64)
+        remap[keep] = np.arange(int(keep.sum()))
+        uniq_pairs = uniq_pairs[keep]
+        n_b = max(len(tok_b), 1)
+        uniq_tokens = "cross:" + tok_a[uniq_pairs // n_b] + "|" + tok_b[uniq_pairs % n_b]
+        scatter(np.asarray(uniq_tokens, dtype=object), remap[codes])
 
+    return row_indices, row_signs, valid_blocks
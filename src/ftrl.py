@@ -0,0 +1,125 @@
+"""FTRL-Proximal logistic regression on hashed features (McMahan et al., 2013).
+
+Per-coordinate adaptive learning rates with L1/L2 regularization. State is
+two dense vectors (z, n) of size `n_features`; each minibatch only reads
+and updates the hashed coordinates it touches, and weights are derived
+lazily from (z, n), so L1 keeps most of them exactly zero.
+
+The class mirrors the parts of the SGDClassifier API the trainers use
+(`partial_fit`, `predict_proba`, `coef_`, `intercept_`, `loss`), so it plugs
+into the streaming loop and the stacked scorer unchanged.
+"""
+from typing import Optional
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit
+
+
+class FTRLProximal:
+    loss = "log_loss"
+
+    def __init__(
+        self,
+        n_features: int,
+        alpha: float = 0.05,
+        beta: float = 1.0,
+        l1: float = 1.0,
+        l2: float = 1.0,
+        batch_size: int = 1024,
+        class_weight: Optional[dict[int, float]] = None,
+    ):
+        self.n_features = int(n_features)
+        self.alpha = float(alpha)
+        self.beta = float(beta)
+        self.l1 = float(l1)
+        self.l2 = float(l2)
+        self.batch_size = int(batch_size)
+        self.class_weight = class_weight
+        self.z = np.zeros(self.n_features, dtype=np.float64)
+        self.n = np.zeros(self.n_features, dtype=np.float64)
+        # Intercept: same update, never regularized
+        self.z0 = 0.0
+        self.n0 = 0.0
+
+    def _weights(self, z: np.ndarray, n: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            w = np.zeros_like(z)
+        else:
+            w = out
+            w.fill(0.0)
+        active = np.abs(z) > self.l1
+        za = z[active]
+        w[active] = -(za - np.sign(za) * self.l1) / ((self.beta + np.sqrt(n[active])) / self.alpha + self.l2)
+        return w
+
+    def _intercept(self) -> float:
+        return -self.z0 / ((self.beta + np.sqrt(self.n0)) / self.alpha)
+
+    @property
+    def coef_(self) -> np.ndarray:
+        return self._weights(self.z, self.n)[np.newaxis, :]
+
+    @property
+    def intercept_(self) -> np.ndarray:
+        return np.array([self._intercept()])
+
+    def fill_coef(self, out: np.ndarray) -> np.ndarray:
+        """Write the weights into `out` ((n_features,) view) without a temporary coef_ array."""
+        return self._weights(self.z, self.n, out)
+
+    def sparse_coef(self) -> tuple[np.ndarray, np.ndarray]:
+        """(indices, values) of the non-zero weights."""
+        w = self._weights(self.z, self.n)
+        idx = np.flatnonzero(w).astype(np.int32)
+        return idx, w[idx]
+
+    def _row_weights(self, y: np.ndarray) -> Optional[np.ndarray]:
+        if not self.class_weight:
+            return None
+        return np.where(y == 1, self.class_weight.get(1, 1.0), self.class_weight.get(0, 1.0))
+
+    def _step(self, X: sp.csr_matrix, y: np.ndarray, row_weight: Optional[np.ndarray]):
+        touched, local = np.unique(X.indices, return_inverse=True)
+        X_local = sp.csr_matrix((X.data, local.ravel(), X.indptr), shape=(X.shape[0], len(touched)))
+        z = self.z[touched]
+        n = self.n[touched]
+        w = self._weights(z, n)
+        w0 = self._intercept()
+
+        residual = expit(X_local @ w + w0) - y
+        if row_weight is not None:
+            residual *= row_weight
+        g = X_local.T @ residual
+        g0 = float(residual.sum())
+
+        n_new = n + g * g
+        sigma = (np.sqrt(n_new) - np.sqrt(n)) / self.alpha
+        self.z[touched] = z + g - sigma * w
+        self.n[touched] = n_new
+
+        n0_new = self.n0 + g0 * g0
+        self.z0 += g0 - (np.sqrt(n0_new) - np.sqrt(self.n0)) / self.alpha * w0
+        self.n0 = n0_new
+
+    def partial_fit(self, X, y, classes=None):
+        if classes is not None:
+            self.classes_ = np.asarray(classes)
+        X = sp.csr_matrix(X)
+        y = np.asarray(y, dtype=np.float64)
+        row_weight = self._row_weights(y)
+        for start in range(0, X.shape[0], self.batch_size):
+            stop = min(start + self.batch_size, X.shape[0])
+            self._step(
+                X[start:stop],
+                y[start:stop],
+                row_weight[start:stop] if row_weight is not None else None,
+            )
+        return self
+
+    def decision_function(self, X) -> np.ndarray:
+        return np.asarray(X @ self.coef_[0]) + self._intercept()
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = expit(self.decision_function(X))
+        return np.column_stack([1.0 - p, p])
@@ -0,0 +1,151 @@
+"""Random-access index for `data/train.gz`.
+
+One sequential pass writes two sidecar files next to the gzip file:
+- `<path>.gzidx`: zran-style decompression access points (every `spacing`
+  uncompressed bytes, with the 32 KB window needed to restart inflate there),
+  exported by `indexed_gzip`.
+- `<path>.rowidx.npz`: uncompressed byte offset of every `row_step`-th data
+  row, plus a fingerprint of the gzip file so a stale index is ignored.
+
+`open_rows` then seeks straight to the access point before a row and only
+inflates the few MB after it, so readers can start anywhere in the file
+(resume, sharded validation, sampling). Needs the optional `indexed_gzip`
+package; without it callers fall back to a linear inflate.
+
+Usage: python src/gzip_index.py --data-path data/train.gz
+"""
+import argparse
+import os
+import time
+from typing import BinaryIO, Optional
+
+import numpy as np
+
+try:
+    import indexed_gzip
+except Exception:  # pragma: no cover - indexed_gzip optional
+    indexed_gzip = None
+
+ACCESS_POINTS_SUFFIX = ".gzidx"
+ROW_INDEX_SUFFIX = ".rowidx.npz"
+DEFAULT_SPACING = 4 << 20
+DEFAULT_ROW_STEP = 100_000
+
+
+def _file_stamp(path: str) -> np.ndarray:
+    st = os.stat(path)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def build_index(
+    path: str,
+    spacing: int = DEFAULT_SPACING,
+    row_step: int = DEFAULT_ROW_STEP,
+) -> dict:
+    """Build both sidecar files in a single pass over `path`."""
+    if indexed_gzip is None:
+        raise RuntimeError("indexed_gzip is required to build a gzip index (pip install indexed_gzip)")
+
+    start = time.time()
+    offsets = []
+    with indexed_gzip.IndexedGzipFile(path, spacing=spacing) as f:
+        header = f.readline()
+        pos = len(header)
+        rows = 0
+        offsets.append(pos)
+        last = b"\n"
+        while True:
+            block = f.read(1 << 22)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord("\n"))
+            # Row number that starts right after each newline
+            next_rows = rows + np.arange(1, len(newlines) + 1)
+            marks = next_rows % row_step == 0
+            offsets.extend((pos + newlines[marks] + 1).tolist())
+            rows += len(newlines)
+            pos += len(block)
+            last = block[-1:]
+        if last != b"\n":
+            rows += 1
+        # Reading sequentially creates the access points; export them as-is
+        f.export_index(path + ACCESS_POINTS_SUFFIX)
+        n_points = f.raw.npoints if hasattr(f, "raw") else f.npoints
+
+    offsets_arr = np.asarray(offsets, dtype=np.int64)
+    if len(offsets_arr) > 1 and offsets_arr[-1] >= pos:
+        offsets_arr = offsets_arr[:-1]
+    np.savez(
+        path + ROW_INDEX_SUFFIX,
+        offsets=offsets_arr,
+        row_step=np.int64(row_step),
+        n_rows=np.int64(rows),
+        uncompressed_size=np.int64(pos),
+        header=np.frombuffer(header, dtype=np.uint8),
+        stamp=_file_stamp(path),
+    )
+    return {
+        "rows": int(rows),
+        "uncompressed_bytes": int(pos),
+        "access_points": int(n_points),
+        "row_offsets": int(len(offsets_arr)),
+        "seconds": float(time.time() - start),
+    }
+
+
+class RowIndex:
+    def __init__(self, path: str):
+        with np.load(path + ROW_INDEX_SUFFIX) as z:
+            self.offsets = z["offsets"]
+            self.row_step = int(z["row_step"])
+            self.n_rows = int(z["n_rows"])
+            self.header = z["header"].tobytes()
+            self.stamp = z["stamp"]
+
+    def locate(self, row: int) -> tuple[int, int]:
+        """(uncompressed byte offset, rows still to skip from there) for data row `row`."""
+        k = min(row // self.row_step, len(self.offsets) - 1)
+        return int(self.offsets[k]), row - k * self.row_step
+
+
+def load_index(path: str) -> Optional[RowIndex]:
+    """Row index for `path` if both sidecars exist, are fresh, and indexed_gzip is available."""
+    if indexed_gzip is None:
+        return None
+    if not (os.path.exists(path + ROW_INDEX_SUFFIX) and os.path.exists(path + ACCESS_POINTS_SUFFIX)):
+        return None
+    index = RowIndex(path)
+    if not np.array_equal(index.stamp, _file_stamp(path)):
+        return None
+    return index
+
+
+def open_rows(path: str, start_row: int, index: Optional[RowIndex] = None) -> tuple[BinaryIO, bytes, int]:
+    """
+    Uncompressed stream seeked via the access points to the indexed row at or
+    before `start_row`. Returns (stream, header line, rows left to skip).
+    """
+    index = index or load_index(path)
+    if index is None:
+        raise FileNotFoundError(f"no usable gzip index for {path}; run src/gzip_index.py first")
+    offset, skip = index.locate(start_row)
+    f = indexed_gzip.IndexedGzipFile(path, index_file=path + ACCESS_POINTS_SUFFIX)
+    f.seek(offset)
+    return f, index.header, skip
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default=os.getenv("AVAZU_TRAIN_GZ", "data/train.gz"))
+    parser.add_argument("--spacing-mb", type=float, default=DEFAULT_SPACING / 2**20)
+    parser.add_argument("--row-step", type=int, default=DEFAULT_ROW_STEP)
+    args = parser.parse_args()
+
+    stats = build_index(args.data_path, spacing=int(args.spacing_mb * 2**20), row_step=args.row_step)
+    print(f"Index written: {args.data_path}{ACCESS_POINTS_SUFFIX}, {args.data_path}{ROW_INDEX_SUFFIX}")
+    for k, v in stats.items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""CSV ingest backends for Avazu `train.gz`.
+
+- "pandas": `pd.read_csv` with per-chunk dtype inference (object strings).
+- "arrow":  `pyarrow.csv` streaming reader with a fixed Avazu schema; string
+  columns are dictionary-encoded and arrive in pandas as Categorical, ints
+  use the narrowest type that holds the Avazu value ranges.
+
+Both backends yield DataFrames with exactly `chunk_size` rows (except the
+last one), so chunk boundaries and hashed features are identical and the
+trainers produce the same metrics.
+"""
+import gzip
+import io
+from typing import BinaryIO, Iterator, Optional
+
+import pandas as pd
+
+from gzip_index import load_index, open_rows
+
+INGEST_BACKENDS = ("pandas", "arrow")
+
+AVAZU_STRING_COLUMNS = (
+    "site_id",
+    "site_domain",
+    "site_category",
+    "app_id",
+    "app_domain",
+    "app_category",
+    "device_id",
+    "device_ip",
+    "device_model",
+)
+
+# (column, arrow type name); str() of every value is identical to the pandas int64 read
+AVAZU_INT_COLUMNS = (
+    ("id", "uint64"),
+    ("click", "int8"),
+    ("hour", "int32"),
+    ("C1", "int32"),
+    ("banner_pos", "int8"),
+    ("device_type", "int8"),
+    ("device_conn_type", "int8"),
+    ("C14", "int32"),
+    ("C15", "int32"),
+    ("C16", "int32"),
+    ("C17", "int32"),
+    ("C18", "int32"),
+    ("C19", "int32"),
+    ("C20", "int32"),
+    ("C21", "int32"),
+)
+
+
+def avazu_column_types() -> dict:
+    """Explicit arrow schema; only columns present in the file are applied."""
+    import pyarrow as pa
+
+    types = {name: getattr(pa, type_name)() for name, type_name in AVAZU_INT_COLUMNS}
+    for name in AVAZU_STRING_COLUMNS:
+        types[name] = pa.dictionary(pa.int32(), pa.string())
+    return types
+
+
+class _PrefixedStream(io.RawIOBase):
+    """`prefix` bytes followed by the rest of `raw` (already positioned)."""
+
+    def __init__(self, prefix: bytes, raw: BinaryIO):
+        self._prefix = memoryview(prefix)
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        if len(self._prefix):
+            n = min(len(buf), len(self._prefix))
+            buf[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._raw.read(len(buf))
+        buf[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def _skip_lines(raw: BinaryIO, remaining: int) -> bytes:
+    """Consume `remaining` lines from `raw`; returns bytes read past the last one."""
+    leftover = b""
+    while remaining > 0:
+        block = raw.read(1 << 20)
+        if not block:
+            break
+        count = block.count(b"\n")
+        if count < remaining:
+            remaining -= count
+            continue
+        pos = -1
+        for _ in range(remaining):
+            pos = block.index(b"\n", pos + 1)
+        leftover = block[pos + 1 :]
+        remaining = 0
+    return leftover
+
+
+def open_at_row(path: str, start_row: int) -> BinaryIO:
+    """
+    Decompressed CSV stream positioned at data row `start_row`, header line kept.
+
+    With a gzip index (src/gzip_index.py) the stream seeks to the nearest
+    access point; otherwise rows before `start_row` are inflated and
+    newline-counted. Skipped rows are never parsed or hashed.
+    """
+    index = load_index(path) if start_row > 0 and path.endswith(".gz") else None
+    if index is not None:
+        raw, header, remaining = open_rows(path, start_row, index)
+    else:
+        raw = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+        header = raw.readline()
+        remaining = start_row
+    leftover = _skip_lines(raw, remaining)
+    return io.BufferedReader(_PrefixedStream(header + leftover, raw), buffer_size=1 << 20)
+
+
+def _arrow_batches(path: str, block_size: int, start_row: int = 0):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    if start_row > 0:
+        stream = open_at_row(path, start_row)
+    else:
+        stream = pa.input_stream(path, compression="gzip" if path.endswith(".gz") else None)
+    return pa_csv.open_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=avazu_column_types(),
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def _table_to_frame(table) -> pd.DataFrame:
+    # Batch'ler farklı dictionary taşıyabilir: önce birleştir
+    return table.unify_dictionaries().combine_chunks().to_pandas()
+
+
+def _iter_arrow_chunks(
+    path: str,
+    chunk_size: int,
+    block_size: int = 1 << 22,
+    start_row: int = 0,
+    max_rows: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+
+    reader = _arrow_batches(path, block_size, start_row)
+    schema = reader.schema
+    pending: list = []
+    pending_rows = 0
+    budget = max_rows
+    for batch in reader:
+        if budget is not None:
+            batch = batch.slice(0, budget)
+            budget -= batch.num_rows
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_size:
+            table = pa.Table.from_batches(pending, schema=schema)
+            yield _table_to_frame(table.slice(0, chunk_size))
+            rest = table.slice(chunk_size)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+        if budget == 0:
+            break
+    if pending_rows:
+        yield _table_to_frame(pa.Table.from_batches(pending, schema=schema))
+
+
+def iter_chunks(
+    path: str,
+    chunk_size: int,
+    backend: str = "pandas",
+    start_row: int = 0,
+    stop_row: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """Stream data rows [start_row, stop_row) of `path` as DataFrames of `chunk_size` rows."""
+    max_rows = None if stop_row is None else max(stop_row - start_row, 0)
+    if backend == "arrow":
+        return _iter_arrow_chunks(path, chunk_size, start_row=start_row, max_rows=max_rows)
+    if backend == "pandas":
+        if max_rows == 0:
+            return iter(())
+        if start_row > 0:
+            return iter(pd.read_csv(open_at_row(path, start_row), chunksize=chunk_size, nrows=max_rows))
+        return iter(pd.read_csv(path, compression="gzip", chunksize=chunk_size, nrows=max_rows))
+    raise ValueError(f"Unknown ingest backend: {backend}. Expected one of {INGEST_BACKENDS}")
+
+
+def read_rows(
+    path: str, nrows: Optional[int] = None, backend: str = "pandas", start_row: int = 0
+) -> pd.DataFrame:
+    """`nrows` rows (all remaining rows if None) from data row `start_row` as one DataFrame."""
+    if backend == "pandas":
+        if start_row > 0:
+            return pd.read_csv(open_at_row(path, start_row), nrows=nrows)
+        return pd.read_csv(path, compression="gzip", nrows=nrows)
+    if backend != "arrow":
+        raise ValueError(f"Unknown ingest backend: {backend}. Expected one of {INGEST_BACKENDS}")
+    if nrows is None:
+        return _table_to_frame(_arrow_batches(path, 1 << 22, start_row).read_all())
+    first = next(_iter_arrow_chunks(path, nrows, start_row=start_row, max_rows=nrows), None)
+    if first is None:
+        return _table_to_frame(_arrow_batches(path, 1 << 22).schema.empty_table())
+    return first
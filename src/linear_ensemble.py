@@ -0,0 +1,270 @@
+"""Stacked weight-matrix form of the bagging SGD ensemble.
+
+The `n_estimators` logistic SGDClassifiers are stored as one dense
+`(n_features, n_estimators)` matrix W plus an intercept vector b, so scoring
+a batch is a single sparse-dense product `X @ W` and one vectorized sigmoid
+instead of one `predict_proba` per member. The mean probability equals the
+average of the members' `predict_proba(X)[:, 1]`.
+
+Existing artifacts (`{"models": [...], "hasher", ...}`) and FTRL artifacts
+(`{"sparse_weights": {...}}`, one member) are stacked on load; the export
+below writes a pickle-light artifact with only arrays + hasher.
+
+`export_serving_dir` writes the same arrays as raw `.npy` files plus a JSON
+manifest (hashing + cross config) into a versioned directory,
+`<root>/v<N>/`. `load_serving_dir` opens them with `np.load(mmap_mode="r")`:
+nothing is unpickled, cold start does not depend on the model size, and
+every worker process maps the same page-cache pages instead of holding its
+own copy of W.
+
+Usage:
+  python src/linear_ensemble.py --artifact models/ctr_model_hashing.joblib --out models/ctr_model_stacked.joblib
+  python src/linear_ensemble.py --artifact models/ctr_model_hashing.joblib --serving-root models/serving
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from typing import Optional, Sequence
+
+import joblib
+import numpy as np
+from scipy.special import expit
+from sklearn.feature_extraction import FeatureHasher
+
+SERVING_FORMAT = "ctr-serving"
+SERVING_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+_VERSION_DIR = re.compile(r"^v(\d+)$")
+
+
+class StackedLinearEnsemble:
+    def __init__(self, weights: np.ndarray, intercepts: np.ndarray):
+        # No copy for float64 C-ordered input, so memory-mapped weights stay mapped
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.intercepts = np.asarray(intercepts, dtype=np.float64).ravel()
+        if self.weights.ndim != 2 or self.weights.shape[1] != len(self.intercepts):
+            raise ValueError(
+                f"weights must be (n_features, n_estimators); got {self.weights.shape} "
+                f"with {len(self.intercepts)} intercepts"
+            )
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    @property
+    def n_estimators(self) -> int:
+        return self.weights.shape[1]
+
+    @classmethod
+    def from_models(cls, models: Sequence) -> "StackedLinearEnsemble":
+        n_features = models[0].coef_.shape[1]
+        weights = np.empty((n_features, len(models)), dtype=np.float64)
+        intercepts = np.empty(len(models), dtype=np.float64)
+        for j, m in enumerate(models):
+            weights[:, j] = m.coef_[0]
+            intercepts[j] = m.intercept_[0]
+        return cls(weights, intercepts)
+
+    def refresh(self, models: Sequence) -> "StackedLinearEnsemble":
+        """Overwrite weights / intercepts in place from `models` (same shape), reusing the buffers."""
+        for j, m in enumerate(models):
+            fill_coef = getattr(m, "fill_coef", None)
+            if fill_coef is not None:
+                fill_coef(self.weights[:, j])
+            else:
+                self.weights[:, j] = m.coef_[0]
+            self.intercepts[j] = m.intercept_[0]
+        return self
+
+    def decision_function(self, X, offset: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        (n_rows, n_estimators) margins. `offset` ((n_estimators,) margins, e.g.
+        a shared context's `X_ctx @ W`) is added to every row.
+        """
+        Z = np.asarray(X @ self.weights)
+        if offset is not None:
+            Z += offset
+        Z += self.intercepts
+        return Z
+
+    def predict_proba(self, X, offset: Optional[np.ndarray] = None) -> np.ndarray:
+        """Mean click probability over members."""
+        Z = self.decision_function(X, offset)
+        return expit(Z, out=Z).mean(axis=1)
+
+    def predict_proba_row(self, indices: np.ndarray, values: np.ndarray) -> float:
+        """
+        `predict_proba` of one CSR row given its sorted `indices` / `values`.
+
+        The margins are accumulated in index order with `cumsum`, the same
+        order scipy's CSR product uses, so the result is bit-identical to
+        `predict_proba(X)` for that row without building X.
+        """
+        if len(indices):
+            terms = self.weights[indices] * values[:, None]
+            Z = np.cumsum(terms, axis=0)[-1:]
+        else:
+            Z = np.zeros((1, self.n_estimators))
+        Z += self.intercepts
+        return float(expit(Z, out=Z).mean(axis=1)[0])
+
+
+def is_stackable(models: Sequence) -> bool:
+    """True for binary logistic linear models (what bagging_sgd trains)."""
+    if not models:
+        return False
+    for m in models:
+        coef = getattr(m, "coef_", None)
+        if coef is None or coef.shape[0] != 1 or getattr(m, "loss", None) != "log_loss":
+            return False
+    return len({m.coef_.shape[1] for m in models}) == 1
+
+
+def from_artifact(artifact: dict) -> Optional[StackedLinearEnsemble]:
+    """Stacked ensemble for an exported or a `{"models": [...]}` artifact; None if not linear."""
+    if "weights" in artifact:
+        return StackedLinearEnsemble(artifact["weights"], artifact["intercepts"])
+    if "sparse_weights" in artifact:
+        sw = artifact["sparse_weights"]
+        weights = np.zeros((int(sw["n_features"]), 1), dtype=np.float64)
+        weights[np.asarray(sw["indices"]), 0] = sw["values"]
+        return StackedLinearEnsemble(weights, [sw["intercept"]])
+    models = artifact.get("models")
+    if models and is_stackable(models):
+        return StackedLinearEnsemble.from_models(models)
+    return None
+
+
+def export_artifact(artifact: dict) -> dict:
+    """Copy of `artifact` with the sklearn members replaced by weights + intercepts."""
+    stacked = from_artifact(artifact)
+    if stacked is None:
+        raise ValueError("artifact has no linear 'models' ensemble to stack")
+    exported = {k: v for k, v in artifact.items() if k not in ("models", "sparse_weights")}
+    exported["weights"] = stacked.weights
+    exported["intercepts"] = stacked.intercepts
+    return exported
+
+
+def _versions(root: str) -> list[int]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(m.group(1)) for m in map(_VERSION_DIR.match, os.listdir(root)) if m)
+
+
+def export_serving_dir(artifact: dict, root: str, source: Optional[str] = None) -> str:
+    """Write `artifact` as `<root>/v<N>/` (next free N); returns the new directory."""
+    stacked = from_artifact(artifact)
+    if stacked is None:
+        raise ValueError("artifact has no linear 'models' ensemble to stack")
+    hasher = artifact.get("hasher")
+    if hasher is None:
+        raise ValueError("artifact missing 'hasher'")
+    if hasher.n_features != stacked.n_features:
+        raise ValueError(f"hasher has {hasher.n_features} features, weights have {stacked.n_features}")
+
+    versions = _versions(root)
+    version = (versions[-1] + 1) if versions else 1
+    out_dir = os.path.join(root, f"v{version}")
+    tmp_dir = os.path.join(root, f".v{version}.tmp-{os.getpid()}")
+    os.makedirs(tmp_dir)
+    try:
+        np.save(os.path.join(tmp_dir, "weights.npy"), stacked.weights)
+        np.save(os.path.join(tmp_dir, "intercepts.npy"), stacked.intercepts)
+        cross_pairs = artifact.get("cross_pairs")
+        manifest = {
+            "format": SERVING_FORMAT,
+            "format_version": SERVING_FORMAT_VERSION,
+            "version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "source": source,
+            "ensemble_type": artifact.get("ensemble_type"),
+            "n_estimators": stacked.n_estimators,
+            "hash_n_features": int(hasher.n_features),
+            "alternate_sign": bool(hasher.alternate_sign),
+            "use_feature_cross": bool(artifact.get("use_feature_cross", False)),
+            "cross_pairs": [list(p) for p in cross_pairs] if cross_pairs is not None else None,
+            "weights": {"file": "weights.npy", "shape": list(stacked.weights.shape), "dtype": "float64"},
+            "intercepts": {"file": "intercepts.npy", "shape": [stacked.n_estimators], "dtype": "float64"},
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        # Readers never see a half-written version directory
+        os.rename(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return out_dir
+
+
+def resolve_serving_dir(path: str) -> str:
+    """`path` itself if it holds a manifest, else its highest `v<N>` subdirectory."""
+    if os.path.isfile(os.path.join(path, MANIFEST_NAME)):
+        return path
+    versions = _versions(path)
+    if not versions:
+        raise FileNotFoundError(f"no {MANIFEST_NAME} or v<N> version directory under {path}")
+    return os.path.join(path, f"v{versions[-1]}")
+
+
+def load_serving_dir(path: str) -> dict:
+    """Artifact dict (weights memory-mapped) for a serving directory or its version root."""
+    path = resolve_serving_dir(path)
+    with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SERVING_FORMAT or manifest.get("format_version") != SERVING_FORMAT_VERSION:
+        raise ValueError(
+            f"unsupported serving format {manifest.get('format')!r} v{manifest.get('format_version')} in {path}"
+        )
+
+    weights = np.load(os.path.join(path, manifest["weights"]["file"]), mmap_mode="r")
+    intercepts = np.load(os.path.join(path, manifest["intercepts"]["file"]))
+    if list(weights.shape) != manifest["weights"]["shape"] or weights.shape[0] != manifest["hash_n_features"]:
+        raise ValueError(f"weights.npy shape {weights.shape} does not match the manifest in {path}")
+
+    cross_pairs = manifest.get("cross_pairs")
+    return {
+        "weights": weights,
+        "intercepts": intercepts,
+        "hasher": FeatureHasher(
+            n_features=manifest["hash_n_features"],
+            input_type="dict",
+            alternate_sign=manifest.get("alternate_sign", True),
+        ),
+        "hash_n_features": manifest["hash_n_features"],
+        "use_feature_cross": manifest.get("use_feature_cross", False),
+        "cross_pairs": [tuple(p) for p in cross_pairs] if cross_pairs is not None else None,
+        "ensemble_type": manifest.get("ensemble_type"),
+        "n_estimators": manifest.get("n_estimators"),
+        "serving_dir": path,
+        "manifest": manifest,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--artifact", default="models/ctr_model_hashing.joblib")
+    parser.add_argument("--out", default="models/ctr_model_stacked.joblib")
+    parser.add_argument(
+        "--serving-root",
+        default=None,
+        help="Write a versioned mmap serving directory under this root instead of --out",
+    )
+    args = parser.parse_args()
+
+    if args.serving_root:
+        out_dir = export_serving_dir(joblib.load(args.artifact), args.serving_root, source=args.artifact)
+        print(f"Serving directory written: {out_dir}")
+        return
+
+    exported = export_artifact(joblib.load(args.artifact))
+    joblib.dump(exported, args.out)
+    print(f"Stacked artifact written: {args.out} weights={exported['weights'].shape}")
+
+
+if __name__ == "__main__":
+    main()
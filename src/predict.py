@@ -1,15 +1,18 @@
 import argparse
+import os
 import sys
 from pathlib import Path
 
 # monitoring klasörünü kesin görsün diye repo kökünü sys.path'e ekliyoruz
 ROOT = Path(__file__).resolve().parent.parent  # src -> repo root
 sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
 
-from monitoring.log import log_prediction  # noqa: E402
+from monitoring.log import log_predictions  # noqa: E402
 import joblib  # noqa: E402
-import pandas as pd  # noqa: E402
-from feature_utils import to_feature_dict  # noqa: E402
+from feature_utils import hash_features  # noqa: E402
+from ingest import INGEST_BACKENDS, read_rows  # noqa: E402
+from linear_ensemble import from_artifact as stacked_from_artifact  # noqa: E402
 
 
 ARTIFACT_PATH = "models/ctr_model_hashing.joblib"
@@ -19,19 +22,23 @@ DATA_PATH = "data/train.gz"
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--nrows", type=int, default=200)
+    parser.add_argument("--ingest", choices=INGEST_BACKENDS, default=os.getenv("INGEST_BACKEND", "pandas"))
+    parser.add_argument("--row-start", type=int, default=0, help="first data row to score")
     args, _ = parser.parse_known_args()   # <<< TEK DEĞİŞİKLİK
 
     artifact = joblib.load(ARTIFACT_PATH)
     # Support artifact shapes:
     # 1) legacy single-model: {"model", "hasher"}
     # 2) legacy ensemble: {"sgd", "nb", "hasher"}
-    # 3) bagging ensemble: {"models": [..], "hasher"}
+    # 3) bagging ensemble: {"models": [..], "hasher"} (scored stacked when linear)
+    # 4) stacked export: {"weights", "intercepts", "hasher"}
     hasher = artifact.get("hasher")
     if hasher is None:
         raise ValueError("artifact missing 'hasher' key")
 
     use_feature_cross = bool(artifact.get("use_feature_cross", False))
     cross_pairs = artifact.get("cross_pairs")
+    stacked = stacked_from_artifact(artifact)
 
     if "model" in artifact:
         model = artifact["model"]
@@ -48,6 +55,9 @@ def main():
             nb_proba = nb.predict_proba(X_h)[:, 1]
             return 0.5 * (sgd_proba + nb_proba)
 
+    elif stacked is not None:
+        _predict_proba = stacked.predict_proba
+
     elif "models" in artifact:
         models = artifact["models"]
 
@@ -59,28 +69,25 @@ def main():
         raise ValueError("Unsupported artifact format: expected 'model' or ('sgd' and 'nb')")
 
     # Örnek veri (varsayılan: 200 satır)
-    df = pd.read_csv(DATA_PATH, compression="gzip", nrows=args.nrows)
+    df = read_rows(DATA_PATH, nrows=args.nrows, backend=args.ingest, start_row=args.row_start)
 
     y_true = df["click"].astype(int).tolist()
     ids = df["id"].tolist()
-    X_raw = df.drop(columns=["click"])
-
-    X_h = hasher.transform(
-        to_feature_dict(
-            X_raw,
-            add_feature_cross=use_feature_cross,
-            cross_pairs=cross_pairs,
-        )
+
+    X_h = hash_features(
+        df,
+        n_features=hasher.n_features,
+        add_feature_cross=use_feature_cross,
+        cross_pairs=cross_pairs,
+        alternate_sign=hasher.alternate_sign,
+        dtype=hasher.dtype,
+        factorize=True,
     )
     proba = _predict_proba(X_h).tolist()
 
     preds = [1 if p >= 0.5 else 0 for p in proba]
-    for i in range(len(ids)):
-        log_prediction(
-            prediction=preds[i],
-            proba=float(proba[i]),
-            y_true=int(y_true[i]),
-        )
+    # Tek seferde yaz: satır başına open/close yok
+    log_predictions(preds, proba, y_true)
 
     print("Monitoring log yazildi -> data/predictions.csv")
     print("id | true_click | predicted_proba")
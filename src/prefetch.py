@@ -0,0 +1,159 @@
+"""Bounded background prefetch for the streaming training loop.
+
+A reader thread pulls raw chunks from the source iterator and hands them to a
+small thread pool for featurization while the main thread trains on the
+previous chunk. Results are queued as futures in source order, so the
+consumer sees exactly the same chunk sequence as a serial loop.
+
+Two bounds keep memory predictable:
+- `depth`: max chunks read ahead of the consumer (queue size).
+- `max_bytes`: bytes of featurized chunks buffered or in flight (estimated
+  from the last chunk) before the reader pauses; at most one chunk over.
+
+Reading, gzip/CSV parsing, hashing and SGD all release the GIL for most of
+their work, so threads are enough to overlap them.
+"""
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+import scipy.sparse as sp
+
+_END = object()
+
+
+def chunk_nbytes(item) -> int:
+    """Approximate size of a featurized (X, y) chunk."""
+    total = 0
+    for part in item if isinstance(item, tuple) else (item,):
+        if sp.issparse(part):
+            total += part.data.nbytes + part.indices.nbytes + part.indptr.nbytes
+        elif hasattr(part, "nbytes"):
+            total += int(part.nbytes)
+    return total
+
+
+class ChunkPrefetcher:
+    """Ordered, bounded `map(transform, source)` running ahead of the consumer."""
+
+    def __init__(
+        self,
+        source: Iterable,
+        transform: Callable,
+        depth: int = 2,
+        workers: int = 1,
+        max_bytes: Optional[int] = None,
+        skip: int = 0,
+        nbytes: Callable = chunk_nbytes,
+    ):
+        if depth < 1:
+            raise ValueError("prefetch depth must be >= 1")
+        self._source = iter(source)
+        self._transform = transform
+        self._skip = skip
+        self._max_bytes = max_bytes
+        self._nbytes = nbytes
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="featurize")
+        self._cond = threading.Condition()
+        self._buffered_bytes = 0
+        self._in_flight = 0
+        self._last_size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="chunk-reader", daemon=True)
+        self._thread.start()
+
+    def _job(self, item):
+        try:
+            result = self._transform(item)
+            size = self._nbytes(result)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+        with self._cond:
+            self._buffered_bytes += size
+            self._last_size = size
+        return result, size
+
+    def _over_budget(self) -> bool:
+        if not self._max_bytes:
+            return False
+        if self._in_flight and not self._last_size:
+            # Chunk size unknown yet: wait for the first result before reading further
+            return True
+        outstanding = self._buffered_bytes + self._in_flight * self._last_size
+        return outstanding >= self._max_bytes and (self._in_flight > 0 or self._buffered_bytes > 0)
+
+    def _wait_for_budget(self):
+        with self._cond:
+            while self._over_budget() and not self._stop.is_set():
+                self._cond.wait(timeout=0.1)
+            self._in_flight += 1
+
+    def _put(self, entry) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for _ in range(self._skip):
+                if next(self._source, _END) is _END:
+                    break
+            while not self._stop.is_set():
+                self._wait_for_budget()
+                item = next(self._source, _END)
+                if item is _END:
+                    with self._cond:
+                        self._in_flight -= 1
+                    break
+                if not self._put(self._pool.submit(self._job, item)):
+                    return
+        except BaseException as exc:  # propagate reader errors to the consumer
+            failed: Future = Future()
+            failed.set_exception(exc)
+            self._put(failed)
+            return
+        self._put(_END)
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        if self._stop.is_set():
+            raise StopIteration
+        entry = self._queue.get()
+        if entry is _END:
+            self._stop.set()
+            raise StopIteration
+        result, size = entry.result()
+        with self._cond:
+            self._buffered_bytes -= size
+            self._cond.notify_all()
+        return result
+
+    def close(self):
+        """Stop reading ahead and release worker threads."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        # Drain so a producer blocked on put() can exit
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join(timeout=5)
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
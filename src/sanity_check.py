@@ -1,9 +1,15 @@
-import pandas as pd
+import argparse
+
+from ingest import INGEST_BACKENDS, read_rows
 
 PATH = "data/train.gz"
 
 def main():
-    df = pd.read_csv(PATH, compression="gzip", nrows=200_000)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ingest", choices=INGEST_BACKENDS, default="pandas")
+    args = parser.parse_args()
+
+    df = read_rows(PATH, nrows=200_000, backend=args.ingest)
 
     print("shape:", df.shape)
     print("columns:", list(df.columns))
@@ -22,4 +28,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -2,15 +2,15 @@ import argparse
 import json
 import os
 import time
-from typing import Optional
 
 import numpy as np
-import pandas as pd
 from sklearn.feature_extraction import FeatureHasher
 from sklearn.linear_model import SGDClassifier
 from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
 
-from feature_utils import to_feature_dict
+from feature_cache import open_cache
+from feature_utils import hash_features, parse_cross_list
+from ingest import INGEST_BACKENDS, read_rows
 
 import joblib
 
@@ -34,22 +34,6 @@ def _env_bool(name: str, default: bool) -> bool:
     return value.lower() in {"1", "true", "yes", "y"}
 
 
-def _parse_cross_list(raw: Optional[str]) -> list[tuple[str, str]]:
-    if not raw:
-        return [
-            ("site_id", "app_id"),
-            ("site_domain", "app_domain"),
-            ("device_type", "device_conn_type"),
-        ]
-    pairs: list[tuple[str, str]] = []
-    for item in raw.split(","):
-        parts = item.strip().split(":")
-        if len(parts) != 2:
-            raise ValueError(f"Invalid cross pair: {item}. Expected format colA:colB")
-        pairs.append((parts[0], parts[1]))
-    return pairs
-
-
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--data-path", default=os.getenv("AVAZU_TRAIN_GZ", "data/train.gz"))
@@ -60,32 +44,63 @@ def main():
     parser.add_argument("--disable-feature-cross", action="store_true")
     parser.add_argument("--cross-list", default=os.getenv("CROSS_LIST", ""))
     parser.add_argument("--seed", type=int, default=_env_int("SEED", 42))
+    parser.add_argument(
+        "--feature-cache",
+        default=os.getenv("FEATURE_CACHE_DIR", ""),
+        help="cache root for pre-hashed features (materialized on first use); empty = parse CSV",
+    )
+    parser.add_argument("--ingest", choices=INGEST_BACKENDS, default=os.getenv("INGEST_BACKEND", "pandas"))
+    parser.add_argument(
+        "--row-start",
+        type=int,
+        default=_env_int("ROW_START", 0),
+        help="first data row of the train split (seeks via src/gzip_index.py sidecars when present)",
+    )
     args = parser.parse_args()
 
     use_feature_cross = args.use_feature_cross and not args.disable_feature_cross
-    cross_list = _parse_cross_list(args.cross_list)
+    cross_list = parse_cross_list(args.cross_list)
 
     np.random.seed(args.seed)
     start = time.time()
 
     total_rows = args.train_rows + args.val_rows
-    df = pd.read_csv(args.data_path, compression="gzip", nrows=total_rows)
-
-    train_df = df.iloc[: args.train_rows].copy()
-    val_df = df.iloc[args.train_rows : args.train_rows + args.val_rows].copy()
-
-    y_train = train_df["click"].astype(int).to_numpy()
-    X_train_raw = train_df.drop(columns=["click"])
-    y_val = val_df["click"].astype(int).to_numpy()
-    X_val_raw = val_df.drop(columns=["click"])
-
     hasher = FeatureHasher(n_features=args.hash_n_features, input_type="dict")
-    X_train = hasher.transform(
-        to_feature_dict(X_train_raw, add_feature_cross=use_feature_cross, cross_pairs=cross_list)
-    )
-    X_val = hasher.transform(
-        to_feature_dict(X_val_raw, add_feature_cross=use_feature_cross, cross_pairs=cross_list)
-    )
+
+    if args.feature_cache:
+        cache = open_cache(
+            args.data_path,
+            args.hash_n_features,
+            use_feature_cross,
+            cross_list,
+            cache_root=args.feature_cache,
+            ingest=args.ingest,
+        )
+        X_train, y_train = cache.slice(args.row_start, args.row_start + args.train_rows)
+        X_val, y_val = cache.slice(args.row_start + args.train_rows, args.row_start + total_rows)
+    else:
+        df = read_rows(args.data_path, nrows=total_rows, backend=args.ingest, start_row=args.row_start)
+
+        train_df = df.iloc[: args.train_rows].copy()
+        val_df = df.iloc[args.train_rows : args.train_rows + args.val_rows].copy()
+
+        y_train = train_df["click"].astype(int).to_numpy()
+        y_val = val_df["click"].astype(int).to_numpy()
+
+        X_train = hash_features(
+            train_df,
+            n_features=args.hash_n_features,
+            add_feature_cross=use_feature_cross,
+            cross_pairs=cross_list,
+            factorize=True,
+        )
+        X_val = hash_features(
+            val_df,
+            n_features=args.hash_n_features,
+            add_feature_cross=use_feature_cross,
+            cross_pairs=cross_list,
+            factorize=True,
+        )
 
     clf = SGDClassifier(
         loss="log_loss",
@@ -123,6 +138,7 @@ def main():
         "val_logloss": float(ll),
         "val_pr_auc": float(pr),
         "train_rows": int(args.train_rows),
+        "row_start": int(args.row_start),
         "val_rows": int(args.val_rows),
         "val_rows_config": int(args.val_rows),
         "elapsed_seconds": float(elapsed),
@@ -145,6 +161,7 @@ def main():
                     "use_feature_cross": use_feature_cross,
                     "cross_list": cross_list,
                     "train_rows": args.train_rows,
+                    "row_start": args.row_start,
                     "val_rows": args.val_rows,
                     "seed": args.seed,
                     "model_type": "sgd_classifier",
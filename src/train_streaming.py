@@ -1,8 +1,10 @@
 import argparse
+import functools
 import json
 import math
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional
 
@@ -10,10 +12,18 @@ import numpy as np
 import pandas as pd
 from sklearn.feature_extraction import FeatureHasher
 from sklearn.linear_model import SGDClassifier
-from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
 from sklearn.utils.class_weight import compute_class_weight
 
-from feature_utils import to_feature_dict
+from checkpoint_writer import BackgroundWriter, atomic_dump
+from compact_checkpoint import CHECKPOINT_FORMATS, COMPACT_FORMAT, CheckpointManager
+from compact_checkpoint import load_models as load_compact_models
+from feature_cache import open_cache
+from feature_utils import hash_features, parse_cross_list
+from ftrl import FTRLProximal
+from ingest import INGEST_BACKENDS, iter_chunks
+from linear_ensemble import StackedLinearEnsemble
+from prefetch import ChunkPrefetcher
+from stream_metrics import DEFAULT_BINS, VAL_METRIC_MODES, ProgressiveValidation, make_metrics
 
 import joblib
 
@@ -51,6 +61,28 @@ class Config:
     resume_from: Optional[str]
     register_name: str
     register_stage: str
+    feature_cache: Optional[str] = None
+    ingest: str = "pandas"
+    prefetch_depth: int = 0
+    prefetch_workers: int = 1
+    prefetch_max_mb: int = 0
+    row_start: int = 0
+    row_end: Optional[int] = None
+    train_workers: int = 1
+    ftrl_alpha: float = 0.05
+    ftrl_beta: float = 1.0
+    ftrl_l1: float = 1.0
+    ftrl_l2: float = 1.0
+    ftrl_batch_size: int = 1024
+    val_metrics: str = "binned"
+    metric_bins: int = DEFAULT_BINS
+    validation: str = "holdout"
+    early_stop_patience: int = 0
+    early_stop_min_delta: float = 1e-4
+    checkpoint_queue: int = 2
+    checkpoint_format: str = "pickle"
+    checkpoint_full_every: int = 5
+    checkpoint_keep: int = 0
 
 
 def _env_int(name: str, default: int) -> int:
@@ -67,23 +99,19 @@ def _env_bool(name: str, default: bool) -> bool:
     return value.lower() in {"1", "true", "yes", "y"}
 
 
-def _parse_cross_list(raw: Optional[str]) -> list[tuple[str, str]]:
-    if not raw:
+def _build_models(cfg: Config, class_weight_param: Optional[dict[int, float]]) -> list[SGDClassifier]:
+    if cfg.ensemble_type == "ftrl":
         return [
-            ("site_id", "app_id"),
-            ("site_domain", "app_domain"),
-            ("device_type", "device_conn_type"),
+            FTRLProximal(
+                n_features=cfg.hash_n_features,
+                alpha=cfg.ftrl_alpha,
+                beta=cfg.ftrl_beta,
+                l1=cfg.ftrl_l1,
+                l2=cfg.ftrl_l2,
+                batch_size=cfg.ftrl_batch_size,
+                class_weight=class_weight_param,
+            )
         ]
-    pairs: list[tuple[str, str]] = []
-    for item in raw.split(","):
-        parts = item.strip().split(":")
-        if len(parts) != 2:
-            raise ValueError(f"Invalid cross pair: {item}. Expected format colA:colB")
-        pairs.append((parts[0], parts[1]))
-    return pairs
-
-
-def _build_models(cfg: Config, class_weight_param: Optional[dict[int, float]]) -> list[SGDClassifier]:
     if cfg.ensemble_type == "single":
         seeds = [cfg.seed]
     else:
@@ -103,46 +131,190 @@ def _build_models(cfg: Config, class_weight_param: Optional[dict[int, float]]) -
     return models
 
 
-def _train_on_chunk(models: list[SGDClassifier], X_h, y: np.ndarray, classes: np.ndarray):
-    for m in models:
-        if not hasattr(m, "classes_"):
-            m.partial_fit(X_h, y, classes=classes)
-        else:
-            m.partial_fit(X_h, y)
+def _featurize(cfg: Config, hasher: FeatureHasher, frame: pd.DataFrame):
+    # Factorized columnar engine; bit-identical to hasher.transform(to_feature_dict(...))
+    return hash_features(
+        frame,
+        n_features=hasher.n_features,
+        add_feature_cross=cfg.use_feature_cross,
+        cross_pairs=cfg.cross_list,
+        alternate_sign=hasher.alternate_sign,
+        dtype=hasher.dtype,
+        factorize=True,
+    )
 
 
-def _predict_proba(models: list[SGDClassifier], X_h) -> np.ndarray:
-    if len(models) == 1:
-        return models[0].predict_proba(X_h)[:, 1]
-    probs = [m.predict_proba(X_h)[:, 1] for m in models]
-    return np.mean(probs, axis=0)
+def _open_reader(cfg: Config, start_row: int = 0):
+    """
+    Chunk iterator over data rows [start_row, cfg.row_end): raw DataFrames
+    from the CSV, or pre-hashed (X, y) from the feature cache.
+    """
+    if cfg.feature_cache:
+        cache = open_cache(
+            cfg.data_path,
+            cfg.hash_n_features,
+            cfg.use_feature_cross,
+            cfg.cross_list,
+            cache_root=cfg.feature_cache,
+            ingest=cfg.ingest,
+        )
+        return cache.iter_chunks(cfg.chunk_size, start_row=start_row, stop_row=cfg.row_end)
+    return iter_chunks(cfg.data_path, cfg.chunk_size, cfg.ingest, start_row=start_row, stop_row=cfg.row_end)
+
+
+def _chunk_xy(cfg: Config, hasher: FeatureHasher, chunk) -> tuple:
+    if isinstance(chunk, tuple):
+        # Feature cache: already hashed
+        return chunk
+    y = chunk["click"].astype(int).to_numpy()
+    return _featurize(cfg, hasher, chunk), y
+
+
+def _chunk_stream(cfg: Config, hasher: FeatureHasher, reader):
+    """
+    (X, y) batches from `reader`. With prefetch_depth > 0, chunk N+1 is read
+    and hashed in background threads while chunk N trains; order is
+    unchanged, so results match the serial loop.
+    """
+    transform = functools.partial(_chunk_xy, cfg, hasher)
+    if cfg.prefetch_depth > 0:
+        return ChunkPrefetcher(
+            reader,
+            transform,
+            depth=cfg.prefetch_depth,
+            workers=cfg.prefetch_workers,
+            max_bytes=cfg.prefetch_max_mb * 2**20 if cfg.prefetch_max_mb > 0 else None,
+        )
+    return (transform(chunk) for chunk in reader)
 
 
-def _save_checkpoint(
+def _fit_member(model: SGDClassifier, X_h, y: np.ndarray, classes: np.ndarray):
+    if not hasattr(model, "classes_"):
+        model.partial_fit(X_h, y, classes=classes)
+    else:
+        model.partial_fit(X_h, y)
+
+
+def _train_pool(cfg: Config) -> Optional[ThreadPoolExecutor]:
+    if cfg.train_workers <= 1 or cfg.ensemble_type != "bagging_sgd" or cfg.n_estimators <= 1:
+        return None
+    return ThreadPoolExecutor(
+        max_workers=min(cfg.train_workers, cfg.n_estimators), thread_name_prefix="partial-fit"
+    )
+
+
+def _train_on_chunk(
+    models: list[SGDClassifier],
+    X_h,
+    y: np.ndarray,
+    classes: np.ndarray,
+    pool: Optional[ThreadPoolExecutor] = None,
+):
+    """
+    partial_fit every member on the same chunk. With `pool`, members train
+    concurrently on the shared X_h (read-only; sklearn's SGD loop releases
+    the GIL). Each member has its own random_state, so coefficients are
+    identical to the sequential loop.
+    """
+    if pool is None or len(models) == 1:
+        for m in models:
+            _fit_member(m, X_h, y, classes)
+        return
+    futures = [pool.submit(_fit_member, m, X_h, y, classes) for m in models]
+    for f in futures:
+        f.result()
+
+
+def _n_members(cfg: Config) -> int:
+    return cfg.n_estimators if cfg.ensemble_type == "bagging_sgd" else 1
+
+
+def _model_payload(cfg: Config, models: list[SGDClassifier]) -> dict:
+    if cfg.ensemble_type == "ftrl":
+        # Plain arrays: the artifact loads without src/ftrl.py on the import path
+        indices, values = models[0].sparse_coef()
+        return {
+            "sparse_weights": {
+                "n_features": cfg.hash_n_features,
+                "indices": indices,
+                "values": values,
+                "intercept": float(models[0].intercept_[0]),
+            }
+        }
+    return {"models": models}
+
+
+def _checkpoint_state(
+    checkpoints: CheckpointManager,
     path: str,
     models: list[SGDClassifier],
     hasher: FeatureHasher,
     cfg: Config,
     chunks_trained: int,
     trained_rows: int,
-):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    joblib.dump(
-        {
-            "models": models,
-            "hasher": hasher,
-            "chunks_trained": chunks_trained,
-            "trained_rows": trained_rows,
-            "config": cfg.__dict__,
-        },
-        path,
-    )
+    input_rows: int,
+) -> dict:
+    meta = {
+        "hasher": hasher,
+        "chunks_trained": chunks_trained,
+        "trained_rows": trained_rows,
+        # Data rows consumed from data_path; resume reads from here
+        "input_position": {"data_path": cfg.data_path, "rows": input_rows},
+        "config": dict(cfg.__dict__),
+    }
+    # Snapshot: training keeps mutating `models` while the writer serializes
+    return checkpoints.snapshot(path, models, meta)
+
 
+def _write_checkpoint(checkpoints: CheckpointManager, path: str, state: dict, run_id: Optional[str]):
+    checkpoints.write(path, state)
+    if run_id is not None and MlflowClient is not None:
+        # MlflowClient + explicit run_id: the active run is thread-local
+        MlflowClient().log_artifact(run_id, path, artifact_path="checkpoints")
 
-def _load_checkpoint(path: str) -> tuple[list[SGDClassifier], FeatureHasher, int, int, Config]:
+
+def _save_checkpoint(
+    checkpoints: CheckpointManager,
+    path: str,
+    models: list[SGDClassifier],
+    hasher: FeatureHasher,
+    cfg: Config,
+    chunks_trained: int,
+    trained_rows: int,
+    input_rows: int,
+):
+    state = _checkpoint_state(checkpoints, path, models, hasher, cfg, chunks_trained, trained_rows, input_rows)
+    checkpoints.write(path, state)
+
+
+def _load_checkpoint(
+    path: str, data_path: Optional[str] = None
+) -> tuple[list[SGDClassifier], FeatureHasher, int, int, int, Config]:
+    """
+    Models, hasher, counters and config of a checkpoint. With `data_path`,
+    refuses to resume on another file than the one the checkpoint's row
+    offset belongs to.
+    """
     state = joblib.load(path)
     cfg = Config(**state["config"])
-    return state["models"], state["hasher"], state["chunks_trained"], state["trained_rows"], cfg
+    position = state.get("input_position")
+    if position is not None:
+        input_rows = int(position["rows"])
+        checkpoint_data = position["data_path"]
+    else:
+        # Legacy checkpoint: the old loop resumed after `chunks_trained` chunks
+        input_rows = int(state["chunks_trained"]) * cfg.chunk_size
+        checkpoint_data = cfg.data_path
+    if data_path is not None and os.path.realpath(checkpoint_data) != os.path.realpath(data_path):
+        raise ValueError(
+            f"Checkpoint {path} stopped at row {input_rows} of {checkpoint_data}, but --data-path is "
+            f"{data_path}; resume with the same data file (the row offset is meaningless in another one)"
+        )
+    if state.get("format") == COMPACT_FORMAT:
+        models = load_compact_models(state, path)
+    else:
+        models = state["models"]
+    return models, state["hasher"], state["chunks_trained"], state["trained_rows"], input_rows, cfg
 
 
 def _setup_mlflow(cfg: Config):
@@ -163,9 +335,11 @@ def _setup_mlflow(cfg: Config):
             "val_chunks": cfg.val_chunks,
             "checkpoint_every": cfg.checkpoint_every,
             "seed": cfg.seed,
-            "model_type": "sgd_classifier",
+            "model_type": "ftrl" if cfg.ensemble_type == "ftrl" else "sgd_classifier",
             "ensemble_type": cfg.ensemble_type,
-            "n_estimators": cfg.n_estimators if cfg.ensemble_type != "single" else 1,
+            "n_estimators": _n_members(cfg),
+            "row_start": cfg.row_start,
+            "row_end": cfg.row_end or 0,
         }
     )
     return run
@@ -213,17 +387,107 @@ def _parse_args() -> Config:
     parser.add_argument("--use-feature-cross", action="store_true", default=_env_bool("USE_FEATURE_CROSS", True))
     parser.add_argument("--disable-feature-cross", action="store_true")
     parser.add_argument("--cross-list", default=os.getenv("CROSS_LIST", ""))
-    parser.add_argument("--ensemble", choices=["bagging_sgd", "single"], default=os.getenv("ENSEMBLE", "bagging_sgd"))
+    parser.add_argument(
+        "--ensemble", choices=["bagging_sgd", "single", "ftrl"], default=os.getenv("ENSEMBLE", "bagging_sgd")
+    )
     parser.add_argument("--n-estimators", type=int, default=_env_int("N_ESTIMATORS", 5))
     parser.add_argument("--rebalancing", default=os.getenv("REBALANCING", "class_weight_balanced"))
     parser.add_argument("--metric-gate-pr-auc", type=float, default=float(os.getenv("METRIC_GATE_PR_AUC", "0.20")))
     parser.add_argument("--resume-from", default=os.getenv("RESUME_FROM", ""))
     parser.add_argument("--register-name", default=os.getenv("MODEL_REGISTER_NAME", "avazu_ctr"))
     parser.add_argument("--register-stage", default=os.getenv("MODEL_REGISTER_STAGE", "Staging"))
+    parser.add_argument(
+        "--feature-cache",
+        default=os.getenv("FEATURE_CACHE_DIR", ""),
+        help="cache root for pre-hashed features (materialized on first use); empty = parse CSV",
+    )
+    parser.add_argument("--ingest", choices=INGEST_BACKENDS, default=os.getenv("INGEST_BACKEND", "pandas"))
+    parser.add_argument(
+        "--prefetch-depth",
+        type=int,
+        default=_env_int("PREFETCH_DEPTH", 0),
+        help="chunks read+hashed ahead in background threads (0 = serial)",
+    )
+    parser.add_argument("--prefetch-workers", type=int, default=_env_int("PREFETCH_WORKERS", 1))
+    parser.add_argument(
+        "--prefetch-max-mb",
+        type=int,
+        default=_env_int("PREFETCH_MAX_MB", 0),
+        help="max MB of hashed chunks buffered ahead (0 = bounded by depth only)",
+    )
+    parser.add_argument(
+        "--row-start",
+        type=int,
+        default=_env_int("ROW_START", 0),
+        help="first data row to read (seeks via src/gzip_index.py sidecars when present)",
+    )
+    parser.add_argument(
+        "--row-end",
+        type=int,
+        default=_env_int("ROW_END", 0),
+        help="stop before this data row (0 = end of file); covers train + validation chunks",
+    )
+    parser.add_argument(
+        "--train-workers",
+        type=int,
+        default=_env_int("TRAIN_WORKERS", 1),
+        help="threads running bagging_sgd members' partial_fit in parallel (1 = sequential)",
+    )
+    parser.add_argument("--ftrl-alpha", type=float, default=float(os.getenv("FTRL_ALPHA", "0.05")))
+    parser.add_argument("--ftrl-beta", type=float, default=float(os.getenv("FTRL_BETA", "1.0")))
+    parser.add_argument("--ftrl-l1", type=float, default=float(os.getenv("FTRL_L1", "1.0")))
+    parser.add_argument("--ftrl-l2", type=float, default=float(os.getenv("FTRL_L2", "1.0")))
+    parser.add_argument("--ftrl-batch-size", type=int, default=_env_int("FTRL_BATCH_SIZE", 1024))
+    parser.add_argument(
+        "--val-metrics",
+        choices=VAL_METRIC_MODES,
+        default=os.getenv("VAL_METRICS", "binned"),
+        help="binned = constant-memory AUC/PR-AUC with error bounds; exact = keep every score",
+    )
+    parser.add_argument("--metric-bins", type=int, default=_env_int("METRIC_BINS", DEFAULT_BINS))
+    parser.add_argument(
+        "--validation",
+        choices=["holdout", "progressive"],
+        default=os.getenv("VALIDATION", "holdout"),
+        help="holdout = score val chunks after training; progressive = score each chunk before training on it",
+    )
+    parser.add_argument(
+        "--early-stop-patience",
+        type=int,
+        default=_env_int("EARLY_STOP_PATIENCE", 0),
+        help="progressive only: stop after this many chunks without logloss improvement (0 = off)",
+    )
+    parser.add_argument(
+        "--early-stop-min-delta", type=float, default=float(os.getenv("EARLY_STOP_MIN_DELTA", "1e-4"))
+    )
+    parser.add_argument(
+        "--checkpoint-queue",
+        type=int,
+        default=_env_int("CHECKPOINT_QUEUE", 2),
+        help="checkpoints waiting for the background writer before training blocks (0 = write inline)",
+    )
+    parser.add_argument(
+        "--checkpoint-format",
+        choices=CHECKPOINT_FORMATS,
+        default=os.getenv("CHECKPOINT_FORMAT", "pickle"),
+        help="compact = float32 weights + sparse deltas (resume is approximate); pickle = full objects",
+    )
+    parser.add_argument(
+        "--checkpoint-full-every",
+        type=int,
+        default=_env_int("CHECKPOINT_FULL_EVERY", 5),
+        help="compact only: every Nth checkpoint is full, the rest are deltas against it",
+    )
+    parser.add_argument(
+        "--checkpoint-keep",
+        type=int,
+        default=_env_int("CHECKPOINT_KEEP", 0),
+        help="keep only the newest N checkpoints of this run (0 = keep all)",
+    )
     args = parser.parse_args()
 
     use_feature_cross = args.use_feature_cross and not args.disable_feature_cross
-    cross_list = _parse_cross_list(args.cross_list)
+    cross_list = parse_cross_list(args.cross_list)
 
     if args.val_chunks <= 0:
         val_chunks = max(1, math.ceil(args.val_rows / args.chunk_size))
@@ -248,6 +512,28 @@ def _parse_args() -> Config:
         resume_from=args.resume_from or None,
         register_name=args.register_name,
         register_stage=args.register_stage,
+        feature_cache=args.feature_cache or None,
+        ingest=args.ingest,
+        prefetch_depth=args.prefetch_depth,
+        prefetch_workers=args.prefetch_workers,
+        prefetch_max_mb=args.prefetch_max_mb,
+        row_start=args.row_start,
+        row_end=args.row_end or None,
+        train_workers=args.train_workers,
+        ftrl_alpha=args.ftrl_alpha,
+        ftrl_beta=args.ftrl_beta,
+        ftrl_l1=args.ftrl_l1,
+        ftrl_l2=args.ftrl_l2,
+        ftrl_batch_size=args.ftrl_batch_size,
+        val_metrics=args.val_metrics,
+        metric_bins=args.metric_bins,
+        validation=args.validation,
+        early_stop_patience=args.early_stop_patience,
+        early_stop_min_delta=args.early_stop_min_delta,
+        checkpoint_queue=args.checkpoint_queue,
+        checkpoint_format=args.checkpoint_format,
+        checkpoint_full_every=args.checkpoint_full_every,
+        checkpoint_keep=args.checkpoint_keep,
     )
 
 
@@ -261,17 +547,12 @@ def main():
     hasher = FeatureHasher(n_features=cfg.hash_n_features, input_type="dict")
     trained_rows = 0
     chunks_trained = 0
+    input_rows = cfg.row_start
     models: list[SGDClassifier]
 
-    reader = pd.read_csv(
-        cfg.data_path,
-        compression="gzip",
-        chunksize=cfg.chunk_size,
-    )
-
     if cfg.resume_from:
-        models, hasher, chunks_trained, trained_rows, resume_cfg = _load_checkpoint(cfg.resume_from)
-        print(f"Resuming from chunk={chunks_trained} rows={trained_rows}")
+        models, hasher, chunks_trained, trained_rows, input_rows, resume_cfg = _load_checkpoint(cfg.resume_from, cfg.data_path)
+        print(f"Resuming from chunk={chunks_trained} rows={trained_rows} input_row={input_rows}")
         # Keep model/feature config from checkpoint to avoid mismatches
         cfg.hash_n_features = resume_cfg.hash_n_features
         cfg.use_feature_cross = resume_cfg.use_feature_cross
@@ -279,11 +560,15 @@ def main():
         cfg.ensemble_type = resume_cfg.ensemble_type
         cfg.n_estimators = resume_cfg.n_estimators
         cfg.rebalancing = resume_cfg.rebalancing
-    else:
+
+    reader = _open_reader(cfg, start_row=input_rows)
+    pool = _train_pool(cfg)
+
+    if not cfg.resume_from:
         first_chunk = next(reader, None)
         if first_chunk is None:
             raise ValueError("No data available in training file")
-        y_first = first_chunk["click"].astype(int).to_numpy()
+        X_first, y_first = _chunk_xy(cfg, hasher, first_chunk)
         if cfg.rebalancing == "class_weight_balanced":
             cw = compute_class_weight("balanced", classes=classes, y=y_first)
             class_weight_param = {int(c): float(w) for c, w in zip(classes, cw)}
@@ -291,97 +576,112 @@ def main():
             class_weight_param = None
         models = _build_models(cfg, class_weight_param)
 
-        X_first_raw = first_chunk.drop(columns=["click"])
-        X_first = hasher.transform(
-            to_feature_dict(
-                X_first_raw,
-                add_feature_cross=cfg.use_feature_cross,
-                cross_pairs=cfg.cross_list,
-            )
-        )
-        _train_on_chunk(models, X_first, y_first, classes)
-        trained_rows += len(first_chunk)
+        _train_on_chunk(models, X_first, y_first, classes, pool)
+        trained_rows += len(y_first)
+        input_rows += len(y_first)
         chunks_trained += 1
 
     run = _setup_mlflow(cfg)
 
     # Train chunks
-    current_chunk = 0
     last_checkpoint_path = None
-    for chunk in reader:
-        current_chunk += 1
-        if current_chunk <= chunks_trained:
-            continue
-        if chunks_trained >= cfg.max_train_chunks:
-            break
-
-        y = chunk["click"].astype(int).to_numpy()
-        X_raw = chunk.drop(columns=["click"])
-        X_h = hasher.transform(
-            to_feature_dict(
-                X_raw,
-                add_feature_cross=cfg.use_feature_cross,
-                cross_pairs=cfg.cross_list,
-            )
+    batches = _chunk_stream(cfg, hasher, reader)
+    progressive = None
+    if cfg.validation == "progressive":
+        progressive = ProgressiveValidation(
+            make_metrics(cfg.val_metrics, capacity=cfg.max_train_chunks * cfg.chunk_size, n_bins=cfg.metric_bins),
+            patience=cfg.early_stop_patience,
+            min_delta=cfg.early_stop_min_delta,
+            n_bins=cfg.metric_bins,
         )
-
-        _train_on_chunk(models, X_h, y, classes)
-
-        trained_rows += len(chunk)
-        chunks_trained += 1
-
-        if cfg.checkpoint_every > 0 and chunks_trained % cfg.checkpoint_every == 0:
-            ckpt_path = f"models/checkpoints/ckpt_chunk_{chunks_trained}.joblib"
-            _save_checkpoint(ckpt_path, models, hasher, cfg, chunks_trained, trained_rows)
-            last_checkpoint_path = ckpt_path
-            if mlflow is not None:
-                mlflow.log_artifact(ckpt_path, artifact_path="checkpoints")
-
-        if chunks_trained >= cfg.max_train_chunks:
-            break
-
-    # Validation chunks (immediately after training chunks)
-    val_y: list[int] = []
-    val_proba: list[float] = []
+        val_metrics = progressive.total
+        # One weight buffer for the whole run, refreshed in place before each chunk
+        progressive_scorer = StackedLinearEnsemble.from_models(models)
+    else:
+        val_metrics = make_metrics(cfg.val_metrics, capacity=cfg.val_chunks * cfg.chunk_size, n_bins=cfg.metric_bins)
     val_rows_used = 0
     val_chunks_used = 0
+    early_stopped = False
+    writer = BackgroundWriter(max_pending=cfg.checkpoint_queue)
+    checkpoints = CheckpointManager(cfg.checkpoint_format, cfg.checkpoint_full_every, cfg.checkpoint_keep)
+    run_id = run.info.run_id if run is not None else None
+    try:
+        for X_h, y in batches:
+            if chunks_trained >= cfg.max_train_chunks:
+                break
 
-    for chunk in reader:
-        if val_chunks_used >= cfg.val_chunks:
-            break
-        val_chunks_used += 1
-        y = chunk["click"].astype(int).to_numpy()
-        X_raw = chunk.drop(columns=["click"])
-        X_h = hasher.transform(
-            to_feature_dict(
-                X_raw,
-                add_feature_cross=cfg.use_feature_cross,
-                cross_pairs=cfg.cross_list,
-            )
-        )
-        proba = _predict_proba(models, X_h)
-        val_y.extend(y.tolist())
-        val_proba.extend(proba.tolist())
-        val_rows_used += len(chunk)
+            if progressive is not None:
+                # Test-then-train: score with the model that has not seen this chunk yet
+                proba = progressive_scorer.refresh(models).predict_proba(X_h)
+                point = progressive.update(chunks_trained + 1, y, proba)
+                val_chunks_used += 1
+                val_rows_used += len(y)
+                if mlflow is not None and run is not None:
+                    mlflow.log_metrics(
+                        {f"progressive_{k}": v for k, v in point.items() if k not in ("chunk", "rows")},
+                        step=point["chunk"],
+                    )
+
+            _train_on_chunk(models, X_h, y, classes, pool)
+
+            trained_rows += len(y)
+            input_rows += len(y)
+            chunks_trained += 1
+
+            if cfg.checkpoint_every > 0 and chunks_trained % cfg.checkpoint_every == 0:
+                ckpt_path = f"models/checkpoints/ckpt_chunk_{chunks_trained}.joblib"
+                state = _checkpoint_state(
+                    checkpoints, ckpt_path, models, hasher, cfg, chunks_trained, trained_rows, input_rows
+                )
+                writer.submit(_write_checkpoint, checkpoints, ckpt_path, state, run_id)
+                last_checkpoint_path = ckpt_path
+
+            if progressive is not None and progressive.should_stop():
+                print(
+                    f"Early stop at chunk={chunks_trained}: chunk logloss has not improved on "
+                    f"{progressive.best_logloss:.5f} for {progressive.chunks_since_best} chunks"
+                )
+                early_stopped = True
+                break
 
-    val_auc = roc_auc_score(val_y, val_proba) if val_y else float("nan")
-    val_ll = log_loss(val_y, val_proba) if val_y else float("nan")
-    val_pr = average_precision_score(val_y, val_proba) if val_y else float("nan")
+            if chunks_trained >= cfg.max_train_chunks:
+                break
+
+        # Validation chunks (immediately after training chunks); progressive mode already scored every chunk
+        if progressive is None:
+            scorer = StackedLinearEnsemble.from_models(models)
+            for X_h, y in batches:
+                if val_chunks_used >= cfg.val_chunks:
+                    break
+                val_chunks_used += 1
+                proba = scorer.predict_proba(X_h)
+                val_metrics.update(y, proba)
+                val_rows_used += len(y)
+    finally:
+        batches.close()
+        if pool is not None:
+            pool.shutdown()
+        # Final flush: every queued checkpoint is on disk (and uploaded) before we go on
+        writer.close()
+
+    val_result = val_metrics.result()
+    val_auc = val_result["val_auc"]
+    val_ll = val_result["val_logloss"]
+    val_pr = val_result["val_pr_auc"]
 
     elapsed = time.time() - start
     run_type = "SMOKE/DEBUG" if trained_rows < 100000 or chunks_trained < 5 else "FINAL"
 
     model_path = "models/ctr_model_hashing.joblib"
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(
+    atomic_dump(
         {
-            "models": models,
+            **_model_payload(cfg, models),
             "hasher": hasher,
             "hash_n_features": cfg.hash_n_features,
             "use_feature_cross": cfg.use_feature_cross,
             "cross_pairs": cfg.cross_list,
             "ensemble_type": cfg.ensemble_type,
-            "n_estimators": cfg.n_estimators if cfg.ensemble_type != "single" else 1,
+            "n_estimators": _n_members(cfg),
             "rebalancing": cfg.rebalancing,
         },
         model_path,
@@ -397,6 +697,11 @@ def main():
         "val_rows": int(val_rows_used),
         "val_rows_used": int(val_rows_used),
         "val_chunks_used": int(val_chunks_used),
+        "val_metrics_mode": cfg.val_metrics,
+        "validation": cfg.validation,
+        "early_stopped": early_stopped,
+        "progressive_curve": progressive.curve if progressive is not None else None,
+        **{k: v for k, v in val_result.items() if k.endswith("_error_bound")},
         "elapsed_seconds": float(elapsed),
         "hash_n_features": int(cfg.hash_n_features),
         "chunk_size": int(cfg.chunk_size),
@@ -407,7 +712,9 @@ def main():
         "cross_pairs": cfg.cross_list,
         "rebalancing": cfg.rebalancing,
         "ensemble_type": cfg.ensemble_type,
-        "n_estimators": int(cfg.n_estimators if cfg.ensemble_type != "single" else 1),
+        "n_estimators": int(_n_members(cfg)),
+        "row_start": int(cfg.row_start),
+        "row_end": int(cfg.row_end or 0),
         "run_type": run_type,
     }
 
@@ -415,10 +722,12 @@ def main():
     with open("metrics/metrics.json", "w", encoding="utf-8") as f:
         json.dump(metrics, f, indent=2)
 
+    final_checkpoint_path = None
     if last_checkpoint_path is None:
-        ckpt_path = f"models/checkpoints/ckpt_chunk_{chunks_trained}.joblib"
-        _save_checkpoint(ckpt_path, models, hasher, cfg, chunks_trained, trained_rows)
-        last_checkpoint_path = ckpt_path
+        final_checkpoint_path = f"models/checkpoints/ckpt_chunk_{chunks_trained}.joblib"
+        _save_checkpoint(
+            checkpoints, final_checkpoint_path, models, hasher, cfg, chunks_trained, trained_rows, input_rows
+        )
 
     if mlflow is not None and run is not None:
         mlflow.log_metrics(
@@ -430,8 +739,9 @@ def main():
         )
         mlflow.log_artifact(model_path, artifact_path="model")
         mlflow.log_artifact("metrics/metrics.json", artifact_path="metrics")
-        if last_checkpoint_path:
-            mlflow.log_artifact(last_checkpoint_path, artifact_path="checkpoints")
+        if final_checkpoint_path:
+            # Periodic checkpoints were uploaded by the background writer
+            mlflow.log_artifact(final_checkpoint_path, artifact_path="checkpoints")
 
         run_id = mlflow.active_run().info.run_id
         metrics["mlflow_run_id"] = run_id
@@ -0,0 +1,89 @@
+import csv
+import gzip
+import json
+import sys
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.linear_model import SGDClassifier
+
+from src.feature_utils import hash_features
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+TRAIN_HEADER = ["id", "click", "site_id", "app_id", "site_domain", "app_domain", "device_type", "device_conn_type"]
+
+
+def _default_click(i):
+    return 1 if i % 9 == 0 else 0
+
+
+@pytest.fixture
+def make_train_gz(tmp_path):
+    """Writes a small Avazu-like `train.gz` under tmp_path: `make(n_rows, click=lambda i: 0/1)`."""
+    def make(n_rows=150, click=_default_click):
+        path = tmp_path / "train.gz"
+        with gzip.open(path, "wt", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(TRAIN_HEADER)
+            writer.writerows(
+                [i, click(i), f"s{i % 5}", f"a{i % 7}", f"sd{i % 11}", f"ad{i % 13}", i % 3, i % 2]
+                for i in range(n_rows)
+            )
+        return path
+
+    return make
+
+
+@pytest.fixture
+def train_gz(make_train_gz):
+    return make_train_gz()
+
+
+@pytest.fixture
+def run_train(tmp_path, monkeypatch):
+    """`run(argv)`: src/train_streaming.py main() with cwd = tmp_path; returns metrics.json."""
+    train = SourceFileLoader("train_streaming", str(REPO_ROOT / "src" / "train_streaming.py")).load_module()
+    monkeypatch.chdir(tmp_path)
+
+    def run(argv):
+        monkeypatch.setattr(sys, "argv", ["train_streaming.py"] + list(argv))
+        train.main()
+        return json.loads((tmp_path / "metrics" / "metrics.json").read_text())
+
+    return run
+
+
+@pytest.fixture
+def linear_artifact():
+    """
+    `make(n_features=2**10, cross_pairs=None, n_estimators=3, seed=0)`: artifact
+    dict of bagged logistic SGD members (what bagging_sgd saves), trained on
+    random site_id / app_id / device_type rows; crosses on when `cross_pairs` is given.
+    """
+    def make(n_features=2**10, cross_pairs=None, n_estimators=3, n_rows=400, seed=0):
+        rng = np.random.default_rng(seed)
+        site = rng.integers(0, 30, n_rows)
+        df = pd.DataFrame({
+            "site_id": [f"s{v}" for v in site],
+            "app_id": [f"a{v}" for v in rng.integers(0, 20, n_rows)],
+            "device_type": rng.integers(0, 4, n_rows),
+        })
+        y = ((site % 3 == 0) ^ (rng.random(n_rows) < 0.2)).astype(int)
+        X = hash_features(df, n_features, add_feature_cross=cross_pairs is not None, cross_pairs=cross_pairs)
+        models = [
+            SGDClassifier(loss="log_loss", alpha=1e-4, random_state=s).partial_fit(X, y, classes=[0, 1])
+            for s in range(n_estimators)
+        ]
+        return {
+            "models": models,
+            "hasher": FeatureHasher(n_features=n_features, input_type="dict"),
+            "use_feature_cross": cross_pairs is not None,
+            "cross_pairs": list(cross_pairs) if cross_pairs is not None else None,
+        }
+
+    return make
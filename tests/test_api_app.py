@@ -0,0 +1,205 @@
+"""
+Endpoint tests for app/app.py through FastAPI's TestClient.
+
+The app loads its artifact at import time, so each test writes a small
+linear ensemble, points MODEL_PATH at it and (re)imports app.app.
+"""
+import importlib
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "site_id": [f"s{v}" for v in rng.integers(0, 20, n)],
+        "app_id": [f"a{v}" for v in rng.integers(0, 10, n)],
+        "device_type": rng.integers(0, 4, n),
+    })
+
+
+@pytest.fixture
+def model_path(tmp_path, linear_artifact):
+    path = tmp_path / "model.joblib"
+    joblib.dump(linear_artifact(cross_pairs=[("site_id", "app_id")]), path)
+    return path
+
+
+@pytest.fixture
+def make_client(model_path, monkeypatch):
+    def make(**env):
+        monkeypatch.setenv("MODEL_PATH", str(model_path))
+        for key, value in env.items():
+            monkeypatch.setenv(key, str(value))
+        import app.app as app_module
+
+        return TestClient(importlib.reload(app_module).app)
+
+    return make
+
+
+def _requests(n, seed=1):
+    records = _frame(n, seed).to_dict(orient="records")
+    records[0].pop("device_type")  # int column with a missing key must not turn into floats
+    return records
+
+
+def test_batch_matches_single_predictions_in_order(make_client):
+    client = make_client()
+    records = _requests(12)
+    resp = client.post("/predict/batch", json={"features": records})
+    assert resp.status_code == 200
+    batch = resp.json()["predictions"]
+
+    singles = [client.post("/predict", json={"features": r}).json() for r in records]
+    assert batch == singles
+
+
+def test_batch_size_limit(make_client):
+    client = make_client(MAX_BATCH_SIZE=4)
+    assert client.post("/predict/batch", json={"features": _requests(4)}).status_code == 200
+    resp = client.post("/predict/batch", json={"features": _requests(5)})
+    assert resp.status_code == 413
+    assert "MAX_BATCH_SIZE=4" in resp.json()["detail"]
+
+
+def test_batch_rejects_rows_without_features(make_client):
+    client = make_client()
+    resp = client.post("/predict/batch", json={"features": [{"site_id": "s1"}, {"id": 3}]})
+    assert resp.status_code == 400
+    assert "features[1]" in resp.json()["detail"]
+    assert client.post("/predict/batch", json={"features": []}).json() == {"predictions": []}
+
+
+def test_micro_batched_predict_matches_direct_scoring(make_client):
+    records = _requests(6)
+    direct = [make_client().post("/predict", json={"features": r}).json() for r in records]
+
+    with make_client(PREDICT_BATCHING=1, BATCH_WINDOW_MS=1) as client:
+        batched = [client.post("/predict", json={"features": r}).json() for r in records]
+        assert client.post("/predict", json={"features": {"id": 1}}).status_code == 400
+        import app.app as app_module
+
+        assert app_module.batcher.requests == len(records) + 1
+    assert batched == direct
+
+
+def test_rank_shares_context_and_sorts(make_client):
+    client = make_client()
+    context = {"site_id": "s4", "app_id": "a2", "device_type": 1, "id": 99}
+    candidates = [{"app_id": f"a{i}"} for i in range(8)] + [{"device_type": None}, {"site_id": "s9", "C1": 1005}]
+    resp = client.post("/rank", json={"context": context, "candidates": candidates})
+    assert resp.status_code == 200
+    ranked = resp.json()["ranked"]
+
+    assert sorted(r["index"] for r in ranked) == list(range(len(candidates)))
+    probas = [r["click_probability"] for r in ranked]
+    assert probas == sorted(probas, reverse=True)
+    for r in ranked:
+        merged = {**context, **candidates[r["index"]]}
+        single = client.post("/predict", json={"features": merged}).json()["click_probability"]
+        assert r["click_probability"] == pytest.approx(single, rel=1e-12, abs=1e-15)
+
+    top = client.post("/rank", json={"context": context, "candidates": candidates, "top_k": 3}).json()["ranked"]
+    assert top == ranked[:3]
+    assert client.post("/rank", json={"context": context, "candidates": candidates, "top_k": 0}).status_code == 422
+    assert client.post("/rank", json={"context": {}, "candidates": [{"id": 1}]}).status_code == 400
+
+
+def test_stats_reports_token_cache(make_client):
+    client = make_client(TOKEN_CACHE_SIZE=50)
+    record = _requests(1)[0]
+    client.post("/predict", json={"features": record})
+    client.post("/predict", json={"features": record})
+    cache = client.get("/stats").json()["token_cache"]
+    assert cache["capacity"] == 50
+    assert cache["hits"] == cache["misses"] > 0
+
+    assert make_client(TOKEN_CACHE_SIZE=0).get("/stats").json()["token_cache"] is None
+
+
+def test_result_cache_hits_and_reload_invalidation(make_client, model_path):
+    client = make_client(RESULT_CACHE_SIZE=100, RESULT_CACHE_TTL_S=60)
+    record = _requests(1)[0]
+    first = client.post("/predict", json={"features": record}).json()
+    # Same dict, different key order: served from the cache
+    again = client.post("/predict", json={"features": dict(reversed(list(record.items())))}).json()
+    assert again == first
+    stats = client.get("/stats").json()["result_cache"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+    assert client.post("/reload").json()["reloaded"] is False
+
+    # A new artifact at MODEL_PATH: every member pushed towards "click"
+    artifact = joblib.load(model_path)
+    for m in artifact["models"]:
+        m.intercept_ = m.intercept_ + 5.0
+    joblib.dump(artifact, model_path)
+    assert client.post("/reload").json()["reloaded"] is True
+
+    stats = client.get("/stats").json()["result_cache"]
+    assert stats["size"] == 0 and stats["invalidations"] == 1
+    reloaded = client.post("/predict", json={"features": record}).json()
+    assert reloaded["click_probability"] > first["click_probability"]
+
+
+def test_predict_stream_ndjson(make_client):
+    client = make_client(STREAM_BATCH_SIZE=4)
+    records = _requests(10)
+    body = "".join(json.dumps({"features": r}) + "\n" for r in records) + "{broken\n"
+    resp = client.post("/predict/stream", content=body, headers={"content-type": "application/x-ndjson"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    out = [json.loads(line) for line in resp.text.splitlines()]
+
+    singles = [client.post("/predict", json={"features": r}).json() for r in records]
+    assert [o["click_probability"] for o in out[:10]] == [s["click_probability"] for s in singles]
+    assert out[10]["line"] == 11 and "error" in out[10]
+
+
+def test_metrics_and_server_timing(make_client):
+    client = make_client(SERVER_TIMING=1)
+    records = _requests(3)
+    resp = client.post("/predict", json={"features": records[1]})
+    stages = [part.split(";")[0] for part in resp.headers["server-timing"].split(", ")]
+    assert stages[0] == "parse" and stages[-1] == "total"
+    assert {"hash", "score"} <= set(stages)
+    assert client.post("/predict", json={"features": {"id": 1}}).status_code == 400
+    # Sync endpoint: timings reach the threadpool
+    assert "score;dur=" in client.post("/predict/batch", json={"features": records}).headers["server-timing"]
+    client.get("/no-such-path")
+
+    resp = client.get("/metrics")
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+    assert 'ctr_requests_total{endpoint="/predict",method="POST",status="200"} 1' in text
+    assert 'ctr_requests_total{endpoint="/predict",method="POST",status="400"} 1' in text
+    assert 'ctr_request_errors_total{endpoint="/predict"} 1' in text
+    assert 'ctr_requests_total{endpoint="other",method="GET",status="404"} 1' in text
+    assert 'ctr_stage_duration_seconds_count{endpoint="/predict",stage="score"} 1' in text
+    assert 'ctr_stage_duration_seconds_count{endpoint="/predict/batch",stage="hash"} 1' in text
+    assert "server-timing" not in make_client(SERVER_TIMING=0).post("/predict", json={"features": records[1]}).headers
+
+
+def test_prediction_log_is_written_on_shutdown(make_client, tmp_path, monkeypatch):
+    import monitoring.log as log
+
+    monkeypatch.setattr(log, "LOG_PATH", tmp_path / "predictions.csv")
+    records = _requests(5)
+    with make_client(PREDICTION_LOG=1, PREDICTION_LOG_FLUSH_S=30) as client:
+        single = client.post("/predict", json={"features": records[0]}).json()
+        batch = client.post("/predict/batch", json={"features": records[1:]}).json()["predictions"]
+        body = "\n".join(json.dumps({"features": r}) for r in records[:2])
+        assert client.post("/predict/stream", content=body).status_code == 200
+    logged = pd.read_csv(log.LOG_PATH)
+
+    served = [single] + batch
+    assert logged["proba"].tolist()[:5] == pytest.approx([p["click_probability"] for p in served], rel=1e-15)
+    assert logged["prediction"].tolist()[:5] == [p["click_prediction"] for p in served]
+    assert len(logged) == 7 and logged["y_true"].isna().all()
@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.batching import MicroBatcher
+
+
+def _predict_batch(calls):
+    def predict_batch(records):
+        calls.append(len(records))
+        for r in records:
+            if "bad" in r:
+                raise ValueError(f"bad record {r['bad']}")
+        return np.array([r["x"] / 10 for r in records])
+
+    return predict_batch
+
+
+async def _gather(batcher, records):
+    await batcher.start()
+    try:
+        return await asyncio.gather(*(batcher.submit(r) for r in records), return_exceptions=True)
+    finally:
+        await batcher.stop()
+
+
+def test_concurrent_calls_are_coalesced_and_resolved_in_order():
+    calls = []
+    batcher = MicroBatcher(_predict_batch(calls), max_batch_size=8, max_wait_ms=50)
+    results = asyncio.run(_gather(batcher, [{"x": i} for i in range(20)]))
+    assert results == [i / 10 for i in range(20)]
+    assert calls == [8, 8, 4]
+    assert (batcher.batches, batcher.requests) == (3, 20)
+
+
+def test_window_flushes_a_partial_batch():
+    calls = []
+    batcher = MicroBatcher(_predict_batch(calls), max_batch_size=64, max_wait_ms=1)
+
+    async def run():
+        await batcher.start()
+        try:
+            return await asyncio.wait_for(batcher.submit({"x": 3}), timeout=1)
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()) == pytest.approx(0.3)
+    assert calls == [1]
+
+
+def test_bad_request_only_fails_its_own_caller():
+    calls = []
+    batcher = MicroBatcher(_predict_batch(calls), max_batch_size=8, max_wait_ms=50)
+    results = asyncio.run(_gather(batcher, [{"x": 1}, {"bad": 7}, {"x": 2}]))
+    assert results[0] == pytest.approx(0.1) and results[2] == pytest.approx(0.2)
+    assert isinstance(results[1], ValueError)
+
+
+def test_submit_requires_start():
+    batcher = MicroBatcher(_predict_batch([]))
+    with pytest.raises(RuntimeError, match="not running"):
+        asyncio.run(batcher.submit({"x": 1}))
@@ -0,0 +1,70 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from checkpoint_writer import BackgroundWriter, atomic_dump  # noqa: E402
+
+
+def test_atomic_dump_keeps_previous_file_on_failure(tmp_path):
+    path = tmp_path / "ckpt" / "model.joblib"
+    atomic_dump({"version": 1}, str(path))
+    assert joblib.load(path) == {"version": 1}
+
+    with pytest.raises(Exception):
+        atomic_dump({"bad": threading.Lock()}, str(path))
+    assert joblib.load(path) == {"version": 1}
+    assert [p.name for p in path.parent.iterdir()] == ["model.joblib"]
+
+
+def test_writer_runs_jobs_in_order_and_flushes():
+    done = []
+    writer = BackgroundWriter(max_pending=2)
+    for i in range(5):
+        writer.submit(lambda i=i: (time.sleep(0.01), done.append(i)))
+    writer.flush()
+    assert done == [0, 1, 2, 3, 4]
+    writer.close()
+
+
+def test_writer_queue_is_bounded():
+    release = threading.Event()
+    writer = BackgroundWriter(max_pending=1)
+    writer.submit(release.wait)  # taken by the worker, blocks it
+    time.sleep(0.05)
+    writer.submit(lambda: None)  # fills the queue
+
+    third = threading.Thread(target=writer.submit, args=(lambda: None,))
+    third.start()
+    third.join(timeout=0.2)
+    assert third.is_alive(), "submit should block while the queue is full"
+
+    release.set()
+    third.join(timeout=5)
+    assert not third.is_alive()
+    writer.close()
+
+
+def test_writer_surfaces_errors():
+    def fail():
+        raise OSError("disk full")
+
+    writer = BackgroundWriter(max_pending=2)
+    writer.submit(fail)
+    with pytest.raises(RuntimeError, match="background checkpoint write failed"):
+        writer.flush()
+    writer.close()
+
+
+def test_inline_mode():
+    done = []
+    writer = BackgroundWriter(max_pending=0)
+    writer.submit(done.append, 1)
+    assert done == [1]
+    writer.close()
@@ -0,0 +1,132 @@
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import SGDClassifier
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from compact_checkpoint import CheckpointManager, load_models  # noqa: E402
+from feature_utils import hash_features  # noqa: E402
+from ftrl import FTRLProximal  # noqa: E402
+
+
+def _chunk(seed, n=300):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "click": rng.integers(0, 2, n),
+        "site_id": [f"s{v}" for v in rng.integers(0, 40, n)],
+        "app_id": [f"a{v}" for v in rng.integers(0, 25, n)],
+    })
+    return hash_features(df.drop(columns=["click"]), 2**12, add_feature_cross=False), df["click"].to_numpy()
+
+
+def test_ftrl_deltas_round_trip(tmp_path):
+    model = FTRLProximal(2**12, batch_size=64)
+    manager = CheckpointManager("compact", full_every=3)
+    paths = []
+    for i in range(3):
+        X, y = _chunk(i)
+        model.partial_fit(X, y)
+        path = str(tmp_path / f"ckpt_chunk_{i + 1}.joblib")
+        manager.write(path, manager.snapshot(path, [model], {"chunks_trained": i + 1}))
+        paths.append(path)
+
+    full, delta = joblib.load(paths[0]), joblib.load(paths[2])
+    assert full["base"] is None and "full" in full["arrays"][0]["z"]
+    assert delta["base"] == "ckpt_chunk_1.joblib"
+    # FTRL only touches the coordinates a chunk contains
+    assert "indices" in delta["arrays"][0]["z"]
+    assert len(delta["arrays"][0]["z"]["indices"]) < 2**12 // 2
+
+    [restored] = load_models(delta, paths[2])
+    assert restored.z.dtype == np.float64
+    np.testing.assert_allclose(restored.z, model.z, rtol=1e-6)
+    np.testing.assert_allclose(restored.n, model.n, rtol=1e-6)
+    assert restored.z0 == model.z0
+
+
+def test_delta_rejects_a_base_from_another_run(tmp_path):
+    model = FTRLProximal(2**12, batch_size=64)
+    manager = CheckpointManager("compact", full_every=3)
+    for i in range(2):
+        X, y = _chunk(i)
+        model.partial_fit(X, y)
+        path = str(tmp_path / f"ckpt_chunk_{i + 1}.joblib")
+        manager.write(path, manager.snapshot(path, [model], {}))
+    delta_path = path
+
+    # A later run writes its own full checkpoint under the same name
+    other = CheckpointManager("compact", full_every=3)
+    base_path = str(tmp_path / "ckpt_chunk_1.joblib")
+    other.write(base_path, other.snapshot(base_path, [FTRLProximal(2**12)], {}))
+
+    with pytest.raises(ValueError, match="overwritten by another run"):
+        load_models(joblib.load(delta_path), delta_path)
+
+
+def test_sgd_members_rebuild_and_keep_training(tmp_path):
+    models = [SGDClassifier(loss="log_loss", alpha=1e-6, random_state=s) for s in range(3)]
+    X, y = _chunk(0)
+    for m in models:
+        m.partial_fit(X, y, classes=np.array([0, 1]))
+
+    manager = CheckpointManager("compact")
+    path = str(tmp_path / "ckpt_chunk_1.joblib")
+    state = manager.snapshot(path, models, {})
+    manager.write(path, state)
+    assert state["arrays"][0]["coef_"]["full"].dtype == np.float32
+
+    restored = load_models(joblib.load(path), path)
+    X2, y2 = _chunk(1)
+    for a, b in zip(models, restored):
+        np.testing.assert_allclose(b.coef_, a.coef_, rtol=1e-6)
+        assert b.coef_.dtype == np.float64 and b.t_ == a.t_
+        a.partial_fit(X2, y2)
+        b.partial_fit(X2, y2)
+        # float32 rounding only perturbs the continued fit slightly
+        assert np.linalg.norm(b.coef_ - a.coef_) < 1e-3 * np.linalg.norm(a.coef_)
+
+
+def test_retention_keeps_delta_bases(tmp_path):
+    model = FTRLProximal(2**12, batch_size=64)
+    manager = CheckpointManager("compact", full_every=3, keep=2)
+    for i in range(5):
+        X, y = _chunk(i)
+        model.partial_fit(X, y)
+        path = str(tmp_path / f"ckpt_chunk_{i + 1}.joblib")
+        manager.write(path, manager.snapshot(path, [model], {}))
+    # 4 is full, 5 is a delta against 4; 1-3 are pruned
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ckpt_chunk_4.joblib", "ckpt_chunk_5.joblib"]
+
+    manager = CheckpointManager("compact", full_every=10, keep=1)
+    for i in range(3):
+        path = str(tmp_path / "run2" / f"ckpt_chunk_{i + 1}.joblib")
+        manager.write(path, manager.snapshot(path, [model], {}))
+    # ckpt_chunk_1 is the base of the kept delta
+    assert sorted(p.name for p in (tmp_path / "run2").iterdir()) == ["ckpt_chunk_1.joblib", "ckpt_chunk_3.joblib"]
+
+
+def test_train_streaming_resumes_from_compact_checkpoint(make_train_gz, tmp_path, run_train):
+    path = make_train_gz(160, click=lambda i: 1 if i % 4 == 0 else 0)
+    base = [
+        "--data-path", str(path),
+        "--chunk-size", "20",
+        "--max-train-chunks", "6",
+        "--val-chunks", "2",
+        "--checkpoint-every", "2",
+        "--hash-n-features", str(2**10),
+        "--checkpoint-format", "compact",
+    ]
+    full = run_train(base)
+
+    ckpt = tmp_path / "models" / "checkpoints" / "ckpt_chunk_4.joblib"
+    assert joblib.load(ckpt)["format"] == "compact-v1"
+    resumed = run_train(base + ["--resume-from", str(ckpt)])
+
+    assert resumed["trained_rows"] == full["trained_rows"]
+    assert resumed["val_logloss"] == pytest.approx(full["val_logloss"], rel=1e-4)
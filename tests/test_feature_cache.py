@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from feature_cache import FeatureCache, cache_key, materialize, open_cache  # noqa: E402
+from feature_utils import DEFAULT_CROSS_PAIRS, hash_features  # noqa: E402
+
+CROSS = [("site_id", "app_id"), ("device_type", "device_conn_type")]
+
+
+@pytest.fixture
+def train_gz(make_train_gz):
+    return make_train_gz(100, click=lambda i: 1 if i % 10 == 0 else 0)
+
+
+def test_cache_slices_match_csv_featurization(train_gz, tmp_path):
+    path = materialize(str(train_gz), 2**10, True, CROSS, cache_root=str(tmp_path / "cache"), chunk_size=30)
+    cache = FeatureCache(path)
+    assert cache.n_rows == 100
+
+    df = pd.read_csv(train_gz, compression="gzip")
+    for start, stop in [(0, 30), (30, 77), (77, 100)]:
+        X, y = cache.slice(start, stop)
+        X_ref = hash_features(df.iloc[start:stop], 2**10, cross_pairs=CROSS)
+        np.testing.assert_array_equal(X.indptr, X_ref.indptr)
+        np.testing.assert_array_equal(X.indices, X_ref.indices)
+        np.testing.assert_array_equal(X.data, X_ref.data)
+        np.testing.assert_array_equal(y, df["click"].to_numpy()[start:stop])
+
+
+def test_cache_key_depends_on_featurization_config(train_gz):
+    base = cache_key(str(train_gz), 2**10, True, CROSS)
+    assert base == cache_key(str(train_gz), 2**10, True, CROSS)
+    assert base != cache_key(str(train_gz), 2**12, True, CROSS)
+    assert base != cache_key(str(train_gz), 2**10, False, CROSS)
+    assert base != cache_key(str(train_gz), 2**10, True, CROSS[:1])
+
+
+def test_cache_key_default_cross_list_matches_none(train_gz):
+    # None means the default crosses in hash_features, so both must share one cache
+    assert cache_key(str(train_gz), 2**10, True, None) == cache_key(
+        str(train_gz), 2**10, True, list(DEFAULT_CROSS_PAIRS)
+    )
+
+
+def test_open_cache_without_materialize(train_gz, tmp_path):
+    root = str(tmp_path / "cache")
+    assert open_cache(str(train_gz), 2**10, True, CROSS, cache_root=root, materialize_if_missing=False) is None
+    assert open_cache(str(train_gz), 2**10, True, CROSS, cache_root=root).n_rows == 100
+
+
+def test_train_streaming_cache_matches_csv(train_gz, tmp_path, run_train):
+    args = [
+        "--data-path", str(train_gz),
+        "--chunk-size", "30",
+        "--max-train-chunks", "2",
+        "--val-chunks", "1",
+        "--checkpoint-every", "0",
+        "--hash-n-features", str(2**10),
+    ]
+
+    results = []
+    for extra in ([], ["--feature-cache", str(tmp_path / "cache")]):
+        metrics = run_train(args + extra)
+        results.append({k: metrics[k] for k in ("val_auc", "val_logloss", "val_pr_auc", "trained_rows", "val_rows")})
+
+    assert results[0] == results[1]
@@ -10,8 +10,16 @@ import pytest
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction import FeatureHasher
+from sklearn.utils import murmurhash3_32
 
-from src.feature_utils import to_feature_dict, _escape_token_part
+from src.feature_utils import (
+    to_feature_dict,
+    _escape_token_part,
+    hash_features,
+    murmurhash3_32_tokens,
+    record_tokens,
+    hash_record,
+)
 
 
 class TestEscapeTokenPart:
@@ -208,3 +216,125 @@ class TestHashingIntegration:
         # Verify cross feature exists in dict
         assert 'cross:site_id=s1|app_id=a1' in dicts[0]
 
+
+class TestHashFeaturesEquivalence:
+    """Columnar engine must be bit-identical to to_feature_dict + FeatureHasher."""
+
+    @staticmethod
+    def _reference(df, n_features, **kwargs):
+        hasher = FeatureHasher(n_features=n_features, input_type='dict')
+        return hasher.transform(to_feature_dict(df, **kwargs))
+
+    @staticmethod
+    def _assert_identical(X_ref, X_new):
+        assert X_new.shape == X_ref.shape
+        assert X_new.dtype == X_ref.dtype
+        np.testing.assert_array_equal(X_new.indptr, X_ref.indptr)
+        np.testing.assert_array_equal(X_new.indices, X_ref.indices)
+        np.testing.assert_array_equal(X_new.data, X_ref.data)
+
+    @pytest.fixture
+    def mixed_df(self):
+        rng = np.random.default_rng(0)
+        n = 300
+        return pd.DataFrame({
+            'id': np.arange(n),
+            'click': rng.integers(0, 2, n),
+            'hour': 14102100 + rng.integers(0, 24, n),
+            'site_id': [f's{i % 17}' for i in range(n)],
+            'app_id': [None if i % 11 == 0 else f'a|{i % 5}' for i in range(n)],
+            'site_domain': [f'd={i % 3}' for i in range(n)],
+            'app_domain': rng.choice(['x', 'ğüş', 'y z'], n),
+            'device_type': rng.integers(0, 5, n),
+            'device_conn_type': np.where(np.arange(n) % 7 == 0, np.nan, rng.integers(0, 4, n)),
+            'C15': rng.random(n),
+            'flag': rng.integers(0, 2, n).astype(bool),
+        })
+
+    @pytest.mark.parametrize('factorize', [False, True])
+    @pytest.mark.parametrize('add_feature_cross', [False, True])
+    def test_matches_reference(self, mixed_df, add_feature_cross, factorize):
+        X_ref = self._reference(mixed_df, 2**12, add_feature_cross=add_feature_cross)
+        X_new = hash_features(mixed_df, 2**12, add_feature_cross=add_feature_cross, factorize=factorize)
+        self._assert_identical(X_ref, X_new)
+
+    @pytest.mark.parametrize('factorize', [False, True])
+    def test_matches_reference_custom_and_duplicate_pairs(self, mixed_df, factorize):
+        pairs = [('hour', 'C15'), ('site_id', 'missing_col'), ('hour', 'C15'), ('flag', 'app_id')]
+        X_ref = self._reference(mixed_df, 2**8, cross_pairs=pairs)
+        X_new = hash_features(mixed_df, 2**8, cross_pairs=pairs, factorize=factorize)
+        self._assert_identical(X_ref, X_new)
+
+    @pytest.mark.parametrize('factorize', [False, True])
+    def test_matches_reference_keep_missing(self, mixed_df, factorize):
+        X_ref = self._reference(mixed_df, 2**10, skip_missing=False)
+        X_new = hash_features(mixed_df, 2**10, skip_missing=False, factorize=factorize)
+        self._assert_identical(X_ref, X_new)
+
+    @pytest.mark.parametrize('factorize', [False, True])
+    def test_matches_reference_arrow_table(self, mixed_df, factorize):
+        pa = pytest.importorskip('pyarrow')
+        table = pa.Table.from_pandas(mixed_df, preserve_index=False)
+        X_ref = self._reference(table.to_pandas(), 2**12)
+        X_new = hash_features(table, 2**12, factorize=factorize)
+        self._assert_identical(X_ref, X_new)
+
+    def test_factorize_keeps_values_with_distinct_str(self):
+        """Values equal under == but with different str() must hash separately."""
+        df = pd.DataFrame({
+            'signed_zero': [0.0, -0.0, np.nan, 0.0],
+            'mixed': [1, '1', 1.0, True],
+            'category': pd.Series(['p', None, 'q', 'p'], dtype='category'),
+        })
+        pairs = [('signed_zero', 'mixed'), ('mixed', 'category')]
+        X_ref = self._reference(df, 2**8, cross_pairs=pairs)
+        X_new = hash_features(df, 2**8, cross_pairs=pairs, factorize=True)
+        self._assert_identical(X_ref, X_new)
+
+    def test_murmurhash_matches_sklearn(self):
+        tokens = ['', 'a', 'ab', 'abc', 'abcd', 'abcde', 'site_id=ğüş', 'cross:a=1|b=2' * 4]
+        expected = [murmurhash3_32(t, seed=0) for t in tokens]
+        np.testing.assert_array_equal(murmurhash3_32_tokens(tokens), expected)
+
+
+class TestRecordFastPath:
+    """Single-request tokens/hashing must match the DataFrame path exactly."""
+
+    RECORDS = [
+        {'id': 7, 'click': 1, 'site_id': 'a=b|c', 'app_id': 'x', 'device_type': 1, 'device_conn_type': 0},
+        {'site_id': 's1', 'app_id': None, 'site_domain': 'd', 'app_domain': float('nan'), 'C14': 0.5},
+        {'site_id': 's1', 'app_id': 'a1', 'banner_pos': True, 'hour': 14102100},
+    ]
+
+    @pytest.mark.parametrize('record', RECORDS)
+    @pytest.mark.parametrize('pairs', [None, [('site_id', 'app_id'), ('site_id', 'app_id')]])
+    def test_tokens_match_to_feature_dict(self, record, pairs):
+        expected = to_feature_dict(pd.DataFrame([record]), add_feature_cross=True, cross_pairs=pairs)[0]
+        assert record_tokens(record, add_feature_cross=True, cross_pairs=pairs) == list(expected)
+
+    @pytest.mark.parametrize('alternate_sign', [True, False])
+    def test_hash_record_matches_feature_hasher(self, alternate_sign):
+        # 2**4 buckets: plenty of collisions, some cancelling to 0
+        tokens = [f'col{i}=v{i * 7}' for i in range(40)]
+        row = FeatureHasher(n_features=2**4, input_type='dict', alternate_sign=alternate_sign).transform(
+            [{t: 1 for t in tokens}]
+        )
+        indices, values = hash_record(tokens, 2**4, alternate_sign)
+        np.testing.assert_array_equal(indices, row.indices)
+        np.testing.assert_array_equal(values, row.data)
+
+    def test_skip_columns_splits_context_and_candidate_tokens(self):
+        context = {'site_id': 's1', 'site_domain': 'd1', 'device_type': 1, 'device_conn_type': 0}
+        candidate = {'app_id': 'a1', 'app_domain': 'ad'}
+        merged = {**context, **candidate}
+        shared = set(context)
+        ctx = record_tokens(context)
+        cand = record_tokens(merged, skip_columns=shared)
+        assert not set(ctx) & set(cand)
+        assert set(ctx) | set(cand) == set(record_tokens(merged))
+        assert 'cross:site_id=s1|app_id=a1' in cand
+
+    def test_non_scalar_values_fall_back(self):
+        assert record_tokens({'site_id': ['a', 'b']}) is None
+        # No feature columns: the DataFrame path yields no row at all
+        assert record_tokens({'id': 1}) is None
@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import roc_auc_score
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from app.predictor import build_predictor  # noqa: E402
+from feature_utils import hash_features  # noqa: E402
+from ftrl import FTRLProximal  # noqa: E402
+
+
+def _signal_frame(n, seed):
+    rng = np.random.default_rng(seed)
+    site = rng.integers(0, 20, n)
+    device = rng.integers(0, 4, n)
+    p = 1 / (1 + np.exp(-(site / 5.0 - 2.0 + (device == 1))))
+    return pd.DataFrame({
+        "click": (rng.random(n) < p).astype(int),
+        "site_id": [f"s{v}" for v in site],
+        "app_id": [f"a{v}" for v in rng.integers(0, 10, n)],
+        "device_type": device,
+    })
+
+
+def test_ftrl_learns_and_only_touches_seen_coordinates():
+    df = _signal_frame(4000, 0)
+    X = hash_features(df.drop(columns=["click"]), 2**12, add_feature_cross=False)
+    model = FTRLProximal(2**12, alpha=0.1, l1=0.5, batch_size=256)
+    model.partial_fit(X, df["click"].to_numpy(), classes=np.array([0, 1]))
+
+    untouched = np.setdiff1d(np.arange(2**12), X.indices)
+    assert not model.z[untouched].any() and not model.n[untouched].any()
+
+    idx, values = model.sparse_coef()
+    assert 0 < len(idx) <= len(np.unique(X.indices))
+    np.testing.assert_array_equal(model.coef_[0][idx], values)
+
+    test = _signal_frame(2000, 1)
+    X_test = hash_features(test.drop(columns=["click"]), 2**12, add_feature_cross=False)
+    assert roc_auc_score(test["click"], model.predict_proba(X_test)[:, 1]) > 0.7
+
+
+def test_strong_l1_zeroes_weights():
+    df = _signal_frame(1000, 2)
+    X = hash_features(df.drop(columns=["click"]), 2**10, add_feature_cross=False)
+    model = FTRLProximal(2**10, l1=1e6).partial_fit(X, df["click"].to_numpy())
+    assert len(model.sparse_coef()[0]) == 0
+
+
+def test_train_streaming_ftrl_resume_and_serve(make_train_gz, tmp_path, run_train):
+    train_gz = make_train_gz(click=lambda i: 1 if i % 9 == 0 or i % 5 == 1 else 0)
+    base = [
+        "--data-path", str(train_gz),
+        "--chunk-size", "20",
+        "--max-train-chunks", "5",
+        "--val-chunks", "2",
+        "--checkpoint-every", "2",
+        "--hash-n-features", str(2**10),
+        "--ensemble", "ftrl",
+        "--ftrl-batch-size", "8",
+    ]
+    full = run_train(base)
+    assert full["ensemble_type"] == "ftrl" and full["n_estimators"] == 1
+
+    ckpt = tmp_path / "models" / "checkpoints" / "ckpt_chunk_2.joblib"
+    resumed = run_train(base + ["--resume-from", str(ckpt)])
+    for key in ("val_auc", "val_logloss", "trained_rows", "val_rows"):
+        assert resumed[key] == full[key]
+
+    artifact = joblib.load(tmp_path / "models" / "ctr_model_hashing.joblib")
+    assert "models" not in artifact
+    weights = artifact["sparse_weights"]
+    assert len(weights["indices"]) == len(weights["values"]) > 0
+
+    proba = build_predictor(artifact)({"site_id": "s1", "app_id": "a1", "device_type": 1})
+    assert 0.0 < proba < 1.0
@@ -0,0 +1,106 @@
+import csv
+import gzip
+import json
+import os
+import sys
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("indexed_gzip")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from gzip_index import ROW_INDEX_SUFFIX, build_index, load_index, open_rows  # noqa: E402
+from ingest import iter_chunks, read_rows  # noqa: E402
+
+HEADER = [
+    "id", "click", "hour", "C1", "banner_pos", "site_id", "site_domain", "site_category",
+    "app_id", "app_domain", "app_category", "device_id", "device_ip", "device_model",
+    "device_type", "device_conn_type", "C14", "C15", "C16", "C17", "C18", "C19", "C20", "C21",
+]
+N_ROWS = 20_000
+
+
+@pytest.fixture
+def big_gz(tmp_path):
+    path = tmp_path / "train.gz"
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(N_ROWS):
+            writer.writerow([
+                10000000000000000000 + i, 1 if i % 7 == 0 else 0, 14102100 + i % 24, 1005, i % 2,
+                f"s{(i * 7919) % 1009:x}", f"sd{i % 97}", "28905ebd", f"a{(i * 31) % 211}", f"ad{i % 3}",
+                "07d7df22", f"dev{(i * 104729) % 100003:08x}", f"ip{(i * 15485863) % 999983:08x}",
+                f"m{i % 131}", i % 5, i % 4, 15700 + i % 11, 320, 50, 1722, 0, 35, i % 1000, 79,
+            ])
+    return path
+
+
+def test_build_index_and_open_rows(big_gz):
+    stats = build_index(str(big_gz), spacing=1 << 16, row_step=1000)
+    assert stats["rows"] == N_ROWS
+    assert stats["access_points"] > 2
+    assert stats["row_offsets"] == N_ROWS // 1000
+
+    index = load_index(str(big_gz))
+    assert index is not None
+    f, header, skip = open_rows(str(big_gz), 12_345, index)
+    with f:
+        assert header.decode().strip().split(",") == HEADER
+        assert skip == 345
+        for _ in range(skip):
+            f.readline()
+        assert f.readline().split(b",")[0] == str(10000000000000000000 + 12_345).encode()
+
+
+@pytest.mark.parametrize("backend", ["pandas", "arrow"])
+def test_indexed_row_range_matches_linear_read(big_gz, backend):
+    if backend == "arrow":
+        pytest.importorskip("pyarrow")
+    linear = read_rows(str(big_gz), nrows=3000, backend="pandas", start_row=15_500)
+    build_index(str(big_gz), spacing=1 << 16, row_step=1000)
+
+    chunks = list(iter_chunks(str(big_gz), 1000, backend, start_row=15_500, stop_row=18_500))
+    assert [len(c) for c in chunks] == [1000, 1000, 1000]
+    ids = [v for c in chunks for v in c["id"].tolist()]
+    assert ids == linear["id"].tolist()
+    assert chunks[-1]["device_ip"].astype(str).tolist() == linear["device_ip"].iloc[2000:].tolist()
+
+
+def test_stale_index_is_ignored(big_gz):
+    build_index(str(big_gz), spacing=1 << 16, row_step=1000)
+    st = os.stat(big_gz)
+    os.utime(big_gz, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert load_index(str(big_gz)) is None
+    # Falls back to the linear inflate
+    assert read_rows(str(big_gz), nrows=1, start_row=5000)["id"].tolist() == [10000000000000000000 + 5000]
+
+    os.remove(str(big_gz) + ROW_INDEX_SUFFIX)
+    assert load_index(str(big_gz)) is None
+
+
+def test_train_streaming_row_range(big_gz, tmp_path, monkeypatch):
+    build_index(str(big_gz), spacing=1 << 16, row_step=1000)
+    train = SourceFileLoader("train_streaming", str(REPO_ROOT / "src" / "train_streaming.py")).load_module()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", [
+        "train_streaming.py",
+        "--data-path", str(big_gz),
+        "--chunk-size", "1000",
+        "--max-train-chunks", "10",
+        "--val-chunks", "2",
+        "--checkpoint-every", "0",
+        "--hash-n-features", str(2**12),
+        "--row-start", "14000",
+        "--row-end", "18000",
+    ])
+    train.main()
+    metrics = json.loads((tmp_path / "metrics" / "metrics.json").read_text())
+    # 4000 rows in range: training stops at row_end, nothing left for validation
+    assert metrics["trained_rows"] == 4000
+    assert metrics["val_rows"] == 0
+    assert metrics["row_start"] == 14000
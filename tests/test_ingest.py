@@ -0,0 +1,93 @@
+import csv
+import gzip
+import json
+import sys
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from feature_utils import hash_features  # noqa: E402
+from ingest import iter_chunks, read_rows  # noqa: E402
+
+AVAZU_HEADER = [
+    "id", "click", "hour", "C1", "banner_pos", "site_id", "site_domain", "site_category",
+    "app_id", "app_domain", "app_category", "device_id", "device_ip", "device_model",
+    "device_type", "device_conn_type", "C14", "C15", "C16", "C17", "C18", "C19", "C20", "C21",
+]
+
+
+@pytest.fixture
+def avazu_gz(tmp_path):
+    rows = []
+    for i in range(250):
+        rows.append([
+            10000000000000000000 + i, 1 if i % 6 == 0 else 0, 14102100 + i % 24, 1005 + i % 3, i % 2,
+            f"s{i % 9}", f"sd{i % 4}", "28905ebd", f"a{i % 5}", "" if i % 17 == 0 else f"ad{i % 3}",
+            "07d7df22", f"dev{i % 31}", f"ip{i % 57}", f"m{i % 13}", i % 5, i % 4,
+            15700 + i % 11, 320, 50, 1722, 0, 35, -1 if i % 2 else 100084, 79,
+        ])
+    path = tmp_path / "train.gz"
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(AVAZU_HEADER)
+        writer.writerows(rows)
+    return path
+
+
+def test_arrow_chunks_match_pandas(avazu_gz):
+    pandas_chunks = list(iter_chunks(str(avazu_gz), 64, "pandas"))
+    arrow_chunks = list(iter_chunks(str(avazu_gz), 64, "arrow"))
+    assert [len(c) for c in arrow_chunks] == [len(c) for c in pandas_chunks] == [64, 64, 64, 58]
+
+    for p, a in zip(pandas_chunks, arrow_chunks):
+        assert str(a["site_id"].dtype) == "category"
+        np.testing.assert_array_equal(a["click"].to_numpy(), p["click"].to_numpy())
+        X_p = hash_features(p, 2**12, factorize=True)
+        X_a = hash_features(a, 2**12, factorize=True)
+        assert (X_p != X_a).nnz == 0
+
+
+def test_read_rows_arrow(avazu_gz):
+    assert len(read_rows(str(avazu_gz), nrows=10, backend="arrow")) == 10
+    assert len(read_rows(str(avazu_gz), backend="arrow")) == 250
+    with pytest.raises(ValueError, match="Unknown ingest backend"):
+        read_rows(str(avazu_gz), nrows=10, backend="polars")
+
+
+def test_train_streaming_arrow_matches_pandas(avazu_gz, tmp_path, monkeypatch):
+    train = SourceFileLoader("train_streaming", str(REPO_ROOT / "src" / "train_streaming.py")).load_module()
+    monkeypatch.chdir(tmp_path)
+    args = [
+        "train_streaming.py",
+        "--data-path", str(avazu_gz),
+        "--chunk-size", "50",
+        "--max-train-chunks", "3",
+        "--val-chunks", "1",
+        "--checkpoint-every", "0",
+        "--hash-n-features", str(2**12),
+    ]
+
+    results = []
+    for backend in ("pandas", "arrow"):
+        monkeypatch.setattr(sys, "argv", args + ["--ingest", backend])
+        train.main()
+        metrics = json.loads((tmp_path / "metrics" / "metrics.json").read_text())
+        results.append({k: metrics[k] for k in ("val_auc", "val_logloss", "val_pr_auc", "trained_rows", "val_rows")})
+
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("backend", ["pandas", "arrow"])
+def test_iter_chunks_start_row(avazu_gz, backend):
+    full = read_rows(str(avazu_gz), backend="pandas")
+    chunk = next(iter_chunks(str(avazu_gz), 40, backend, start_row=101))
+    assert len(chunk) == 40
+    assert chunk["id"].tolist() == full["id"].iloc[101:141].tolist()
+    assert chunk["device_ip"].astype(str).tolist() == full["device_ip"].iloc[101:141].tolist()
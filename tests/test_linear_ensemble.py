@@ -0,0 +1,126 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.dummy import DummyClassifier
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from app.model_loader import load_artifact  # noqa: E402
+from app.predictor import build_predictor  # noqa: E402
+from feature_utils import hash_features, to_feature_dict  # noqa: E402
+from linear_ensemble import (  # noqa: E402
+    StackedLinearEnsemble,
+    export_artifact,
+    export_serving_dir,
+    from_artifact,
+    load_serving_dir,
+)
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "click": rng.integers(0, 2, n),
+        "site_id": [f"s{v}" for v in rng.integers(0, 50, n)],
+        "app_id": [f"a{v}" for v in rng.integers(0, 30, n)],
+        "device_type": rng.integers(0, 5, n),
+    })
+
+
+@pytest.fixture
+def bagging_artifact(linear_artifact):
+    return linear_artifact(n_estimators=5)
+
+
+def test_stacked_matches_member_loop(bagging_artifact):
+    X = hash_features(_frame(200, 1).drop(columns=["click"]), 2**10, add_feature_cross=False)
+    models = bagging_artifact["models"]
+    expected = np.mean([m.predict_proba(X)[:, 1] for m in models], axis=0)
+
+    stacked = StackedLinearEnsemble.from_models(models)
+    assert stacked.weights.shape == (2**10, 5)
+    np.testing.assert_allclose(stacked.predict_proba(X), expected, rtol=1e-12, atol=0)
+
+
+def test_refresh_reuses_buffers(bagging_artifact):
+    from ftrl import FTRLProximal
+
+    df = _frame(300, 2)
+    X = hash_features(df.drop(columns=["click"]), 2**10, add_feature_cross=False)
+    y = df["click"].to_numpy()
+    models = bagging_artifact["models"][:2] + [FTRLProximal(2**10).partial_fit(X, y)]
+    stacked = StackedLinearEnsemble.from_models(models)
+    weights, intercepts = stacked.weights, stacked.intercepts
+
+    for m in models:
+        m.partial_fit(X, y)
+    assert stacked.refresh(models) is stacked
+    assert stacked.weights is weights and stacked.intercepts is intercepts
+    fresh = StackedLinearEnsemble.from_models(models)
+    np.testing.assert_array_equal(stacked.weights, fresh.weights)
+    np.testing.assert_array_equal(stacked.intercepts, fresh.intercepts)
+
+
+def test_export_round_trip(bagging_artifact):
+    exported = export_artifact(bagging_artifact)
+    assert "models" not in exported
+    assert exported["weights"].shape == (2**10, 5)
+
+    features = {"site_id": "s3", "app_id": "a7", "device_type": 2}
+    p_models = build_predictor(bagging_artifact)(features)
+    p_stacked = build_predictor(exported)(features)
+    assert p_stacked == pytest.approx(p_models, rel=1e-12)
+
+
+def test_serving_dir_is_versioned_and_memory_mapped(bagging_artifact, tmp_path, monkeypatch):
+    bagging_artifact["cross_pairs"] = [("site_id", "app_id")]
+    root = tmp_path / "serving"
+    first = export_serving_dir(bagging_artifact, str(root))
+    second = export_serving_dir(bagging_artifact, str(root))
+    assert [Path(first).name, Path(second).name] == ["v1", "v2"]
+
+    manifest = json.loads((Path(second) / "manifest.json").read_text())
+    assert manifest["hash_n_features"] == 2**10
+    assert manifest["cross_pairs"] == [["site_id", "app_id"]]
+    assert manifest["n_estimators"] == 5
+
+    # The root resolves to the latest version
+    loaded = load_serving_dir(str(root))
+    assert loaded["serving_dir"] == second
+    assert loaded["cross_pairs"] == [("site_id", "app_id")]
+    assert isinstance(loaded["weights"], np.memmap)
+    stacked = from_artifact(loaded)
+    assert np.shares_memory(stacked.weights, loaded["weights"])
+
+    features = {"site_id": "s3", "app_id": "a7", "device_type": 2}
+    expected = build_predictor(bagging_artifact)(features)
+    monkeypatch.setenv("MODEL_PATH", str(root))
+    assert build_predictor(load_artifact())(features) == pytest.approx(expected, rel=1e-12)
+
+
+def test_predict_one_fast_path_is_exact(bagging_artifact):
+    bagging_artifact["use_feature_cross"] = True
+    bagging_artifact["cross_pairs"] = [("site_id", "app_id")]
+    hasher = bagging_artifact["hasher"]
+    stacked = from_artifact(bagging_artifact)
+    predict_one = build_predictor(bagging_artifact)
+
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        features = {"site_id": f"s{rng.integers(0, 50)}", "app_id": f"a{rng.integers(0, 30)}"}
+        features["device_type"] = int(rng.integers(0, 5)) if rng.random() < 0.8 else None
+        tokens = to_feature_dict(pd.DataFrame([features]), add_feature_cross=True, cross_pairs=[("site_id", "app_id")])
+        assert predict_one(features) == float(stacked.predict_proba(hasher.transform(tokens))[0])
+
+
+def test_non_linear_members_are_not_stacked():
+    X = np.zeros((2, 4))
+    dummy = DummyClassifier(strategy="prior").fit(X, [0, 1])
+    assert from_artifact({"models": [dummy]}) is None
+    with pytest.raises(ValueError):
+        export_artifact({"models": [dummy]})
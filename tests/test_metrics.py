@@ -0,0 +1,44 @@
+import time
+
+from app.metrics import Histogram, Metrics, lap, server_timing
+
+
+def test_histogram_buckets_are_cumulative_in_render():
+    metrics = Metrics(buckets=(0.001, 0.01))
+    for seconds in (0.0005, 0.001, 0.005, 0.5):
+        metrics.observe_stage("/predict", "score", seconds)
+    text = metrics.render()
+    assert 'ctr_stage_duration_seconds_bucket{endpoint="/predict",stage="score",le="0.001"} 2' in text
+    assert 'ctr_stage_duration_seconds_bucket{endpoint="/predict",stage="score",le="0.01"} 3' in text
+    assert 'ctr_stage_duration_seconds_bucket{endpoint="/predict",stage="score",le="+Inf"} 4' in text
+    assert 'ctr_stage_duration_seconds_count{endpoint="/predict",stage="score"} 4' in text
+    assert "# TYPE ctr_stage_duration_seconds histogram" in text
+
+
+def test_requests_and_errors_are_counted_per_status():
+    metrics = Metrics()
+    metrics.observe_request("/predict", "POST", 200, 0.001)
+    metrics.observe_request("/predict", "POST", 200, 0.002)
+    metrics.observe_request("/predict", "POST", 400, 0.001)
+    text = metrics.render()
+    assert 'ctr_requests_total{endpoint="/predict",method="POST",status="200"} 2' in text
+    assert 'ctr_requests_total{endpoint="/predict",method="POST",status="400"} 1' in text
+    assert 'ctr_request_errors_total{endpoint="/predict"} 1' in text
+    assert 'ctr_request_duration_seconds_count{endpoint="/predict"} 3' in text
+    assert text.endswith("\n")
+
+
+def test_lap_and_server_timing():
+    timings = {}
+    t0 = time.perf_counter()
+    t1 = lap(timings, "hash", t0)
+    lap(timings, "hash", t1)
+    assert lap(None, "hash", t1) >= t1
+    assert set(timings) == {"hash"} and timings["hash"] >= 0
+
+    header = server_timing({"_start": 123.0, "parse": 0.0002, "score": 0.00005}, 0.001)
+    assert header == "parse;dur=0.200, score;dur=0.050, total;dur=1.000"
+
+    h = Histogram((1.0,))
+    h.observe(2.0)
+    assert h.snapshot() == ([0, 1], 2.0, 1)
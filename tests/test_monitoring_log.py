@@ -0,0 +1,36 @@
+import csv
+
+import numpy as np
+import pytest
+
+import monitoring.log as log
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row[1:] for row in csv.reader(f)]  # without the timestamp
+
+
+def test_log_predictions_matches_per_row_logging(tmp_path, monkeypatch):
+    probas = np.array([0.1, 0.73, 2.590602807090521e-05])
+    preds = (probas >= 0.5).astype(int)
+    y_true = [0, 1, 1]
+
+    monkeypatch.setattr(log, "LOG_PATH", tmp_path / "single.csv")
+    for p, pr, y in zip(preds.tolist(), probas.tolist(), y_true):
+        log.log_prediction(prediction=p, proba=float(pr), y_true=int(y))
+    log.log_prediction(prediction=0)
+    single = _rows(log.LOG_PATH)
+
+    monkeypatch.setattr(log, "LOG_PATH", tmp_path / "bulk" / "predictions.csv")
+    log.log_predictions(preds, probas, np.array(y_true))
+    log.log_predictions([0])
+    assert _rows(log.LOG_PATH) == single
+    assert single[0] == ["prediction", "proba", "y_true"] and single[-1] == ["0", "", ""]
+
+
+def test_log_predictions_rejects_mismatched_lengths(tmp_path, monkeypatch):
+    monkeypatch.setattr(log, "LOG_PATH", tmp_path / "predictions.csv")
+    with pytest.raises(ValueError, match="probas has 1 values, predictions has 2"):
+        log.log_predictions([0, 1], [0.2])
+    assert not log.LOG_PATH.exists()
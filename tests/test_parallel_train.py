@@ -0,0 +1,63 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from feature_utils import hash_features  # noqa: E402
+
+train = SourceFileLoader("train_streaming", str(REPO_ROOT / "src" / "train_streaming.py")).load_module()
+
+
+def _chunks(n_chunks=4, rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_chunks):
+        df = pd.DataFrame({
+            "click": rng.integers(0, 2, rows),
+            "site_id": [f"s{v}" for v in rng.integers(0, 40, rows)],
+            "app_id": [f"a{v}" for v in rng.integers(0, 25, rows)],
+            "device_type": rng.integers(0, 5, rows),
+        })
+        yield hash_features(df, 2**12, add_feature_cross=False, factorize=True), df["click"].to_numpy()
+
+
+def _fit(pool):
+    cfg = train.Config(
+        data_path="", chunk_size=300, max_train_chunks=4, val_rows=0, val_chunks=1, checkpoint_every=0,
+        seed=7, hash_n_features=2**12, use_feature_cross=False, cross_list=[], ensemble_type="bagging_sgd",
+        n_estimators=5, rebalancing="none", metric_gate_pr_auc=0.0, resume_from=None,
+        register_name="", register_stage="",
+    )
+    models = train._build_models(cfg, {0: 0.6, 1: 2.5})
+    classes = np.array([0, 1])
+    for X, y in _chunks():
+        train._train_on_chunk(models, X, y, classes, pool)
+    return models
+
+
+def test_parallel_members_match_sequential():
+    sequential = _fit(None)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        parallel = _fit(pool)
+    for a, b in zip(sequential, parallel):
+        np.testing.assert_array_equal(a.coef_, b.coef_)
+        np.testing.assert_array_equal(a.intercept_, b.intercept_)
+
+
+def test_train_pool_only_for_bagging():
+    cfg = train.Config(
+        data_path="", chunk_size=1, max_train_chunks=1, val_rows=0, val_chunks=1, checkpoint_every=0,
+        seed=0, hash_n_features=16, use_feature_cross=False, cross_list=[], ensemble_type="single",
+        n_estimators=5, rebalancing="none", metric_gate_pr_auc=0.0, resume_from=None,
+        register_name="", register_stage="", train_workers=4,
+    )
+    assert train._train_pool(cfg) is None
+    cfg.ensemble_type = "bagging_sgd"
+    pool = train._train_pool(cfg)
+    assert pool is not None and pool._max_workers == 4
+    pool.shutdown()
@@ -0,0 +1,60 @@
+import threading
+
+import pandas as pd
+
+import monitoring.log as log
+from app.prediction_log import PredictionLogSink
+
+
+def test_rows_are_batched_in_the_monitoring_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(log, "LOG_PATH", tmp_path / "data" / "predictions.csv")
+    log.log_prediction(prediction=1, proba=0.75, y_true=1)  # existing file keeps its rows
+
+    sink = PredictionLogSink(batch_size=4, flush_interval_s=5)
+    sink.start()
+    for i in range(6):
+        assert sink.log(i % 2, i / 10)
+    assert sink.log_many([0, 1], [0.25, 0.5]) == 2
+    sink.close()
+
+    df = pd.read_csv(log.LOG_PATH)
+    assert list(df.columns) == ["timestamp", "prediction", "proba", "y_true"]
+    assert df["proba"].tolist() == [0.75, 0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.25, 0.5]
+    assert df["prediction"].tolist() == [1, 0, 1, 0, 1, 0, 1, 0, 1]
+    assert df["y_true"].isna().tolist() == [False] + [True] * 8
+    assert pd.to_datetime(df["timestamp"]).notna().all()
+    assert sink.stats()["written"] == 8 and sink.stats()["batches"] == 2
+
+
+def test_full_queue_drops_and_counts_instead_of_blocking():
+    release = threading.Event()
+    written = []
+
+    def slow_write(rows):
+        release.wait(5)
+        written.extend(rows)
+
+    sink = PredictionLogSink(slow_write, max_queue=3, batch_size=1, flush_interval_s=5)
+    sink.start()
+    accepted = sum(sink.log(0, 0.1) for _ in range(10))
+    assert sink.stats()["dropped"] == 10 - accepted > 0
+    release.set()
+    sink.close()
+    assert len(written) == accepted
+
+
+def test_write_errors_are_counted_and_writer_keeps_going():
+    calls = []
+
+    def flaky(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise OSError("disk full")
+
+    sink = PredictionLogSink(flaky, batch_size=2, flush_interval_s=5)
+    sink.start()
+    sink.log_many([0, 0, 1, 1], [0.1, 0.2, 0.6, 0.7])
+    sink.close()
+    stats = sink.stats()
+    assert stats["write_errors"] == 1 and stats["last_error"] == "OSError: disk full"
+    assert stats["written"] == 2 and calls == [2, 2]
@@ -0,0 +1,59 @@
+import pytest
+
+import app.predictor as predictor
+from app.predictor import ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(predictor.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_key_is_canonical_and_type_aware():
+    key = ResultCache.key
+    assert key({"a": 1, "b": "x"}) == key({"b": "x", "a": 1})
+    assert len({key({"a": 1}), key({"a": 1.0}), key({"a": True}), key({"a": "1"})}) == 4
+    assert key({"a": object()}) is None
+
+
+def test_ttl_expiry(clock):
+    cache = ResultCache(capacity=10, ttl_s=5)
+    cache.bind("m1")
+    k = ResultCache.key({"a": 1})
+    cache.put(k, 0.25, "m1")
+    clock[0] += 4.9
+    assert cache.get(k) == 0.25
+    clock[0] += 0.2
+    assert cache.get(k) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_lru_eviction(clock):
+    cache = ResultCache(capacity=2, ttl_s=60)
+    cache.bind("m1")
+    keys = [ResultCache.key({"a": i}) for i in range(3)]
+    cache.put(keys[0], 0.1, "m1")
+    cache.put(keys[1], 0.2, "m1")
+    cache.get(keys[0])  # keys[1] is now least recently used
+    cache.put(keys[2], 0.3, "m1")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == 0.1 and cache.get(keys[2]) == 0.3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bind_invalidates_and_rejects_stale_results(clock):
+    cache = ResultCache(capacity=10, ttl_s=60)
+    cache.bind("m1")
+    k = ResultCache.key({"a": 1})
+    cache.put(k, 0.1, "m1")
+    cache.bind("m1")
+    assert cache.get(k) == 0.1
+
+    cache.bind("m2")
+    assert cache.get(k) is None
+    cache.put(k, 0.1, "m1")  # finished after the reload: not stored
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,41 @@
+import joblib
+import pytest
+
+
+@pytest.mark.parametrize("extra", [[], ["--ingest", "arrow"], ["--feature-cache", "cache"]])
+def test_resume_matches_uninterrupted_run(train_gz, tmp_path, run_train, extra):
+    if extra and extra[0] == "--ingest":
+        pytest.importorskip("pyarrow")
+    base = [
+        "--data-path", str(train_gz),
+        "--chunk-size", "20",
+        "--max-train-chunks", "5",
+        "--val-chunks", "2",
+        "--checkpoint-every", "2",
+        "--hash-n-features", str(2**10),
+    ] + extra
+
+    full = run_train(base)
+
+    ckpt = tmp_path / "models" / "checkpoints" / "ckpt_chunk_2.joblib"
+    state = joblib.load(ckpt)
+    assert state["input_position"]["rows"] == 40
+
+    resumed = run_train(base + ["--resume-from", str(ckpt)])
+
+    keys = ("val_auc", "val_logloss", "val_pr_auc", "trained_rows", "chunks_trained", "val_rows")
+    assert {k: resumed[k] for k in keys} == {k: full[k] for k in keys}
+    assert full["trained_rows"] == 100
+
+
+def test_resume_rejects_another_data_file(train_gz, tmp_path, run_train):
+    base = ["--chunk-size", "20", "--max-train-chunks", "3", "--val-chunks", "1", "--checkpoint-every", "2"]
+    run_train(["--data-path", str(train_gz)] + base)
+    ckpt = str(tmp_path / "models" / "checkpoints" / "ckpt_chunk_2.joblib")
+
+    other = tmp_path / "other.gz"
+    other.write_bytes(train_gz.read_bytes())
+    with pytest.raises(ValueError, match="resume with the same data file"):
+        run_train(["--data-path", str(other), "--resume-from", ckpt] + base)
+    # Same file through a different spelling of the path is fine
+    run_train(["--data-path", "./train.gz", "--resume-from", ckpt] + base)
@@ -0,0 +1,110 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from stream_metrics import BinnedMetrics, ExactMetrics, ProgressiveValidation, make_metrics  # noqa: E402
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(0)
+    proba = rng.beta(1, 5, 50_000)
+    y = (rng.random(50_000) < proba).astype(int)
+    return y, proba
+
+
+def _feed(acc, y, proba, chunk=7_000):
+    for start in range(0, len(y), chunk):
+        acc.update(y[start : start + chunk], proba[start : start + chunk])
+    return acc.result()
+
+
+@pytest.mark.parametrize("n_bins", [32, 1024, 2**16])
+def test_binned_metrics_within_error_bound(scores, n_bins):
+    y, proba = scores
+    result = _feed(BinnedMetrics(n_bins), y, proba)
+
+    assert abs(result["val_auc"] - roc_auc_score(y, proba)) <= result["val_auc_error_bound"] + 1e-12
+    assert abs(result["val_pr_auc"] - average_precision_score(y, proba)) <= result["val_pr_auc_error_bound"] + 1e-12
+    assert result["val_logloss"] == pytest.approx(log_loss(y, proba), rel=1e-12)
+
+
+def test_bound_shrinks_with_bins(scores):
+    y, proba = scores
+    coarse = _feed(BinnedMetrics(32), y, proba)
+    fine = _feed(BinnedMetrics(2**16), y, proba)
+    assert fine["val_auc_error_bound"] < coarse["val_auc_error_bound"]
+    assert fine["val_pr_auc_error_bound"] < 1e-3
+
+
+def test_exact_metrics_match_sklearn_and_grow(scores):
+    y, proba = scores
+    result = _feed(ExactMetrics(capacity=10_000), y, proba)
+    assert result["val_auc"] == roc_auc_score(y, proba)
+    assert result["val_pr_auc"] == average_precision_score(y, proba)
+    assert result["val_logloss"] == pytest.approx(log_loss(y, proba), rel=1e-12)
+
+
+def test_empty_and_unknown_mode():
+    assert np.isnan(BinnedMetrics().result()["val_auc"])
+    assert np.isnan(ExactMetrics(0).result()["val_logloss"])
+    with pytest.raises(ValueError, match="Unknown validation metrics mode"):
+        make_metrics("approx", 10)
+
+
+def test_progressive_exact_total_is_evaluated_once(scores, monkeypatch):
+    y, proba = scores
+    total = ExactMetrics(capacity=len(y))
+    progressive = ProgressiveValidation(total)
+    monkeypatch.setattr(total, "result", lambda: pytest.fail("exact metrics recomputed per chunk"))
+    for start in range(0, len(y), 7_000):
+        point = progressive.update(start // 7_000, y[start : start + 7_000], proba[start : start + 7_000])
+    monkeypatch.undo()
+
+    exact = total.result()
+    assert point["cum_logloss"] == pytest.approx(exact["val_logloss"], rel=1e-12)
+    assert abs(point["cum_auc"] - exact["val_auc"]) <= progressive.running.result()["val_auc_error_bound"] + 1e-12
+
+
+@pytest.fixture
+def train(make_train_gz, run_train):
+    path = make_train_gz(200, click=lambda i: 1 if i % 4 == 0 else 0)
+
+    def run(extra):
+        return run_train([
+            "--data-path", str(path),
+            "--chunk-size", "20",
+            "--max-train-chunks", "6",
+            "--val-chunks", "2",
+            "--checkpoint-every", "0",
+            "--hash-n-features", str(2**10),
+        ] + extra)
+
+    return run
+
+
+def test_progressive_validation_curve(train):
+    metrics = train(["--validation", "progressive"])
+    curve = metrics["progressive_curve"]
+    # Chunk 1 builds the models; chunks 2..6 are scored before training on them
+    assert curve["chunk"] == [2, 3, 4, 5, 6]
+    assert curve["rows"][-1] == metrics["val_rows"] == 100
+    assert metrics["trained_rows"] == 120
+    assert metrics["val_logloss"] == pytest.approx(curve["cum_logloss"][-1])
+    assert not metrics["early_stopped"]
+
+
+def test_progressive_early_stop(train):
+    metrics = train([
+        "--validation", "progressive", "--early-stop-patience", "2", "--early-stop-min-delta", "100",
+    ])
+    # min_delta can never be met: first point sets the best, two more without improvement
+    assert metrics["early_stopped"]
+    assert metrics["progressive_curve"]["chunk"] == [2, 3, 4]
+    assert metrics["chunks_trained"] == 4
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+import app.streaming as streaming
+from app.streaming import _iter_lines, aiter_scored, iter_scored
+
+
+def _predict_batch(records):
+    if any("bad" in r for r in records):
+        raise ValueError("bad record")
+    return np.array([r["x"] / 100 for r in records])
+
+
+def _lines(n):
+    for i in range(n):
+        yield json.dumps({"features": {"id": f"r{i}", "x": i % 100}}).encode() + b"\n"
+
+
+def test_batches_are_streamed_lazily_in_order():
+    consumed = []
+
+    def source():
+        for i, line in enumerate(_lines(10_000)):
+            consumed.append(i)
+            yield line
+
+    chunks = iter_scored(source(), _predict_batch, batch_size=100)
+    first = next(chunks).splitlines()
+    # Only the first batch has been read when its results come out
+    assert len(consumed) == 100
+    assert [json.loads(line)["line"] for line in first] == list(range(1, 101))
+
+    rest = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert len(rest) == 9_900
+    assert rest[-1] == {"line": 10_000, "id": "r9999", "click_probability": 0.99, "click_prediction": 1}
+
+
+def test_bad_lines_only_fail_themselves():
+    lines = [
+        b'{"features": {"x": 10}}',
+        b"not json",
+        b"",
+        b'{"x": 1}',
+        b'{"features": {"bad": 1}}',
+        b'{"features": {"x": 70}}',
+    ]
+    out = [json.loads(line) for chunk in iter_scored(lines, _predict_batch, batch_size=10) for line in chunk.splitlines()]
+    assert [r["line"] for r in out] == [1, 2, 4, 5, 6]
+    assert out[0]["click_probability"] == 0.1 and out[4]["click_prediction"] == 1
+    assert out[1]["error"].startswith("invalid JSON")
+    assert "features" in out[2]["error"]
+    assert out[3] == {"line": 5, "error": "bad record"}
+
+
+async def _chunked(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _split(data, size, max_line_bytes):
+    async def collect():
+        return [line async for line in _iter_lines(_chunked(data, size), max_line_bytes)]
+
+    return asyncio.run(collect())
+
+
+def test_line_splitting_is_chunk_independent_and_bounded():
+    data = b"a\n\nbcd\n" + b"x" * 25 + b"\nlast"
+    for size in (1, 2, 3, 7, 64):
+        assert _split(data, size, 10) == [b"a", b"", b"bcd", None, b"last"]
+    assert _split(b"ab\n" + b"y" * 11, 4, 10) == [b"ab", None]
+
+    # 80 MB without a newline: linear, nothing buffered past the limit
+    start = time.perf_counter()
+    assert _split(b"[" * (80 << 20), 64 << 10, 1024) == [None]
+    assert time.perf_counter() - start < 5
+
+
+def test_overlong_lines_get_error_records():
+    body = b'{"features": {"x": 20}}\n{"features": {"x": "' + b"9" * 100 + b'"}}\n{"features": {"x": 30}}'
+
+    async def collect():
+        return [c async for c in aiter_scored(_chunked(body, 16), _predict_batch, 10, 0.5, 64)]
+
+    out = [json.loads(line) for chunk in asyncio.run(collect()) for line in chunk.splitlines()]
+    assert out[1] == {"line": 2, "error": "line exceeds 64 bytes"}
+    assert [r["click_probability"] for r in (out[0], out[2])] == [0.2, 0.3]
+
+
+def test_cli_scores_a_file(tmp_path, monkeypatch, capsys, linear_artifact):
+    import joblib
+
+    from app.predictor import build_predictor
+
+    rng = np.random.default_rng(0)
+    records = [{"site_id": f"s{rng.integers(0, 9)}", "device_type": int(rng.integers(0, 3))} for _ in range(50)]
+    artifact = linear_artifact(2**8, n_estimators=1)
+    joblib.dump(artifact, tmp_path / "model.joblib")
+    (tmp_path / "requests.jsonl").write_text("".join(json.dumps({"features": r}) + "\n" for r in records))
+
+    monkeypatch.setattr(sys, "argv", [
+        "streaming", "--input", str(tmp_path / "requests.jsonl"), "--artifact", str(tmp_path / "model.joblib"),
+        "--batch-size", "16",
+    ])
+    streaming.main()
+    out = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    predict_one = build_predictor(artifact)
+    assert [r["click_probability"] for r in out] == [predict_one(r) for r in records]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.predictor import TokenHashCache, build_batch_predictor, build_predictor, build_ranker
+from src.feature_utils import hash_record, record_tokens
+
+
+@pytest.fixture
+def artifact(linear_artifact):
+    # 2**6 buckets: many collisions between cached tokens
+    return linear_artifact(2**6, cross_pairs=[("site_id", "app_id"), ("site_id", "app_id")])
+
+
+def _records(n, seed):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        r = {"site_id": f"s{rng.integers(0, 30)}", "app_id": f"a{rng.integers(0, 20)}"}
+        choice = rng.integers(0, 7)
+        # same str()/different type and missing values must not share entries wrongly
+        r["device_type"] = [1, True, 1.0, None, float("nan"), np.float64("nan"), np.float64(2.5)][choice]
+        if rng.random() < 0.1:
+            r["site_id"] = "x=y|z"
+        elif rng.random() < 0.1:
+            # Missing crossed value, as a float subclass: no token and no cross
+            r["site_id"] = np.float64("nan")
+        out.append(r)
+    return out
+
+
+def test_cached_scores_are_identical(artifact):
+    cache = TokenHashCache(2**6, True, capacity=1000)
+    plain, cached = build_predictor(artifact), build_predictor(artifact, cache)
+    records = _records(300, 1)
+    assert [cached(r) for r in records] == [plain(r) for r in records]
+    np.testing.assert_array_equal(
+        build_batch_predictor(artifact, cache)(records), build_batch_predictor(artifact)(records)
+    )
+    context, candidates = {"site_id": "s1", "device_type": 2}, [{"app_id": f"a{i}"} for i in range(5)]
+    np.testing.assert_array_equal(build_ranker(artifact, cache)(context, candidates), build_ranker(artifact)(context, candidates))
+
+    stats = cache.stats()
+    assert stats["hits"] > stats["misses"] > 0
+    assert stats["hit_ratio"] == stats["hits"] / (stats["hits"] + stats["misses"])
+
+
+def test_clock_eviction_and_counters():
+    cache = TokenHashCache(2**10, True, capacity=2)
+
+    def look(value):
+        return cache.hash_row({"site_id": value}, False, None)
+
+    look("a")
+    look("b")
+    look("a")  # hit: "a" gets a second chance
+    look("c")  # evicts "b", the oldest unreferenced entry
+    assert set(cache._entries) == {("site_id", "a"), ("site_id", "c")}
+    look("b")
+    assert cache.stats() == {"capacity": 2, "size": 2, "hits": 1, "misses": 4, "hit_ratio": 0.2}
+
+    expected = hash_record(record_tokens({"site_id": "b"}, add_feature_cross=False), 2**10)
+    for got, want in zip(look("b"), expected):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_cache_must_match_hasher(artifact):
+    with pytest.raises(ValueError, match="different hasher"):
+        build_predictor(artifact, TokenHashCache(2**10, True))